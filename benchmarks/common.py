@@ -0,0 +1,24 @@
+import contextlib
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def collection_path():
+    """Make the checkout importable as ansible_collections.oddbit.github.
+
+    Yields a directory to put on the module search path (it is also
+    added to sys.path for the duration).
+    """
+
+    with tempfile.TemporaryDirectory() as path:
+        os.makedirs(os.path.join(path, "ansible_collections", "oddbit"))
+        os.symlink(ROOT, os.path.join(path, "ansible_collections", "oddbit", "github"))
+        sys.path.insert(0, path)
+        try:
+            yield path
+        finally:
+            sys.path.remove(path)
@@ -0,0 +1,261 @@
+"""Measure a convergence run against a local mock GitHub API.
+
+Starts the server in mock_github.py with a synthetic organization and
+runs github_repo, github_team, github_team_members and
+github_repo_labels against it, each task in a fresh interpreter as
+Ansible would on a target host. github_repo_labels is also run once for
+every repository with a topic. Every scenario is run twice with the same
+tasks: first to converge the organization, then again when there is
+nothing left to change (the no-op run). For each run this reports the
+wall time, the number of API requests and the bytes transferred.
+
+The no-op request counts are compared with those recorded in
+baseline.json for the same organization size, and the benchmark exits
+with status 1 if any scenario makes more requests than it used to. Use
+--update-baseline to record the current counts.
+
+With --snapshot, a snapshot of the organization is taken with
+github_org_info before each no-op run, and the modules read from it.
+
+usage: python benchmarks/converge.py [--repos N] [--labels N] [--teams N]
+    [--members N] [--tasks N] [--incremental] [--optimistic] [--snapshot]
+    [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, collection_path
+from mock_github import MockGitHub, Organization
+
+ORG = "example"
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def repo_tasks(args, count):
+    return [
+        {"name": f"{ORG}/repo{n}", "repository": {"description": f"managed {n}"}}
+        for n in range(count)
+    ] + [{"name": f"{ORG}/new-repo", "repository": {"description": "new"}}]
+
+
+def team_tasks(args, count):
+    return [
+        {"organization": ORG, "team": {"name": f"Team {n}", "description": "managed"}}
+        for n in range(count)
+    ] + [{"organization": ORG, "team": {"name": "New Team", "privacy": "closed"}}]
+
+
+def team_members_tasks(args, count):
+    return [
+        {
+            "organization": ORG,
+            "team": {
+                "name": f"Team {n}",
+                "maintainers": ["user0"],
+                "members": [f"user{i}" for i in range(1, args.members + 2)],
+                "exclusive": True,
+            },
+        }
+        for n in range(count)
+    ]
+
+
+def repo_labels_tasks(args, count):
+    return [
+        {
+            "repo": f"{ORG}/repo{n}",
+            "state": "present",
+            "exclusive": True,
+            "labels": [
+                {"name": f"label{i}", "color": "00ff00"} for i in range(args.labels)
+            ]
+            + [{"name": "new label", "color": "0000ff"}],
+        }
+        for n in range(count)
+    ]
+
+
+def repo_labels_fanout_tasks(args, count):
+    return [
+        {
+            "organization": ORG,
+            "repo_topic": "service",
+            "source_repo": f"{ORG}/repo1",
+            "state": "present",
+            "labels": [{"name": "service", "color": "ff00ff"}],
+        }
+    ]
+
+
+# Each scenario is a module and a function returning its tasks.
+SCENARIOS = {
+    "github_repo": ("github_repo", repo_tasks),
+    "github_team": ("github_team", team_tasks),
+    "github_team_members": ("github_team_members", team_members_tasks),
+    "github_repo_labels": ("github_repo_labels", repo_labels_tasks),
+    "github_repo_labels (topic)": ("github_repo_labels", repo_labels_fanout_tasks),
+}
+
+
+def run_module(path, module, args):
+    """Run module with args in a new interpreter and return its result."""
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json") as fd:
+        json.dump({"ANSIBLE_MODULE_ARGS": args}, fd)
+        fd.flush()
+        proc = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                f"ansible_collections.oddbit.github.plugins.modules.{module}",
+                fd.name,
+            ],
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, PYTHONPATH=path),
+        )
+    try:
+        return json.loads(proc.stdout)
+    except ValueError:
+        return {"failed": True, "msg": proc.stdout + proc.stderr}
+
+
+def run_tasks(server, path, module, tasks, common):
+    """Run every task, and return the cost of doing so."""
+
+    server.stats.reset()
+    changed = 0
+    start = time.perf_counter()
+    for task in tasks:
+        result = run_module(path, module, common | task)
+        if result.get("failed"):
+            raise SystemExit(f"{module} failed: {result.get('msg')}")
+        changed += bool(result.get("changed"))
+    return {
+        "tasks": len(tasks),
+        "time": time.perf_counter() - start,
+        "changed": changed,
+        **server.stats.summary(),
+    }
+
+
+def load_baseline():
+    try:
+        with open(BASELINE) as fd:
+            return json.load(fd)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--labels", type=int, default=20)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=5, help="tasks per module and run")
+    parser.add_argument(
+        "--incremental", action="store_true", help="run with github_incremental"
+    )
+    parser.add_argument(
+        "--optimistic", action="store_true", help="run with github_optimistic"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="run the no-op runs with github_snapshot",
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    org = Organization(ORG, args.repos, args.labels, args.teams, args.members)
+    size = (
+        f"repos={args.repos} labels={args.labels} teams={args.teams}"
+        f" members={args.members} tasks={args.tasks}"
+    )
+    if args.incremental:
+        size += " incremental"
+    if args.optimistic:
+        size += " optimistic"
+    if args.snapshot:
+        size += " snapshot"
+
+    results = {}
+    with collection_path() as path, MockGitHub(
+        org
+    ) as server, tempfile.TemporaryDirectory() as cache_dir:
+        common = {
+            "github_token": "benchmark",
+            "github_url": server.url,
+            "github_cache_dir": cache_dir,
+            "github_write_interval": 0,
+            "github_incremental": args.incremental,
+            "github_optimistic": args.optimistic,
+        }
+        snapshot = os.path.join(cache_dir, f"{ORG}.jsonl.gz")
+        for scenario, (module, make_tasks) in SCENARIOS.items():
+            tasks = make_tasks(args, min(args.tasks, args.repos, args.teams))
+            results[scenario] = {
+                "converge": run_tasks(server, path, module, tasks, common)
+            }
+            if args.snapshot:
+                run_module(
+                    path,
+                    "github_org_info",
+                    common | {"organization": ORG, "dest": snapshot},
+                )
+            results[scenario]["noop"] = run_tasks(
+                server,
+                path,
+                module,
+                tasks,
+                common | ({"github_snapshot": snapshot} if args.snapshot else {}),
+            )
+
+    print(size)
+    print(
+        f"{'':26} {'run':8} {'tasks':>6} {'changed':>8} {'time (s)':>9}"
+        f" {'requests':>9} {'304s':>6} {'KiB in':>8} {'KiB out':>8}"
+    )
+    for scenario, phases in results.items():
+        for phase, cost in phases.items():
+            print(
+                f"{scenario:26} {phase:8} {cost['tasks']:6} {cost['changed']:8}"
+                f" {cost['time']:9.2f} {cost['requests']:9} {cost['not_modified']:6}"
+                f" {cost['bytes_in'] / 1024:8.1f} {cost['bytes_out'] / 1024:8.1f}"
+            )
+
+    noop = {
+        scenario: phases["noop"]["requests"] for scenario, phases in results.items()
+    }
+    baseline = load_baseline()
+    if args.update_baseline:
+        baseline[size] = noop
+        with open(BASELINE, "w") as fd:
+            json.dump(baseline, fd, indent=2, sort_keys=True)
+            fd.write("\n")
+        return
+
+    if size not in baseline:
+        print(f"\nno baseline recorded for {size}")
+        return
+
+    regressions = [
+        f"{scenario}: {count} requests (baseline {baseline[size][scenario]})"
+        for scenario, count in noop.items()
+        if count > baseline[size].get(scenario, count)
+    ]
+    if regressions:
+        print("\nno-op runs make more requests than the baseline:")
+        print("\n".join(f"  {line}" for line in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,686 @@
+"""A local stand-in for the GitHub REST and GraphQL APIs.
+
+The server keeps an in-memory organization (repositories, labels,
+collaborators, teams and team members) and implements the endpoints the
+collection's modules use, with GitHub's paging (``per_page``/``page``
+and Link headers), ETags and conditional requests, gzip responses and
+rate limit headers. The GraphQL endpoint understands the batched
+connection queries sent by github_graphql.GraphQLReader. GitHub App
+installation tokens can be minted, though the app's JWT is not verified.
+
+Every request is counted, along with the bytes received and sent.
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+PERMISSIONS = ("pull", "triage", "push", "maintain", "admin")
+ROLE_NAMES = {"pull": "read", "push": "write"}
+GRAPHQL_PERMISSIONS = {
+    "pull": "READ",
+    "triage": "TRIAGE",
+    "push": "WRITE",
+    "maintain": "MAINTAIN",
+    "admin": "ADMIN",
+}
+
+# The labels GitHub gives a new repository.
+DEFAULT_LABELS = (
+    "bug",
+    "documentation",
+    "duplicate",
+    "enhancement",
+    "good first issue",
+    "help wanted",
+    "invalid",
+    "question",
+    "wontfix",
+)
+
+GRAPHQL_REPOSITORY_RE = re.compile(
+    r"r(\d+): repository\(owner: \$owner\d+, name: \$name\d+\) \{ (\w+)\("
+    r"first: (\d+), after: \$after\d+(?:, affiliation: (\w+))?\)"
+)
+GRAPHQL_TEAM_RE = re.compile(
+    r"r(\d+): organization\(login: \$org\d+\) \{ team\(slug: \$slug\d+\) \{ "
+    r"(\w+)\(first: (\d+)"
+)
+
+
+def slugify(name):
+    return re.sub(r"-+", "-", re.sub(r"[^a-z0-9_-]+", "-", name.lower())).strip("-")
+
+
+class Organization:
+    """The state of one synthetic organization."""
+
+    def __init__(self, name, repos=10, labels=10, teams=5, members=10):
+        self.name = name
+        self.lock = threading.Lock()
+        self.repos = {}
+        self.labels = {}
+        self.collaborators = {}
+        self.teams = {}
+        self.members = {}
+        self.invitations = {}
+        # Repositories whose GraphQL connections come back FORBIDDEN, as
+        # the collaborators of a repository do for a token without push
+        # access to it.
+        self.forbidden = set()
+        self.events = []
+        self.clock = 0
+
+        for n in range(repos):
+            self.add_repo(
+                {
+                    "name": f"repo{n}",
+                    "description": f"repository {n}",
+                    "topics": ["service"] if n % 2 == 0 else [],
+                }
+            )
+            self.labels[f"repo{n}"] = [
+                {"name": f"label{i}", "color": "ededed", "description": None}
+                for i in range(labels)
+            ]
+            self.collaborators[f"repo{n}"] = {"user0": "push"}
+        for n in range(teams):
+            team = self.add_team({"name": f"Team {n}", "privacy": "closed"})
+            self.members[team["slug"]] = {
+                f"user{i}": "maintainer" if i == 0 else "member" for i in range(members)
+            }
+
+    def add_repo(self, data):
+        repo = {
+            "id": len(self.repos) + 1,
+            "name": data["name"],
+            "full_name": f"{self.name}/{data['name']}",
+            "owner": {"login": self.name},
+            "private": False,
+            "description": None,
+            "homepage": None,
+            "has_issues": True,
+            "has_projects": True,
+            "has_wiki": True,
+            "allow_squash_merge": True,
+            "allow_merge_commit": True,
+            "allow_rebase_merge": True,
+            "allow_auto_merge": False,
+            "delete_branch_on_merge": False,
+            "archived": False,
+            "topics": [],
+            "updated_at": self.tick(),
+        }
+        repo.update((k, v) for k, v in data.items() if k in repo)
+        self.repos[repo["name"].lower()] = repo
+        self.labels.setdefault(repo["name"], [])
+        self.collaborators.setdefault(repo["name"], {})
+        return repo
+
+    def tick(self):
+        """Return a timestamp one second later than the last one."""
+
+        self.clock += 1
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1577836800 + self.clock))
+
+    def add_event(self, type, repo):
+        """Record an event in the organization's event stream."""
+
+        self.events.insert(
+            0,
+            {
+                "id": str(len(self.events) + 1),
+                "type": type,
+                "repo": {"name": f"{self.name}/{repo}"},
+                "payload": {},
+            },
+        )
+        del self.events[300:]
+
+    def add_team(self, data):
+        team = {
+            "id": len(self.teams) + 1,
+            "name": data["name"],
+            "slug": slugify(data["name"]),
+            "description": data.get("description") or "",
+            "privacy": data.get("privacy") or "secret",
+            "permission": "pull",
+        }
+        self.teams[team["slug"]] = team
+        self.members.setdefault(team["slug"], {})
+        return team
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.not_modified = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, status, bytes_in, bytes_out):
+        with self.lock:
+            self.requests += 1
+            self.not_modified += status == 304
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def summary(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+            }
+
+
+class NotFound(Exception):
+    pass
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def org(self):
+        return self.server.org
+
+    def do_request(self):
+        url = urlsplit(self.path)
+        self.query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.bytes_in = len(self.requestline) + len(str(self.headers)) + len(body)
+        data = json.loads(body) if body else {}
+
+        faults = self.server.faults.get((self.command, url.path))
+        if faults:
+            return self.reply(faults.pop(0), {"message": "Server Error"})
+
+        for verb, pattern, handler in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if match and verb == self.command:
+                try:
+                    with self.org.lock:
+                        result = handler(self, data, *map(unquote, match.groups()))
+                except NotFound:
+                    break
+                except (KeyError, ValueError) as err:
+                    return self.reply(422, {"message": f"Validation Failed: {err}"})
+                if isinstance(result, tuple):
+                    return self.reply(*result)
+                return self.reply(200, result)
+
+        return self.reply(404, {"message": "Not Found"})
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = do_request
+
+    def reply(self, status, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        headers = dict(headers or {})
+        if status == 200 and data:
+            headers["ETag"] = f'"{hashlib.sha1(data).hexdigest()}"'
+            if (
+                self.command == "GET"
+                and self.headers.get("If-None-Match") == headers["ETag"]
+            ):
+                status, data = 304, b""
+        if data:
+            headers["Content-Type"] = "application/json; charset=utf-8"
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                data = gzip.compress(data)
+                headers["Content-Encoding"] = "gzip"
+
+        self.send_response(status)
+        headers.update(
+            {
+                "X-RateLimit-Limit": "5000",
+                "X-RateLimit-Remaining": "4999",
+                "X-RateLimit-Reset": str(int(time.time()) + 3600),
+                "Content-Length": str(len(data)),
+            }
+        )
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+        self.server.stats.record(
+            status,
+            self.bytes_in,
+            len(data) + sum(len(k) + len(v) + 4 for k, v in headers.items()),
+        )
+
+    def page(self, items):
+        """Reply with one page of items, as selected by the query."""
+
+        per_page = min(int(self.query.get("per_page", 30)), 100)
+        page = int(self.query.get("page", 1))
+        last = max(1, -(-len(items) // per_page))
+        base = f"http://{self.headers['Host']}{urlsplit(self.path).path}"
+        links = []
+        if page < last:
+            links.append(f'<{base}?per_page={per_page}&page={page + 1}>; rel="next"')
+            links.append(f'<{base}?per_page={per_page}&page={last}>; rel="last"')
+        if page > 1:
+            links.append(f'<{base}?per_page={per_page}&page=1>; rel="first"')
+        return (
+            200,
+            items[(page - 1) * per_page : page * per_page],
+            {"Link": ", ".join(links)} if links else None,
+        )
+
+    def repo(self, owner, name):
+        if owner != self.org.name or name.lower() not in self.org.repos:
+            raise NotFound()
+        return self.org.repos[name.lower()]
+
+    def team(self, org, slug):
+        if org != self.org.name or slug not in self.org.teams:
+            raise NotFound()
+        return self.org.teams[slug]
+
+    # Apps
+
+    def app_jwt(self):
+        auth = self.headers.get("Authorization", "")
+        return auth.startswith("Bearer ") and auth.count(".") == 2
+
+    def get_org_installation(self, data, org):
+        if not self.app_jwt():
+            return 401, {"message": "A JSON web token could not be decoded"}
+        if org != self.org.name:
+            raise NotFound()
+        return {"id": 1, "account": {"login": org}}
+
+    def create_installation_token(self, data, installation_id):
+        if not self.app_jwt():
+            return 401, {"message": "A JSON web token could not be decoded"}
+        if installation_id != "1":
+            raise NotFound()
+        self.server.app_tokens += 1
+        expires = time.gmtime(time.time() + self.server.app_token_lifetime)
+        return 201, {
+            "token": f"ghs_{self.server.app_tokens}",
+            "expires_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", expires),
+        }
+
+    # Users
+
+    def get_user(self, data):
+        # Installation tokens do not belong to a user.
+        if self.headers.get("Authorization", "").startswith("token ghs_"):
+            return 403, {"message": "Resource not accessible by integration"}
+        return {"login": "benchmark", "name": "Benchmark", "email": None}
+
+    def list_org_events(self, data, user, org):
+        if org != self.org.name:
+            raise NotFound()
+        status, events, headers = self.page(self.org.events)
+        return (
+            status,
+            events,
+            {**(headers or {}), "X-Poll-Interval": str(self.server.poll_interval)},
+        )
+
+    # Organizations
+
+    def list_org_members(self, data, org):
+        if org != self.org.name:
+            raise NotFound()
+        roles = {}
+        for members in self.org.members.values():
+            for login, role in members.items():
+                roles[login] = "admin" if login == "user0" else "member"
+        role = self.query.get("role", "all")
+        return self.page(
+            [
+                {"login": login, "id": n, "type": "User"}
+                for n, login in enumerate(sorted(roles))
+                if role in ("all", roles[login])
+            ]
+        )
+
+    # Repositories
+
+    def list_repos(self, data, org):
+        if org != self.org.name:
+            raise NotFound()
+        repos = list(self.org.repos.values())
+        if self.query.get("sort") == "updated":
+            repos.sort(
+                key=lambda repo: repo["updated_at"],
+                reverse=self.query.get("direction", "desc") == "desc",
+            )
+        return self.page(repos)
+
+    def create_repo(self, data, org):
+        if org != self.org.name:
+            raise NotFound()
+        if data["name"].lower() in self.org.repos:
+            return 422, {
+                "message": "Repository creation failed.",
+                "errors": [
+                    {
+                        "resource": "Repository",
+                        "code": "custom",
+                        "field": "name",
+                        "message": "name already exists on this account",
+                    }
+                ],
+            }
+        repo = self.org.add_repo(data)
+        self.org.labels[repo["name"]] = [
+            {"name": name, "color": "ededed", "description": None}
+            for name in DEFAULT_LABELS
+        ]
+        self.org.add_event("CreateEvent", repo["name"])
+        return 201, repo
+
+    def get_repo(self, data, owner, name):
+        return self.repo(owner, name)
+
+    def update_repo(self, data, owner, name):
+        repo = self.repo(owner, name)
+        repo.update((k, v) for k, v in data.items() if k in repo)
+        repo["updated_at"] = self.org.tick()
+        return repo
+
+    def delete_repo(self, data, owner, name):
+        repo = self.repo(owner, name)
+        del self.org.repos[name.lower()]
+        del self.org.labels[repo["name"]]
+        return 204, None
+
+    # Labels
+
+    def find_label(self, repo, name):
+        for label in self.org.labels[repo["name"]]:
+            if label["name"].lower() == name.lower():
+                return label
+        raise NotFound()
+
+    def list_labels(self, data, owner, name):
+        return self.page(self.org.labels[self.repo(owner, name)["name"]])
+
+    def create_label(self, data, owner, name):
+        labels = self.org.labels[self.repo(owner, name)["name"]]
+        if any(label["name"].lower() == data["name"].lower() for label in labels):
+            return 422, {"message": "Validation Failed"}
+        label = {
+            "name": data["name"],
+            "color": data.get("color") or "ededed",
+            "description": data.get("description"),
+        }
+        labels.append(label)
+        return 201, label
+
+    def update_label(self, data, owner, name, label):
+        label = self.find_label(self.repo(owner, name), label)
+        if "new_name" in data:
+            label["name"] = data["new_name"]
+        label.update((k, data[k]) for k in ("color", "description") if k in data)
+        return label
+
+    def delete_label(self, data, owner, name, label):
+        repo = self.repo(owner, name)
+        self.org.labels[repo["name"]].remove(self.find_label(repo, label))
+        return 204, None
+
+    # Collaborators
+
+    def list_collaborators(self, data, owner, name):
+        collaborators = self.org.collaborators[self.repo(owner, name)["name"]]
+        return self.page(
+            [
+                {
+                    "login": login,
+                    "permissions": {
+                        p: PERMISSIONS.index(p) <= PERMISSIONS.index(perm)
+                        for p in PERMISSIONS
+                    },
+                    "role_name": ROLE_NAMES.get(perm, perm),
+                }
+                for login, perm in collaborators.items()
+            ]
+        )
+
+    def add_collaborator(self, data, owner, name, login):
+        perm = data.get("permission", "push")
+        perm = {"read": "pull", "write": "push"}.get(perm, perm)
+        repo = self.repo(owner, name)
+        self.org.collaborators[repo["name"]][login] = perm
+        self.org.add_event("MemberEvent", repo["name"])
+        return 204, None
+
+    def remove_collaborator(self, data, owner, name, login):
+        self.org.collaborators[self.repo(owner, name)["name"]].pop(login, None)
+        return 204, None
+
+    def list_repo_invitations(self, data, owner, name):
+        self.repo(owner, name)
+        return self.page([])
+
+    # Teams
+
+    def list_teams(self, data, org):
+        if org != self.org.name:
+            raise NotFound()
+        return self.page(list(self.org.teams.values()))
+
+    def create_team(self, data, org):
+        if org != self.org.name:
+            raise NotFound()
+        if slugify(data["name"]) in self.org.teams:
+            return 422, {
+                "message": "Validation Failed",
+                "errors": [
+                    {"resource": "Team", "code": "already_exists", "field": "name"}
+                ],
+            }
+        return 201, self.org.add_team(data)
+
+    def get_team(self, data, org, slug):
+        return self.team(org, slug)
+
+    def update_team(self, data, org, slug):
+        team = self.team(org, slug)
+        team.update((k, v) for k, v in data.items() if k in team and v is not None)
+        if team["slug"] != slugify(team["name"]):
+            del self.org.teams[slug]
+            team["slug"] = slugify(team["name"])
+            self.org.teams[team["slug"]] = team
+            self.org.members[team["slug"]] = self.org.members.pop(slug)
+        return team
+
+    def delete_team(self, data, org, slug):
+        self.team(org, slug)
+        del self.org.teams[slug]
+        del self.org.members[slug]
+        return 204, None
+
+    def list_members(self, data, org, slug):
+        self.team(org, slug)
+        role = self.query.get("role", "all")
+        return self.page(
+            [
+                {"login": login}
+                for login, have in self.org.members[slug].items()
+                if role in ("all", have)
+            ]
+        )
+
+    def list_team_invitations(self, data, org, slug):
+        self.team(org, slug)
+        return self.page(
+            [{"login": login} for login in sorted(self.org.invitations.get(slug, ()))]
+        )
+
+    def member_login(self, slug, login):
+        """Return the login a team member was added with.
+
+        Logins are case-insensitive, as on GitHub.
+        """
+
+        return next(
+            (have for have in self.org.members[slug] if have.lower() == login.lower()),
+            login,
+        )
+
+    def add_membership(self, data, org, slug, login):
+        self.team(org, slug)
+        role = data.get("role", "member")
+        self.org.members[slug][self.member_login(slug, login)] = role
+        return {"state": "active", "role": role}
+
+    def remove_membership(self, data, org, slug, login):
+        self.team(org, slug)
+        self.org.members[slug].pop(self.member_login(slug, login), None)
+        return 204, None
+
+    # GraphQL
+
+    def graphql(self, data):
+        query, variables = data["query"], data["variables"]
+        result = {}
+        errors = []
+
+        for n, connection, first, affiliation in GRAPHQL_REPOSITORY_RE.findall(query):
+            owner, name = variables[f"owner{n}"], variables[f"name{n}"]
+            if owner != self.org.name or name.lower() not in self.org.repos:
+                result[f"r{n}"] = None
+                continue
+            name = self.org.repos[name.lower()]["name"]
+            if name in self.org.forbidden:
+                result[f"r{n}"] = {connection: None}
+                errors.append({"type": "FORBIDDEN", "path": [f"r{n}", connection]})
+                continue
+            if connection == "labels":
+                edges = [{"node": label} for label in self.org.labels[name]]
+            else:
+                edges = [
+                    {"permission": GRAPHQL_PERMISSIONS[perm], "node": {"login": login}}
+                    for login, perm in self.org.collaborators[name].items()
+                ]
+            result[f"r{n}"] = {
+                connection: self.page_edges(edges, int(first), variables[f"after{n}"])
+            }
+
+        for n, connection, first in GRAPHQL_TEAM_RE.findall(query):
+            org, slug = variables[f"org{n}"], variables[f"slug{n}"]
+            if org != self.org.name or slug not in self.org.teams:
+                result[f"r{n}"] = {"team": None}
+                continue
+            edges = [
+                {
+                    "role": role.upper(),
+                    "node": {"login": login, "name": None, "email": None},
+                }
+                for login, role in self.org.members[slug].items()
+            ]
+            result[f"r{n}"] = {
+                "team": {
+                    connection: self.page_edges(
+                        edges, int(first), variables[f"after{n}"]
+                    )
+                }
+            }
+
+        if errors:
+            return {"data": result, "errors": errors}
+        return {"data": result}
+
+    def page_edges(self, edges, first, after):
+        start = int(after or 0)
+        more = start + first < len(edges)
+        return {
+            "edges": edges[start : start + first],
+            "pageInfo": {
+                "hasNextPage": more,
+                "endCursor": str(start + first) if more else None,
+            },
+        }
+
+
+REPO = r"/repos/([^/]+)/([^/]+)"
+TEAM = r"/orgs/([^/]+)/teams/([^/]+)"
+
+ROUTES = [
+    ("GET", r"/user", Handler.get_user),
+    ("GET", r"/orgs/([^/]+)/installation", Handler.get_org_installation),
+    (
+        "POST",
+        r"/app/installations/([^/]+)/access_tokens",
+        Handler.create_installation_token,
+    ),
+    ("POST", r"/graphql", Handler.graphql),
+    ("GET", r"/users/([^/]+)/events/orgs/([^/]+)", Handler.list_org_events),
+    ("GET", r"/orgs/([^/]+)/members", Handler.list_org_members),
+    ("GET", r"/orgs/([^/]+)/repos", Handler.list_repos),
+    ("POST", r"/orgs/([^/]+)/repos", Handler.create_repo),
+    ("GET", REPO, Handler.get_repo),
+    ("PATCH", REPO, Handler.update_repo),
+    ("DELETE", REPO, Handler.delete_repo),
+    ("GET", REPO + "/labels", Handler.list_labels),
+    ("POST", REPO + "/labels", Handler.create_label),
+    ("PATCH", REPO + "/labels/([^/]+)", Handler.update_label),
+    ("DELETE", REPO + "/labels/([^/]+)", Handler.delete_label),
+    ("GET", REPO + "/collaborators", Handler.list_collaborators),
+    ("PUT", REPO + "/collaborators/([^/]+)", Handler.add_collaborator),
+    ("DELETE", REPO + "/collaborators/([^/]+)", Handler.remove_collaborator),
+    ("GET", REPO + "/invitations", Handler.list_repo_invitations),
+    ("GET", r"/orgs/([^/]+)/teams", Handler.list_teams),
+    ("POST", r"/orgs/([^/]+)/teams", Handler.create_team),
+    ("GET", TEAM, Handler.get_team),
+    ("PATCH", TEAM, Handler.update_team),
+    ("DELETE", TEAM, Handler.delete_team),
+    ("GET", TEAM + "/members", Handler.list_members),
+    ("GET", TEAM + "/invitations", Handler.list_team_invitations),
+    ("PUT", TEAM + "/memberships/([^/]+)", Handler.add_membership),
+    ("DELETE", TEAM + "/memberships/([^/]+)", Handler.remove_membership),
+]
+
+
+class MockGitHub(ThreadingHTTPServer):
+    """Serve ``org`` on a local port, in a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, org, port=0):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.org = org
+        self.stats = Stats()
+        self.poll_interval = 60
+        self.app_tokens = 0
+        self.app_token_lifetime = 3600
+
+        # Statuses to answer requests with instead of handling them, by
+        # method and path, e.g. {("PATCH", "/repos/example/repo1"): [502]}.
+        self.faults = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
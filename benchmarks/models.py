@@ -0,0 +1,110 @@
+"""Compare validated models with records for data read from the API.
+
+For each kind of object, builds ``--count`` of them from API-shaped
+dicts, first as validated pydantic models (what the modules used to do)
+and then as records (what they do now), and times the comparison each
+module makes against the desired state.
+
+usage: python benchmarks/models.py [--count N]
+"""
+
+import argparse
+import time
+
+from common import collection_path
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    with collection_path():
+        import ansible_collections.oddbit.github.plugins.module_utils.github_models as models
+
+    labels = [
+        {
+            "id": n,
+            "node_id": f"LA_{n}",
+            "url": f"https://api.github.com/repos/org/repo/labels/label-{n}",
+            "name": f"label-{n}",
+            "description": f"label {n}",
+            "color": "ff0000",
+            "default": False,
+        }
+        for n in range(args.count)
+    ]
+    teams = [
+        {
+            "id": n,
+            "name": f"Team {n}",
+            "slug": f"team-{n}",
+            "description": "",
+            "privacy": "closed",
+            "permission": "pull",
+        }
+        for n in range(args.count)
+    ]
+    collaborators = [
+        {
+            "login": f"user{n}",
+            "id": n,
+            "permissions": dict.fromkeys(("pull", "triage", "push"), True)
+            | dict.fromkeys(("maintain", "admin"), False),
+            "role_name": "write",
+        }
+        for n in range(args.count)
+    ]
+    want_label = models.Label(name="label", color="#00FF00").dict()
+    want_team = models.Team(name="Team", description="team").dict()
+
+    cases = {
+        "Label": (
+            lambda: models.LabelList.parse_obj(labels),
+            lambda: models.LabelList.from_api(labels),
+            lambda have: [
+                models.Label(**(label.dict() | want_label)) != label
+                for label in have.__root__
+            ],
+            lambda have: [label.diff(want_label) for label in have.__root__],
+        ),
+        "Team": (
+            lambda: [models.Team(**team) for team in teams],
+            lambda: [models.TeamData(team) for team in teams],
+            lambda have: [
+                models.Team(**(team.dict() | want_team)) != team for team in have
+            ],
+            lambda have: [team.diff(want_team) for team in have],
+        ),
+        "CollaboratorListResponse": (
+            lambda: models.CollaboratorList.parse_obj(collaborators),
+            lambda: models.CollaboratorList.from_api(collaborators),
+            lambda have: [
+                c.permissions != models.permNameToMap["push"] for c in have.__root__
+            ],
+            lambda have: [c.permission != "push" for c in have.__root__],
+        ),
+    }
+
+    print(f"{args.count} objects of each kind, times in ms")
+    print(f"{'':26} {'build':>9} {'compare':>9} {'build':>9} {'compare':>9}")
+    print(f"{'':26} {'(model)':>9} {'(model)':>9} {'(record)':>9} {'(record)':>9}")
+    for name, (parse, load, compare, diff) in cases.items():
+        parse_time, parsed = timed(parse)
+        compare_time, _ = timed(lambda: compare(parsed))
+        load_time, loaded = timed(load)
+        diff_time, _ = timed(lambda: diff(loaded))
+        print(
+            f"{name:26} {parse_time * 1000:9.1f} {compare_time * 1000:9.1f}"
+            f" {load_time * 1000:9.1f} {diff_time * 1000:9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
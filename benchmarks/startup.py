@@ -0,0 +1,140 @@
+"""Measure the import time and payload size of the collection's modules.
+
+Import times are the best of several runs of a fresh interpreter, so
+they include everything a module pays for on a target host before it
+does any work. When ghapi is installed, they are compared against what
+github_helper imported before this collection had a client of its own:
+ghapi.all and github_models.
+
+The payload is what AnsiballZ ships for each module: the module and the
+collection module_utils it imports, zip-compressed. With ``--against``,
+it is compared against the payload of the same module at another git
+revision (ghapi itself was never shipped, but had to be installed on
+every target host).
+
+usage: python benchmarks/startup.py [--runs N] [--against REV]
+"""
+
+import argparse
+import io
+import os
+import re
+import subprocess
+import sys
+import time
+import zipfile
+
+from common import ROOT, collection_path
+
+PREFIX = "ansible_collections.oddbit.github."
+IMPORT_RE = re.compile(
+    r"ansible_collections\.oddbit\.github\.plugins\.module_utils\.(\w+)"
+)
+
+
+def import_time(path, stmt, runs):
+    """Return the best wall time, in seconds, of running ``stmt``."""
+
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", stmt],
+            check=True,
+            env=dict(os.environ, PYTHONPATH=path),
+        )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def read_file(path, rev=None):
+    """Return the content of ``path`` (relative to ROOT), at ``rev`` if given."""
+
+    if rev is None:
+        with open(os.path.join(ROOT, path), "rb") as fd:
+            return fd.read()
+    return subprocess.run(
+        ["git", "show", f"{rev}:{path}"], cwd=ROOT, capture_output=True, check=True
+    ).stdout
+
+
+def module_utils(path, rev=None, seen=None):
+    """Return the collection module_utils imported by the file at path."""
+
+    seen = set() if seen is None else seen
+    for name in IMPORT_RE.findall(read_file(path, rev).decode()):
+        if name not in seen:
+            seen.add(name)
+            module_utils(
+                os.path.join("plugins", "module_utils", f"{name}.py"), rev, seen
+            )
+    return seen
+
+
+def payload_size(module, rev=None):
+    path = os.path.join("plugins", "modules", f"{module}.py")
+    files = [path] + [
+        os.path.join("plugins", "module_utils", f"{name}.py")
+        for name in module_utils(path, rev)
+    ]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in files:
+            zf.writestr(name, read_file(name, rev))
+    return len(buf.getvalue())
+
+
+def have(module):
+    return (
+        subprocess.run(
+            [sys.executable, "-c", f"import {module}"], capture_output=True
+        ).returncode
+        == 0
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--against", metavar="REV", help="compare payloads against a git revision"
+    )
+    args = parser.parse_args()
+
+    with collection_path() as path:
+        baseline = import_time(path, "import ansible.module_utils.basic", args.runs)
+        print(f"{'ansible.module_utils.basic (baseline)':45} {baseline * 1000:8.1f} ms")
+
+        stmts = {
+            "github_helper": f"import {PREFIX}plugins.module_utils.github_helper",
+        }
+        if have("ghapi.all"):
+            stmts["ghapi.all + github_models (previous client)"] = (
+                f"import ansible.module_utils.basic, ghapi.all,"
+                f" {PREFIX}plugins.module_utils.github_models"
+            )
+        for name, stmt in stmts.items():
+            elapsed = import_time(path, stmt, args.runs)
+            print(
+                f"{name:45} {elapsed * 1000:8.1f} ms"
+                f" (+{(elapsed - baseline) * 1000:.1f} ms)"
+            )
+
+    print()
+    for name in sorted(os.listdir(os.path.join(ROOT, "plugins", "modules"))):
+        if name.endswith(".py"):
+            module = name[:-3]
+            line = f"{module:45} {payload_size(module) / 1024:8.1f} KiB"
+            if args.against:
+                try:
+                    before = payload_size(module, args.against)
+                except subprocess.CalledProcessError:
+                    line += f" (not in {args.against})"
+                else:
+                    line += f" ({args.against}: {before / 1024:.1f} KiB)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
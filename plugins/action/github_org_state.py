@@ -0,0 +1,7 @@
+from ansible_collections.oddbit.github.plugins.plugin_utils.github_action import (
+    GithubAction,
+)
+
+
+class ActionModule(GithubAction):
+    pass
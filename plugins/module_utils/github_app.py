@@ -0,0 +1,116 @@
+"""Authentication as a GitHub App installation.
+
+A GitHub App signs a short-lived JSON Web Token with its private key and
+exchanges it for an installation access token, which is then used like a
+personal token. Installation tokens are valid for an hour, so they are
+kept in the on-disk store and shared by the tasks of a playbook; only the
+first task (and the first after the token is about to expire) pays for
+the exchange.
+"""
+
+import base64
+import datetime
+import importlib.util
+import json
+import os
+import time
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+
+# cryptography is only imported to sign an app's JWT, since loading it
+# costs every module run that authenticates with a token.
+HAS_CRYPTOGRAPHY = importlib.util.find_spec("cryptography") is not None
+
+# GitHub accepts app tokens that expire at most ten minutes after they
+# were issued; the issue time is backdated to allow for clock drift.
+JWT_LIFETIME = 540
+JWT_BACKDATE = 60
+
+# Installation tokens are renewed this many seconds before they expire,
+# so that a token read from the store outlives the task that reads it.
+TOKEN_MARGIN = 300
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def app_jwt(app_id, private_key, now=None):
+    """Return a JWT that authenticates as the app ``app_id``.
+
+    ``private_key`` is the PEM encoded private key of the app.
+    """
+
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    now = int(time.time() if now is None else now)
+    key = serialization.load_pem_private_key(private_key.encode(), password=None)
+    header = {"alg": "RS256", "typ": "JWT"}
+    payload = {
+        "iat": now - JWT_BACKDATE,
+        "exp": now + JWT_LIFETIME,
+        "iss": str(app_id),
+    }
+    signing_input = b".".join(
+        b64url(json.dumps(part, separators=(",", ":")).encode())
+        for part in (header, payload)
+    )
+    signature = key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+    return (signing_input + b"." + b64url(signature)).decode()
+
+
+def parse_time(value):
+    return (
+        datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+        .replace(tzinfo=datetime.timezone.utc)
+        .timestamp()
+    )
+
+
+def mint_token(api, app_id, private_key, installation_id=None, org=None):
+    """Exchange a JWT for an installation access token.
+
+    The installation is ``installation_id`` or, if that is not given, the
+    installation of the app in ``org``. Returns the token and the time at
+    which it expires.
+    """
+
+    headers = {"Authorization": f"Bearer {app_jwt(app_id, private_key)}"}
+    if installation_id is None:
+        installation_id = api.apps.get_org_installation(org=org, headers=headers)["id"]
+
+    res = api.apps.create_installation_access_token(
+        installation_id=installation_id, headers=headers
+    )
+    return {"token": res["token"], "expires": parse_time(res["expires_at"])}
+
+
+def installation_token(
+    api, app_id, private_key, installation_id=None, org=None, store=None
+):
+    """Return an installation access token, minting one if needed.
+
+    Returns the token and the time at which it expires, as mint_token
+    does. With a ``store`` (a TTLStore), the token is kept there until
+    TOKEN_MARGIN seconds before it expires. Tokens are minted under a lock
+    so that parallel forks starting together make one exchange between
+    them.
+    """
+
+    if store is None:
+        return mint_token(api, app_id, private_key, installation_id, org)
+
+    key = (
+        "app-token",
+        api.gh_host,
+        app_id,
+        installation_id if installation_id is not None else org.lower(),
+    )
+    with github_cache.locked(os.path.join(store.root, ".app-token.lock")):
+        data = store.get(key)
+        if data is None:
+            data = mint_token(api, app_id, private_key, installation_id, org)
+            store.put(key, data, data["expires"] - time.time() - TOKEN_MARGIN)
+
+    return data
@@ -0,0 +1,245 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from urllib.parse import urlsplit
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "oddbit.github")
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@contextlib.contextmanager
+def locked(path, blocking=True):
+    """Hold an exclusive flock on ``path`` for the duration of the block.
+
+    Yields False (without blocking) if ``blocking`` is False and another
+    process already holds the lock.
+    """
+
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    with open(path, "a") as fd:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def read_json(path):
+    try:
+        with open(path) as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    """Atomically replace ``path`` with the JSON encoding of ``data``.
+
+    Readers in other processes see either the old or the new content,
+    never a partial write.
+    """
+
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, mode=0o700, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fp:
+            json.dump(data, fp)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+# The sub-resources of a repository or team whose writes also change
+# other listings of it (adding a collaborator may invite them instead).
+RELATED_LISTINGS = {
+    "collaborators": ("invitations",),
+    "memberships": ("members", "invitations"),
+}
+
+
+def cache_scopes(path):
+    """Return the cache scopes for an API path.
+
+    The first scope is the one under which a GET of ``path`` is stored.
+    Repositories and teams are scoped on their own, and each of their
+    listings (e.g. ``repos/{owner}/{repo}/labels``) separately, including
+    the objects in it; other paths are scoped by the owner's listing they
+    name (e.g. ``orgs/{org}/repos``). A write to ``path`` invalidates all
+    of the returned scopes: its own, and the other listings the object
+    written appears in.
+    """
+
+    parts = [part.lower() for part in urlsplit(path).path.strip("/").split("/")]
+
+    if parts[0] == "repos" and len(parts) >= 3:
+        owner = parts[1]
+        parent, rest = "/".join(parts[:3]), parts[3:]
+        listings = [f"orgs/{owner}/repos", f"users/{owner}/repos", "user/repos"]
+    elif parts[0] == "orgs" and len(parts) >= 4 and parts[2] == "teams":
+        parent, rest = "/".join(parts[:4]), parts[4:]
+        listings = [f"orgs/{parts[1]}/teams"]
+    elif parts[0] in ("orgs", "users") and len(parts) >= 2:
+        return ["/".join(parts[:3])]
+    else:
+        return ["/".join(parts[:2])]
+
+    if not rest:
+        return [parent] + listings
+
+    scopes = [f"{parent}/{rest[0]}"]
+    scopes += [f"{parent}/{related}" for related in RELATED_LISTINGS.get(rest[0], ())]
+    if parent.startswith("orgs/") and rest[0] == "repos" and len(rest) >= 3:
+        # The repository's own listing of its teams.
+        scopes.append(f"repos/{rest[1]}/{rest[2]}/teams")
+    return scopes
+
+
+class TTLStore:
+    """Small JSON values kept on disk until they expire."""
+
+    def __init__(self, path):
+        self.root = path
+
+    def _path(self, key):
+        return os.path.join(self.root, digest(key)[:32] + ".json")
+
+    def get(self, key):
+        entry = read_json(self._path(key))
+        if entry is None or entry.get("expires", 0) < time.time():
+            return None
+        return entry["value"]
+
+    def put(self, key, value, ttl):
+        with contextlib.suppress(OSError):
+            write_json(self._path(key), {"expires": time.time() + ttl, "value": value})
+
+    def delete(self, key):
+        with contextlib.suppress(OSError):
+            os.unlink(self._path(key))
+
+
+class ResponseCache:
+    """An on-disk cache of GET responses used for conditional requests.
+
+    Entries are stored per token identity, grouped by the scopes returned
+    from ``cache_scopes``, so that a write can drop the responses it may
+    have made stale by removing a directory. All writes are atomic renames,
+    so parallel Ansible forks can share a cache directory without
+    coordination; only invalidation and eviction take a lock.
+    """
+
+    def __init__(self, path, identity, max_size=64 * 1024 * 1024):
+        self.root = os.path.join(path, "responses", digest(identity)[:16])
+        self.lockfile = os.path.join(self.root, ".lock")
+        self.max_size = max_size
+        self.dirty = False
+
+    def _scope_dir(self, scope):
+        return os.path.join(self.root, digest(scope)[:16])
+
+    def _entry_path(self, scope, key):
+        return os.path.join(self._scope_dir(scope), digest(key)[:32] + ".json")
+
+    def get(self, scope, key):
+        path = self._entry_path(scope, key)
+        entry = read_json(path)
+        if entry is None or entry.get("key") != key:
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)
+
+        return entry
+
+    def put(self, scope, key, body, headers):
+        entry = {
+            "key": key,
+            "body": body,
+            "headers": headers,
+            "stored": time.time(),
+        }
+
+        try:
+            write_json(self._entry_path(scope, key), entry)
+        except OSError:
+            return
+
+        self.dirty = True
+
+    def invalidate(self, scopes):
+        with locked(self.lockfile):
+            for scope in scopes:
+                path = self._scope_dir(scope)
+                stale = os.path.join(self.root, f".stale-{uuid.uuid4().hex}")
+                try:
+                    os.rename(path, stale)
+                except OSError:
+                    continue
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def prune(self):
+        """Evict least recently used entries until the cache fits in max_size.
+
+        Eviction is skipped if another process is already pruning.
+        """
+
+        if not self.dirty:
+            return
+
+        with locked(self.lockfile, blocking=False) as acquired:
+            if not acquired:
+                return
+
+            entries = []
+            total = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+
+            if total <= self.max_size:
+                return
+
+            # Evict down to 80% of the limit so that we aren't pruning
+            # again on every run.
+            for _, size, path in sorted(entries):
+                if total <= self.max_size * 0.8:
+                    break
+                with contextlib.suppress(OSError):
+                    os.unlink(path)
+                    total -= size
+
+        self.dirty = False
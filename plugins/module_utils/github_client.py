@@ -0,0 +1,331 @@
+"""A small GitHub REST client covering the endpoints this collection uses.
+
+ghapi builds its client from the metadata of the entire GitHub API, and
+importing it (together with fastcore) took a large share of the run
+time of a short task. This module describes only the endpoints the
+modules call, with the same names and calling conventions as ghapi, so
+that ``api.repos.get(owner=..., repo=...)`` and friends work unchanged.
+
+Errors are the same classes fastcore raises: every HTTP error is a
+``urllib.error.HTTPError``, and 4xx errors are instances of
+``HTTP4xxClientError`` subclasses such as ``HTTP404NotFoundError``.
+"""
+
+import abc
+import urllib.error
+
+HTTPError = urllib.error.HTTPError
+
+# HTTP client errors, for which fastcore (and therefore this module)
+# raises a specific exception class.
+HTTP_ERRORS = {
+    400: "Bad Request",
+    401: "Unauthorized",
+    402: "Payment Required",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    406: "Not Acceptable",
+    407: "Proxy Auth Required",
+    408: "Request Timeout",
+    409: "Conflict",
+    410: "Gone",
+    411: "Length Required",
+    412: "Precondition Failed",
+    413: "Payload Too Large",
+    414: "URI Too Long",
+    415: "Unsupported Media Type",
+    416: "Range Not Satisfiable",
+    417: "Expectation Failed",
+    418: "Am A teapot",
+    421: "Misdirected Request",
+    422: "Unprocessable Entity",
+    423: "Locked",
+    424: "Failed Dependency",
+    425: "Too Early",
+    426: "Upgrade Required",
+    428: "Precondition Required",
+    429: "Too Many Requests",
+    431: "Header Fields Too Large",
+    451: "Legal Reasons",
+}
+
+
+class HTTP4xxClientError(HTTPError):
+    "Base class for client exceptions (code 4xx)"
+
+
+def _error_class(code, msg):
+    name = f"HTTP{code}{msg.replace(' ', '')}Error"
+
+    def __init__(self, url, hdrs, fp, msg=msg):
+        HTTP4xxClientError.__init__(self, url, code, msg, hdrs, fp)
+
+    return type(name, (HTTP4xxClientError,), {"__init__": __init__})
+
+
+ExceptionsHTTP = {code: _error_class(code, msg) for code, msg in HTTP_ERRORS.items()}
+globals().update({cls.__name__: cls for cls in ExceptionsHTTP.values()})
+HTTP404NotFoundError = ExceptionsHTTP[404]
+
+
+class AttrDict(dict):
+    """A dict whose items can also be read as attributes."""
+
+    def __getattr__(self, k):
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k) from None
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(self)
+
+
+def dict2obj(d):
+    """Convert dicts (including those nested in lists) to AttrDicts."""
+
+    if isinstance(d, dict):
+        return AttrDict({k: dict2obj(v) for k, v in d.items()})
+    if isinstance(d, list):
+        return [dict2obj(v) for v in d]
+    return d
+
+
+REPO_FIELDS = (
+    "name description homepage private visibility has_issues has_projects "
+    "has_wiki has_downloads has_discussions is_template allow_squash_merge "
+    "allow_merge_commit allow_rebase_merge allow_auto_merge "
+    "delete_branch_on_merge use_squash_pr_title_as_default "
+    "squash_merge_commit_title squash_merge_commit_message merge_commit_title "
+    "merge_commit_message"
+)
+
+PAGED = "per_page page"
+
+# Each endpoint is (verb, path, query parameters, body fields), named
+# and grouped as in ghapi. Arguments that are neither route parameters
+# nor listed here are dropped, as ghapi does.
+ENDPOINTS = {
+    "activity": {
+        "list_org_events_for_authenticated_user": (
+            "GET",
+            "/users/{username}/events/orgs/{org}",
+            PAGED,
+            "",
+        ),
+    },
+    "apps": {
+        "get_org_installation": ("GET", "/orgs/{org}/installation", "", ""),
+        "create_installation_access_token": (
+            "POST",
+            "/app/installations/{installation_id}/access_tokens",
+            "",
+            "repositories repository_ids permissions",
+        ),
+    },
+    "users": {
+        "get_authenticated": ("GET", "/user", "", ""),
+    },
+    "orgs": {
+        "list_members": ("GET", "/orgs/{org}/members", "filter role " + PAGED, ""),
+    },
+    "repos": {
+        "get": ("GET", "/repos/{owner}/{repo}", "", ""),
+        "update": (
+            "PATCH",
+            "/repos/{owner}/{repo}",
+            "",
+            REPO_FIELDS + " security_and_analysis default_branch allow_update_branch "
+            "archived allow_forking web_commit_signoff_required",
+        ),
+        "delete": ("DELETE", "/repos/{owner}/{repo}", "", ""),
+        "create_in_org": (
+            "POST",
+            "/orgs/{org}/repos",
+            "",
+            REPO_FIELDS + " team_id auto_init gitignore_template license_template "
+            "custom_properties",
+        ),
+        "create_for_authenticated_user": (
+            "POST",
+            "/user/repos",
+            "",
+            REPO_FIELDS + " team_id auto_init gitignore_template license_template",
+        ),
+        "list_for_org": (
+            "GET",
+            "/orgs/{org}/repos",
+            "type sort direction " + PAGED,
+            "",
+        ),
+        "list_collaborators": (
+            "GET",
+            "/repos/{owner}/{repo}/collaborators",
+            "affiliation permission " + PAGED,
+            "",
+        ),
+        "add_collaborator": (
+            "PUT",
+            "/repos/{owner}/{repo}/collaborators/{username}",
+            "",
+            "permission",
+        ),
+        "remove_collaborator": (
+            "DELETE",
+            "/repos/{owner}/{repo}/collaborators/{username}",
+            "",
+            "",
+        ),
+        "list_invitations": ("GET", "/repos/{owner}/{repo}/invitations", PAGED, ""),
+        "update_invitation": (
+            "PATCH",
+            "/repos/{owner}/{repo}/invitations/{invitation_id}",
+            "",
+            "permissions",
+        ),
+        "delete_invitation": (
+            "DELETE",
+            "/repos/{owner}/{repo}/invitations/{invitation_id}",
+            "",
+            "",
+        ),
+    },
+    "issues": {
+        "list_labels_for_repo": ("GET", "/repos/{owner}/{repo}/labels", PAGED, ""),
+        "create_label": (
+            "POST",
+            "/repos/{owner}/{repo}/labels",
+            "",
+            "name color description",
+        ),
+        "update_label": (
+            "PATCH",
+            "/repos/{owner}/{repo}/labels/{name}",
+            "",
+            "new_name color description",
+        ),
+        "delete_label": ("DELETE", "/repos/{owner}/{repo}/labels/{name}", "", ""),
+    },
+    "teams": {
+        "list": ("GET", "/orgs/{org}/teams", PAGED, ""),
+        "create": (
+            "POST",
+            "/orgs/{org}/teams",
+            "",
+            "name description maintainers repo_names privacy notification_setting "
+            "permission parent_team_id",
+        ),
+        "get_by_name": ("GET", "/orgs/{org}/teams/{team_slug}", "", ""),
+        "update_in_org": (
+            "PATCH",
+            "/orgs/{org}/teams/{team_slug}",
+            "",
+            "name description privacy notification_setting permission "
+            "parent_team_id",
+        ),
+        "delete_in_org": ("DELETE", "/orgs/{org}/teams/{team_slug}", "", ""),
+        "list_members_in_org": (
+            "GET",
+            "/orgs/{org}/teams/{team_slug}/members",
+            "role " + PAGED,
+            "",
+        ),
+        "list_pending_invitations_in_org": (
+            "GET",
+            "/orgs/{org}/teams/{team_slug}/invitations",
+            PAGED,
+            "",
+        ),
+        "add_or_update_membership_for_user_in_org": (
+            "PUT",
+            "/orgs/{org}/teams/{team_slug}/memberships/{username}",
+            "",
+            "role",
+        ),
+        "remove_membership_for_user_in_org": (
+            "DELETE",
+            "/orgs/{org}/teams/{team_slug}/memberships/{username}",
+            "",
+            "",
+        ),
+    },
+}
+
+
+class Endpoint:
+    """One API operation, called like a ghapi operation.
+
+    Positional arguments fill the route parameters, then the query
+    parameters, then the body fields, in order.
+    """
+
+    __slots__ = ("client", "verb", "path", "route", "params", "fields")
+
+    def __init__(self, client, verb, path, params, fields):
+        self.client = client
+        self.verb = verb
+        self.path = path
+        self.route = [part.split("}")[0] for part in path.split("{")[1:] if "}" in part]
+        self.params = params.split()
+        self.fields = fields.split()
+
+    def __call__(self, *args, headers=None, **kwargs):
+        names = [
+            name
+            for name in self.route + self.params + self.fields
+            if name not in kwargs
+        ]
+        kwargs.update(zip(names, args))
+        route, query, data = (
+            {name: kwargs[name] for name in names if name in kwargs}
+            for names in (self.route, self.params, self.fields)
+        )
+        return self.client(
+            self.path,
+            self.verb,
+            headers=headers,
+            route=route,
+            query=query,
+            data=data,
+        )
+
+
+class EndpointGroup:
+    __slots__ = ("client", "endpoints")
+
+    def __init__(self, client, endpoints):
+        self.client = client
+        self.endpoints = endpoints
+
+    def __getattr__(self, name):
+        try:
+            verb, path, params, fields = self.endpoints[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return Endpoint(self.client, verb, path, params, fields)
+
+
+class Client(abc.ABC):
+    """The endpoint groups of the GitHub API, e.g. ``client.repos``.
+
+    Subclasses implement ``__call__`` to send requests; that is the only
+    method an Endpoint calls.
+    """
+
+    def __init__(self, token=None, gh_host=None):
+        self.gh_host = gh_host or "https://api.github.com"
+        self.headers = {"Accept": "application/vnd.github.v3+json"}
+        if token:
+            self.headers["Authorization"] = "token " + token
+
+    def __getattr__(self, name):
+        if name in ENDPOINTS:
+            return EndpointGroup(self, ENDPOINTS[name])
+        raise AttributeError(name)
+
+    @abc.abstractmethod
+    def __call__(
+        self, path, verb=None, headers=None, route=None, query=None, data=None
+    ):
+        """Send a request for ``path`` and return the decoded response."""
@@ -0,0 +1,288 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
+
+# GraphQL collaborator permissions and the REST role names they map to.
+PERMISSION_ROLES = {
+    "READ": "read",
+    "TRIAGE": "triage",
+    "WRITE": "write",
+    "MAINTAIN": "maintain",
+    "ADMIN": "admin",
+}
+
+PERMISSION_NAMES = {
+    "READ": "pull",
+    "TRIAGE": "triage",
+    "WRITE": "push",
+    "MAINTAIN": "maintain",
+    "ADMIN": "admin",
+}
+
+# Top level objects whose connections we page through. Each entry is
+# the selection (with {n} standing in for the alias index and {conn} for
+# the connection), the names of its String! arguments, and the path from
+# the aliased result to the object that holds the connection.
+ROOTS = {
+    "repository": (
+        "repository(owner: $owner{n}, name: $name{n}) {{ {conn} }}",
+        ("owner", "name"),
+        [],
+    ),
+    "team": (
+        "organization(login: $org{n}) {{ team(slug: $slug{n}) {{ {conn} }} }}",
+        ("org", "slug"),
+        ["team"],
+    ),
+}
+
+
+class GraphQLError(Exception):
+    pass
+
+
+class GraphQLReader:
+    """Batched reads of labels, collaborators and team members.
+
+    Each method accepts many repositories or teams and fetches them with
+    one aliased GraphQL query per batch of ``batch_size`` objects, paging
+    through every connection. Objects that GraphQL cannot serve (because
+    the endpoint is unavailable or returned an error for that object) are
+    read using the REST API instead, so callers always get a complete
+    result in the form of the existing github_models (holding records,
+    since the data comes from the API). Objects the client's snapshot
+    holds are read through the REST API too, which answers them from the
+    snapshot without a request.
+    """
+
+    def __init__(self, api, batch_size=25, workers=8):
+        self.api = api
+        self.batch_size = batch_size
+        self.workers = workers
+        self.available = True
+
+    @property
+    def endpoint(self):
+        host = self.api.gh_host.rstrip("/")
+        if host.endswith("/api/v3"):
+            return host[: -len("/v3")] + "/graphql"
+        return host + "/graphql"
+
+    def query(self, query, variables):
+        res = self.api(
+            self.endpoint, "POST", data={"query": query, "variables": variables}
+        )
+        if res.get("data") is None:
+            raise GraphQLError(res.get("errors"))
+        return res["data"]
+
+    def paginate(self, root, targets, connection, fields, arguments=""):
+        """Fetch every edge of ``connection`` for each of ``targets``.
+
+        ``targets`` maps a key to the argument values for ``root`` (one of
+        ``ROOTS``); ``arguments`` are passed through to the connection.
+        Returns a dict mapping each key to its list of edges,
+        or to None if GraphQL could not serve it.
+        """
+
+        selection, argnames, path = ROOTS[root]
+        edges = {key: [] for key in targets}
+        cursors = {key: None for key in targets}
+
+        while cursors and self.available:
+            pending = list(cursors)
+            for i in range(0, len(pending), self.batch_size):
+                batch = pending[i : i + self.batch_size]
+                decls = []
+                selections = []
+                variables = {}
+                for n, key in enumerate(batch):
+                    for name, value in zip(argnames, targets[key]):
+                        decls.append(f"${name}{n}: String!")
+                        variables[f"{name}{n}"] = value
+                    decls.append(f"$after{n}: String")
+                    variables[f"after{n}"] = cursors[key]
+                    conn = (
+                        f"{connection}(first: 100, after: $after{n}{arguments}) "
+                        f"{{ edges {{ {fields} }} pageInfo {{ hasNextPage endCursor }} }}"
+                    )
+                    selections.append(f"r{n}: " + selection.format(n=n, conn=conn))
+
+                query = f"query({', '.join(decls)}) {{ {' '.join(selections)} }}"
+                try:
+                    data = self.query(query, variables)
+                except (github_helper.HTTPError, GraphQLError) as err:
+                    # Fall back to REST for this batch. If the endpoint
+                    # itself failed, stop trying GraphQL altogether.
+                    for key in batch:
+                        edges[key] = None
+                        del cursors[key]
+                    if isinstance(err, github_helper.HTTPError):
+                        self.available = False
+                        break
+                    continue
+
+                for n, key in enumerate(batch):
+                    node = data.get(f"r{n}")
+                    for step in path:
+                        node = node and node.get(step)
+                    # With a partial error (such as a FORBIDDEN connection
+                    # when the token lacks push access), the node or its
+                    # connection is null; REST is tried instead.
+                    if node is None or node.get(connection) is None:
+                        edges[key] = None
+                        del cursors[key]
+                        continue
+
+                    edges[key].extend(node[connection]["edges"])
+                    page = node[connection]["pageInfo"]
+                    if page["hasNextPage"]:
+                        cursors[key] = page["endCursor"]
+                    else:
+                        del cursors[key]
+
+        for key in cursors:
+            edges[key] = None
+
+        return edges
+
+    def in_snapshot(self, keys, path, query=None):
+        """Return the keys for which the client's snapshot answers ``path(key)``."""
+
+        snapshot = getattr(self.api, "snapshot", None)
+        if snapshot is None:
+            return set()
+        return {key for key in keys if snapshot.has(path(key), query)}
+
+    def fallback(self, results, func):
+        """Fill the None entries in ``results`` by calling ``func(key)``."""
+
+        missing = [key for key, value in results.items() if value is None]
+        for key, value, err in github_helper.run_concurrently(
+            func, missing, self.workers
+        ):
+            if err is not None:
+                raise err
+            results[key] = value
+
+        return results
+
+    def labels(self, repos):
+        """Return a dict mapping each (owner, name) in ``repos`` to a LabelList."""
+
+        cached = self.in_snapshot(
+            repos, lambda repo: f"/repos/{repo[0]}/{repo[1]}/labels"
+        )
+        edges = self.paginate(
+            "repository",
+            {repo: repo for repo in repos if repo not in cached},
+            "labels",
+            "node { name description color }",
+        )
+        results = {
+            repo: (
+                None
+                if found is None
+                else github_models.LabelList.from_api(edge["node"] for edge in found)
+            )
+            for repo, found in edges.items()
+        }
+        results.update(dict.fromkeys(cached))
+
+        def rest(repo):
+            owner, name = repo
+            return github_models.LabelList.from_api(
+                github_helper.flatten(
+                    self.api.issues.list_labels_for_repo, owner=owner, repo=name
+                )
+            )
+
+        return self.fallback(results, rest)
+
+    def collaborators(self, repos, affiliation="all"):
+        """Return a dict mapping each (owner, name) in ``repos`` to a CollaboratorList."""
+
+        cached = self.in_snapshot(
+            repos,
+            lambda repo: f"/repos/{repo[0]}/{repo[1]}/collaborators",
+            {"affiliation": affiliation},
+        )
+        edges = self.paginate(
+            "repository",
+            {repo: repo for repo in repos if repo not in cached},
+            "collaborators",
+            "permission node { login }",
+            arguments=f", affiliation: {affiliation.upper()}",
+        )
+        results = {
+            repo: (
+                None
+                if found is None
+                else github_models.CollaboratorList.from_api(
+                    {
+                        "login": edge["node"]["login"],
+                        "permission": PERMISSION_NAMES[edge["permission"]],
+                        "role_name": PERMISSION_ROLES[edge["permission"]],
+                    }
+                    for edge in found
+                )
+            )
+            for repo, found in edges.items()
+        }
+        results.update(dict.fromkeys(cached))
+
+        def rest(repo):
+            owner, name = repo
+            return github_models.CollaboratorList.from_api(
+                github_helper.flatten(
+                    self.api.repos.list_collaborators,
+                    owner=owner,
+                    repo=name,
+                    affiliation=affiliation,
+                )
+            )
+
+        return self.fallback(results, rest)
+
+    def team_members(self, org, slugs):
+        """Return the members of each team in ``slugs``, by role.
+
+        The result maps each slug to a dict with ``maintainer`` and
+        ``member`` lists of UserData records.
+        """
+
+        cached = self.in_snapshot(
+            slugs, lambda slug: f"/orgs/{org}/teams/{slug}/members", {"role": "member"}
+        )
+        edges = self.paginate(
+            "team",
+            {slug: (org, slug) for slug in slugs if slug not in cached},
+            "members",
+            "role node { login name email }",
+        )
+        results = {}
+        for slug, found in edges.items():
+            if found is None:
+                results[slug] = None
+                continue
+            results[slug] = {"maintainer": [], "member": []}
+            for edge in found:
+                results[slug][edge["role"].lower()].append(
+                    github_models.UserData(edge["node"])
+                )
+        results.update(dict.fromkeys(cached))
+
+        def rest(slug):
+            return {
+                role: [
+                    github_models.UserData(member)
+                    for member in github_helper.flatten(
+                        self.api.teams.list_members_in_org,
+                        org=org,
+                        team_slug=slug,
+                        role=role,
+                    )
+                ]
+                for role in ("maintainer", "member")
+            }
+
+        return self.fallback(results, rest)
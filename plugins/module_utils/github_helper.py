@@ -1,29 +1,956 @@
-import ghapi.all
+import base64
+import collections
+import concurrent.futures
+import gzip
+import http.client
+import io
+import itertools
+import json
+import os
+import random
+import re
+import ssl
+import threading
+import time
+import unicodedata
+import urllib.error
+import urllib.request
+
+from urllib.parse import parse_qs, quote, unquote, urlencode, urljoin, urlsplit
 
-from fastcore.net import HTTPError  # noqa: F401
-from fastcore.net import HTTP404NotFoundError  # noqa: F401
 from ansible.module_utils.basic import env_fallback
 
-from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import AnsibleModule, missing_required_lib
 
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+import ansible_collections.oddbit.github.plugins.module_utils.github_client as github_client
 import ansible_collections.oddbit.github.plugins.module_utils.github_models as models
 
+from ansible_collections.oddbit.github.plugins.module_utils.github_client import (  # noqa: F401
+    HTTPError,
+    HTTP404NotFoundError,
+    dict2obj,
+)
+
+# github_app, github_journal, github_plan and github_snapshot are only
+# imported by the options that use them, so that the runs that do not
+# pay nothing for loading them.
+
+# Response headers worth keeping alongside a cached body.
+CACHED_HEADERS = ("content-type", "link", "etag", "last-modified")
+
+# One link of a Link header: <url>; rel="relation"
+LINK_RE = re.compile(r'<([^>]*)>;\s*rel="([^"]*)"')
+
+# How GitHub reports a name that is already taken in a 422 response.
+ALREADY_EXISTS_RE = re.compile(r"already[ _]exists")
+
+# Redirect statuses followed for GET and HEAD requests, as urllib would.
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+# Errors that mean a kept-alive connection was closed by the server
+# before it read the request.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# Responses that mean GitHub failed to answer, rather than refused the
+# request, and errors that mean the connection failed. Requests that can
+# safely be sent twice are retried after either.
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, http.client.HTTPException)
+
+# The counters RequestMetrics keeps for each endpoint.
+METRICS = (
+    "requests",
+    "pages",
+    "not_modified",
+    "errors",
+    "bytes_sent",
+    "bytes_received",
+    "latency",
+)
+
+# Clients kept between module runs in the same process, keyed by their
+# settings. Only modules with share_clients set (those run in the
+# controller by the collection's action plugins) use it.
+SHARED_CLIENTS = {}
+
+
+class Headers(dict):
+    """Response headers with case-insensitive lookups."""
+
+    def __init__(self, headers=()):
+        super().__init__((k.lower(), v) for k, v in dict(headers).items())
+
+    def __getitem__(self, k):
+        return super().__getitem__(k.lower())
+
+    def __contains__(self, k):
+        return super().__contains__(k.lower())
+
+    def get(self, k, default=None):
+        return super().get(k.lower(), default)
+
+
+class ConnectionPool:
+    """Persistent HTTP connections, kept open between requests.
+
+    Idle connections are kept per scheme, host and port, and the next
+    request to the same host reuses one instead of opening a new TCP and
+    TLS connection. At most ``maxsize`` idle connections are kept per
+    host, which should match the number of threads sending requests.
+
+    ``connect_timeout`` bounds establishing a connection and ``timeout``
+    bounds waiting for each response. Proxies are taken from the usual
+    ``*_proxy`` environment variables, as urllib does.
+
+    Responses compressed with gzip are decoded.
+    """
+
+    def __init__(self, timeout=60, connect_timeout=10, maxsize=8):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.maxsize = maxsize
+        self.context = ssl.create_default_context()
+        self.proxies = urllib.request.getproxies()
+
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.begin()
+
+    def begin(self):
+        """Start counting requests and connections for a new module run."""
+
+        with self.lock:
+            self.created = 0
+            self.reused = 0
+            self.requests = 0
+
+    def proxy(self, scheme, host):
+        proxy = self.proxies.get(scheme)
+        if proxy is None or urllib.request.proxy_bypass(host):
+            return None
+        return urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    def connect(self, key):
+        scheme, host, port = key
+        proxy = self.proxy(scheme, host)
+        cls = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
+        )
+        kwargs = {"context": self.context} if scheme == "https" else {}
+
+        if proxy is None:
+            conn = cls(host, port, timeout=self.connect_timeout, **kwargs)
+        elif scheme == "https":
+            conn = cls(
+                proxy.hostname, proxy.port or 80, timeout=self.connect_timeout, **kwargs
+            )
+            conn.set_tunnel(host, port, headers=self.proxy_headers(proxy))
+        else:
+            conn = http.client.HTTPConnection(
+                proxy.hostname, proxy.port or 80, timeout=self.connect_timeout
+            )
+
+        conn.connect()
+        conn.sock.settimeout(self.timeout)
+        conn.proxy = proxy
+        with self.lock:
+            self.created += 1
+        return conn
+
+    def proxy_headers(self, proxy):
+        if proxy.username is None:
+            return {}
+        credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+        return {
+            "Proxy-Authorization": "Basic "
+            + base64.b64encode(credentials.encode()).decode()
+        }
+
+    def acquire(self, key):
+        with self.lock:
+            if self.idle.get(key):
+                self.reused += 1
+                return self.idle[key].pop(), True
+        return self.connect(key), False
+
+    def release(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def urlopen(self, verb, url, headers, body=None, timeout=None):
+        """Send a request and return its status, reason, headers and body.
+
+        The last value returned is the size of the body as received,
+        before it was decompressed.
+        """
+
+        parts = urlsplit(url)
+        key = (
+            parts.scheme,
+            parts.hostname,
+            parts.port or (443 if parts.scheme == "https" else 80),
+        )
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+
+        while True:
+            conn, reused = self.acquire(key)
+            if conn.proxy is not None and parts.scheme == "http":
+                target = url
+                headers = {**headers, **self.proxy_headers(conn.proxy)}
+            try:
+                conn.sock.settimeout(timeout or self.timeout)
+                conn.request(verb, target, body=body, headers=headers)
+                res = conn.getresponse()
+                data = res.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+            with self.lock:
+                self.requests += 1
+            if res.will_close:
+                conn.close()
+            else:
+                self.release(key, conn)
+
+            hdrs = Headers(res.getheaders())
+            received = len(data)
+            if hdrs.get("Content-Encoding") == "gzip":
+                data = gzip.decompress(data)
+            return res.status, res.reason, hdrs, data, received
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "opened": self.created,
+            "reused": self.reused,
+        }
+
+    def close(self):
+        with self.lock:
+            for idle in self.idle.values():
+                for conn in idle:
+                    conn.close()
+            self.idle.clear()
+
+
+class RateLimitError(HTTPError):
+    """Raised when honoring a rate limit would mean waiting too long."""
+
+    def __init__(self, url, msg):
+        super().__init__(url, 403, msg, {}, None)
+
+
+class RateLimitScheduler:
+    """Pace requests according to GitHub's rate limit guidance.
+
+    The scheduler tracks the ``X-RateLimit-*`` and ``Retry-After`` headers
+    of every response. GitHub keeps a separate budget for each resource
+    (``core``, ``graphql``, ``search``); while one is spent, only the
+    requests charged to it are held, while a secondary rate limit holds
+    every request. Requests that fail for a transient reason are retried
+    after a jittered exponential ``backoff`` of at most ``max_backoff``
+    seconds, so that the forks that saw the same failure do not retry in
+    step. Its state lives in a lock-protected file shared by every process
+    using the same token, so parallel Ansible forks throttle together
+    rather than each tripping the secondary rate limit.
+
+    Mutating requests are started at least ``write_interval`` seconds
+    apart, as GitHub asks of clients that make many writes. Like the rest
+    of the state, the spacing is shared by every thread and fork, so it
+    caps the write rate of the whole run: modules that apply changes
+    concurrently overlap their reads and the round trips of their writes,
+    but make no more than one write per ``write_interval`` unless it is
+    lowered (0 turns the spacing off).
+    """
+
+    def __init__(
+        self,
+        path,
+        write_interval=1.0,
+        max_wait=900,
+        max_retries=3,
+        backoff=1.0,
+        max_backoff=30.0,
+    ):
+        self.statefile = path + ".json"
+        self.lockfile = path + ".lock"
+        self.write_interval = write_interval
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.lock = threading.Lock()
+        self.budgets = {}
+        self.begin()
+
+    def begin(self):
+        """Start counting waits and retries for a new module run."""
+
+        with self.lock:
+            self.waited = 0.0
+            self.retries = 0
+
+    def acquire(self, url, mutating):
+        with github_cache.locked(self.lockfile):
+            state = github_cache.read_json(self.statefile) or {}
+            now = time.time()
+            start = max(
+                now,
+                state.get("blocked_until", 0),
+                state.get("exhausted", {}).get(rate_limit_resource(url), 0),
+            )
+            if mutating:
+                start = max(start, state.get("next_write", 0))
+                state["next_write"] = start + self.write_interval
+                github_cache.write_json(self.statefile, state)
+
+        self.wait(url, start - now)
+
+    def wait(self, url, delay):
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise RateLimitError(
+                url,
+                f"rate limit would require waiting {delay:.0f} seconds "
+                f"(github_rate_limit_max_wait is {self.max_wait})",
+            )
+
+        with self.lock:
+            self.waited += delay
+        time.sleep(delay)
+
+    def update(self, headers, err=None, attempt=0):
+        """Record the rate limit state reported by a response.
+
+        Returns the number of seconds to wait before retrying the request
+        if ``err`` was caused by a rate limit, or None otherwise.
+        """
+
+        now = time.time()
+        resource = headers.get("X-RateLimit-Resource", "core")
+        with self.lock:
+            budget = self.budgets.setdefault(
+                resource, {"remaining": None, "limit": None, "reset": None}
+            )
+            if "X-RateLimit-Remaining" in headers:
+                budget.update(
+                    remaining=int(headers["X-RateLimit-Remaining"]),
+                    limit=int(headers.get("X-RateLimit-Limit", 0)) or budget["limit"],
+                    reset=int(headers.get("X-RateLimit-Reset", 0)) or budget["reset"],
+                )
+            exhausted_until = None
+            if budget["remaining"] == 0 and budget["reset"]:
+                exhausted_until = budget["reset"] + 1
+
+        # Only a request refused by a rate limit is retried; any other
+        # error would only be repeated.
+        retry_at = None
+        blocked_until = None
+        if err is not None and err.code in (403, 429):
+            if "Retry-After" in headers:
+                retry_at = blocked_until = now + int(headers["Retry-After"])
+            elif exhausted_until is not None:
+                retry_at = exhausted_until
+            elif "rate limit" in str(err.msg).lower():
+                # Secondary rate limits without a Retry-After header: wait at
+                # least a minute, backing off exponentially.
+                retry_at = blocked_until = now + 60 * 2**attempt
+
+        if blocked_until is not None or exhausted_until is not None:
+            with github_cache.locked(self.lockfile):
+                state = github_cache.read_json(self.statefile) or {}
+                if blocked_until is not None:
+                    state["blocked_until"] = max(
+                        state.get("blocked_until", 0), blocked_until
+                    )
+                if exhausted_until is not None:
+                    exhausted = state.setdefault("exhausted", {})
+                    exhausted[resource] = max(
+                        exhausted.get(resource, 0), exhausted_until
+                    )
+                github_cache.write_json(self.statefile, state)
+
+        if retry_at is not None:
+            return retry_at - now
+
+        return None
+
+    def backoff_delay(self, attempt):
+        """Return how long to wait before retrying after a transient error."""
+
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def summary(self):
+        with self.lock:
+            budgets = {
+                resource: dict(budget)
+                for resource, budget in sorted(self.budgets.items())
+            }
+        return {
+            "waited": round(self.waited, 3),
+            "retries": self.retries,
+            "budgets": budgets,
+        }
+
+
+class RequestMetrics:
+    """Measure the requests sent during a module run.
+
+    Every HTTP exchange (including retries, redirects and 304 responses)
+    is recorded against the endpoint the module called, named by its
+    method and path template, e.g. ``GET /repos/{owner}/{repo}``. Pages
+    are the responses that are part of a paged listing (those with a
+    Link header).
+
+    When given a ``trace`` path, each exchange is also appended to that
+    file as one line of JSON, so that the traces of all the tasks of a
+    playbook can be aggregated.
+    """
+
+    def __init__(self, trace=None):
+        self.trace = trace
+        self.lock = threading.Lock()
+        self.fd = None
+        self.begin()
+
+    def begin(self, module=None):
+        """Start counting requests for a new module run."""
+
+        with self.lock:
+            self.module = module
+            self.endpoints = {}
+            self.remaining = None
+
+    def record(self, endpoint, verb, url, status, elapsed, sent, received, hdrs):
+        name = f"{verb} {endpoint}"
+        paged = "link" in hdrs
+        if "x-ratelimit-remaining" in hdrs:
+            remaining = int(hdrs["x-ratelimit-remaining"])
+        else:
+            remaining = None
+
+        with self.lock:
+            counts = self.endpoints.get(name)
+            if counts is None:
+                counts = self.endpoints[name] = dict.fromkeys(METRICS, 0)
+            counts["requests"] += 1
+            counts["pages"] += paged
+            counts["not_modified"] += status == 304
+            counts["errors"] += status >= 400
+            counts["bytes_sent"] += sent
+            counts["bytes_received"] += received
+            counts["latency"] += elapsed
+            if remaining is not None:
+                self.remaining = remaining
+
+            if self.trace:
+                if self.fd is None:
+                    self.fd = open(self.trace, "a", buffering=1)
+                self.fd.write(
+                    json.dumps(
+                        {
+                            "time": round(time.time(), 3),
+                            "pid": os.getpid(),
+                            "module": self.module,
+                            "endpoint": name,
+                            "url": url,
+                            "status": status,
+                            "latency": round(elapsed, 4),
+                            "bytes_sent": sent,
+                            "bytes_received": received,
+                            "paged": paged,
+                            "rate_limit_remaining": remaining,
+                        }
+                    )
+                    + "\n"
+                )
+
+    def summary(self):
+        with self.lock:
+            endpoints = {
+                name: counts | {"latency": round(counts["latency"], 3)}
+                for name, counts in sorted(self.endpoints.items())
+            }
+        totals = {
+            key: sum(counts[key] for counts in endpoints.values()) for key in METRICS
+        }
+        totals["latency"] = round(totals["latency"], 3)
+        return totals | {
+            "rate_limit_remaining": self.remaining,
+            "endpoints": endpoints,
+        }
+
+
+def rate_limit_resource(url):
+    """Return the rate limit budget GitHub charges a request to."""
+
+    path = urlsplit(url).path
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def is_query(verb, url):
+    """Return True for requests that do not modify anything.
+
+    This collection only sends queries (never mutations) to the GraphQL
+    endpoint, so a POST there counts as a read.
+    """
+
+    return verb in ("GET", "HEAD") or (
+        verb == "POST" and urlsplit(url).path.endswith("/graphql")
+    )
+
+
+def can_resend(verb, url):
+    """Return True for requests that do no harm if GitHub gets them twice.
+
+    A POST that failed may still have created what it asked for, so it is
+    not sent again; everything else this collection sends sets state
+    rather than adding to it.
+    """
+
+    return verb != "POST" or is_query(verb, url)
+
+
+def already_exists(err):
+    """Return True if ``err`` is GitHub refusing to create a duplicate.
+
+    GitHub answers an attempt to create an object that already exists
+    (such as a repository or team with a name that is taken) with a 422
+    whose body says so.
+    """
+
+    return err.code == 422 and ALREADY_EXISTS_RE.search(str(err.msg)) is not None
+
+
+class GithubApi(github_client.Client):
+    """A GitHub client that sends every request through ``request``.
+
+    All of the ``self.api.*`` endpoint calls made by the modules end up in
+    ``__call__``, which makes this the one place to hook behavior that
+    applies to every request.
+
+    When given a ``cache``, GET requests are made conditional on the ETag
+    or Last-Modified value of the cached response. A 304 response (which
+    GitHub does not count against the rate limit) is answered from the
+    cache. Any other request invalidates the cached responses it may have
+    made stale.
+
+    When given a ``scheduler``, requests are paced, and rate limited
+    requests and those that fail for a transient reason (see
+    ``can_resend``) are retried as described in ``RateLimitScheduler``.
+
+    Requests are sent over the connections of ``pool`` (a new
+    ConnectionPool if none is given). Errors raise the HTTPError classes
+    of github_client.
+
+    When given ``metrics`` (a RequestMetrics), every request is recorded
+    there against the endpoint that was called.
+
+    When given a ``snapshot`` (a github_snapshot.Snapshot), GET requests
+    are answered from it when it can, and the responses carry an
+    X-Snapshot header instead of those of GitHub. Requests with a
+    ``Cache-Control: no-cache`` header always go to GitHub. Writes mark
+    what they change as stale in the snapshot.
+
+    When given a ``plan`` (a github_plan.PlanWriter), writes are recorded
+    there instead of being sent, and answered with the request's own route
+    parameters and data; the ETags of GET responses are kept as the
+    preconditions of those writes.
+
+    When given a ``journal`` (a github_journal.Journal), writes made with
+    a ``precondition`` are recorded there once they complete. A write the
+    journal holds with the same precondition is answered with the
+    response it recorded, with an X-Journal header, instead of being sent
+    again.
+
+    ``per_page`` and ``workers`` are the page size and number of threads
+    that ``flatten`` uses for listings made with this client.
+
+    The client may be shared between threads; ``recv_hdrs`` holds the
+    headers of the last response received by the calling thread.
+    """
+
+    def __init__(
+        self,
+        *args,
+        cache=None,
+        scheduler=None,
+        pool=None,
+        metrics=None,
+        snapshot=None,
+        plan=None,
+        journal=None,
+        per_page=100,
+        workers=8,
+        **kwargs,
+    ):
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.scheduler = scheduler
+        self.pool = pool or ConnectionPool()
+        self.metrics = metrics
+        self.snapshot = snapshot
+        self.plan = plan
+        self.journal = journal
+        self.per_page = per_page
+        self.workers = workers
+        self.identity = None
+        self.token_expires = None
+
+    @property
+    def recv_hdrs(self):
+        return getattr(self._local, "recv_hdrs", Headers())
+
+    @recv_hdrs.setter
+    def recv_hdrs(self, value):
+        self._local.recv_hdrs = value
+
+    def __call__(
+        self,
+        path,
+        verb=None,
+        headers=None,
+        route=None,
+        query=None,
+        data=None,
+        timeout=None,
+        precondition=None,
+    ):
+        if verb is None:
+            verb = "POST" if data else "GET"
+        verb = verb.upper()
+        headers = {**self.headers, **(headers or {})}
+        self._local.endpoint = (
+            urlsplit(path).path if path.startswith(("http://", "https://")) else path
+        )
+        if route:
+            path = path.format(**{k: quote(str(v), safe="") for k, v in route.items()})
+
+        url = path if path.startswith(("http://", "https://")) else self.gh_host + path
+        query = {k: v for k, v in (query or {}).items() if v is not None}
+        if self.plan is not None and not is_query(verb, url):
+            res = self.plan.add(verb, self._local.endpoint, path, route, query, data)
+            self.recv_hdrs = Headers({"X-Plan": "planned"})
+            return dict2obj(res)
+        key = None
+        if (
+            self.journal is not None
+            and precondition is not None
+            and not is_query(verb, url)
+        ):
+            import ansible_collections.oddbit.github.plugins.module_utils.github_journal as github_journal
+
+            key = self.journal.next_key(
+                github_journal.write_key(verb, url, query, data)
+            )
+            entry = self.journal.get(
+                key, lambda entry: entry["precondition"] == precondition
+            )
+            if entry is not None:
+                self.recv_hdrs = Headers({"X-Journal": "done"})
+                return dict2obj(entry["response"])
+        if self.snapshot is not None and not path.startswith(("http://", "https://")):
+            if verb != "GET":
+                if not is_query(verb, url):
+                    self.snapshot.invalidate(path)
+            elif "no-cache" not in headers.get("Cache-Control", ""):
+                res = self.snapshot.get(path, query)
+                if res is not None:
+                    self.recv_hdrs = Headers({"X-Snapshot": "hit"})
+                    return dict2obj(res)
+        if query:
+            url += "?" + urlencode(query)
+
+        res, self.recv_hdrs = self.request(
+            verb, url, path, headers=headers, data=data, timeout=timeout
+        )
+
+        ct = self.recv_hdrs.get("Content-Type", "")
+        if "json" in ct or "text" in ct:
+            res = res.decode()
+        if "json" in ct and res:
+            res = json.loads(res)
+
+        if (
+            self.plan is not None
+            and verb == "GET"
+            and "etag" in self.recv_hdrs
+            and str(query.get("page", 1)) == "1"
+        ):
+            self.plan.observe(path, url, self.recv_hdrs["etag"], res)
+
+        if key is not None:
+            self.journal.record(
+                key,
+                {
+                    "kind": "write",
+                    "verb": verb,
+                    "url": url,
+                    "precondition": precondition,
+                    "response": res.decode() if isinstance(res, bytes) else res,
+                },
+            )
+
+        return dict2obj(res) if isinstance(res, (dict, list)) else res
+
+    def request(self, verb, url, path, headers, data=None, timeout=None):
+        if self.cache is None or (verb != "GET" and is_query(verb, url)):
+            return self.send(verb, url, headers=headers, data=data, timeout=timeout)
+
+        scopes = github_cache.cache_scopes(path)
+        if verb != "GET":
+            try:
+                return self.send(verb, url, headers=headers, data=data, timeout=timeout)
+            finally:
+                self.cache.invalidate(scopes)
+
+        key = f"{headers.get('Accept')} {url}"
+        entry = self.cache.get(scopes[0], key)
+        if entry:
+            if "etag" in entry["headers"]:
+                headers["If-None-Match"] = entry["headers"]["etag"]
+            if "last-modified" in entry["headers"]:
+                headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+        try:
+            res, hdrs = self.send(verb, url, headers=headers, timeout=timeout)
+        except urllib.error.HTTPError as err:
+            if err.code != 304 or not entry:
+                raise
+
+            # A 304 carries current rate limit headers but no body.
+            hdrs = Headers(entry["headers"])
+            hdrs.update(Headers(err.headers))
+            return entry["body"].encode(), hdrs
+
+        if "etag" in hdrs or "last-modified" in hdrs:
+            self.cache.put(
+                scopes[0],
+                key,
+                res.decode(),
+                {k: hdrs[k] for k in CACHED_HEADERS if k in hdrs},
+            )
+
+        return res, hdrs
+
+    def send(self, verb, url, headers, data=None, timeout=None):
+        if self.scheduler is None:
+            return self.transmit(verb, url, headers, data=data, timeout=timeout)
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire(url, mutating=not is_query(verb, url))
+            try:
+                res, hdrs = self.transmit(
+                    verb, url, headers, data=data, timeout=timeout
+                )
+            except urllib.error.HTTPError as err:
+                delay = self.scheduler.update(Headers(err.headers), err, attempt)
+                if (
+                    delay is None
+                    and err.code in TRANSIENT_STATUSES
+                    and can_resend(verb, url)
+                ):
+                    delay = self.scheduler.backoff_delay(attempt)
+                if delay is None or attempt >= self.scheduler.max_retries:
+                    raise
+            except TRANSIENT_ERRORS:
+                if not can_resend(verb, url) or attempt >= self.scheduler.max_retries:
+                    raise
+                delay = self.scheduler.backoff_delay(attempt)
+            else:
+                self.scheduler.update(hdrs)
+                return res, hdrs
+
+            with self.scheduler.lock:
+                self.scheduler.retries += 1
+            self.scheduler.wait(url, delay)
+            attempt += 1
+
+    def transmit(self, verb, url, headers, data=None, timeout=None):
+        if isinstance(data, dict):
+            data = json.dumps(data).encode("ascii") if data else None
+        headers = {
+            "User-Agent": "oddbit.github",
+            "Accept-Encoding": "gzip",
+            **headers,
+        }
+
+        for _ in range(10):
+            start = time.monotonic()
+            status, reason, hdrs, res, received = self.pool.urlopen(
+                verb, url, headers, body=data, timeout=timeout
+            )
+            if self.metrics is not None:
+                self.metrics.record(
+                    getattr(self._local, "endpoint", None) or urlsplit(url).path,
+                    verb,
+                    url,
+                    status,
+                    time.monotonic() - start,
+                    len(data or b""),
+                    received,
+                    hdrs,
+                )
+            if (
+                status not in REDIRECT_STATUSES
+                or verb not in ("GET", "HEAD")
+                or "Location" not in hdrs
+            ):
+                break
+            location = urljoin(url, hdrs["Location"])
+            if urlsplit(location).netloc != urlsplit(url).netloc:
+                headers.pop("Authorization", None)
+            url = location
+
+        if status >= 300:
+            msg = f"{reason}\n====Error Body====\n{res.decode(errors='ignore')}"
+            if status in github_client.ExceptionsHTTP:
+                raise github_client.ExceptionsHTTP[status](
+                    url, hdrs, io.BytesIO(res), msg=msg
+                )
+            raise HTTPError(url, status, msg, hdrs, io.BytesIO(res))
+
+        return res, hdrs
+
 
 class GithubModule(AnsibleModule):
+    # Reuse the client (and with it the authenticated identity and rate
+    # limit state) of an earlier run in this process with the same
+    # settings.
+    share_clients = False
+
     def __init__(self, **kwargs):
         argspec = self.common_args() | self.module_args()
-        super().__init__(argspec)
+        super().__init__(
+            argspec,
+            required_one_of=[("github_token", "github_app_id")],
+            required_together=[("github_app_id", "github_app_private_key")],
+            mutually_exclusive=[
+                ("github_app_installation_id", "github_app_installation_org")
+            ],
+        )
+
+        # IncrementalStates by organization, created on first use.
+        self._incremental = {}
+
+        # A plan must be made from what exists, so nothing is created
+        # without looking first.
+        if self.planning:
+            self.params["github_optimistic"] = False
 
         self.login(**kwargs)
 
+    @property
+    def planning(self):
+        return self.params["github_plan"] is not None
+
+    @property
+    def user(self):
+        """The authenticated user, looked up on first use.
+
+        The identity is cached on disk, keyed by a hash of the token, for
+        github_identity_ttl seconds so that it is only fetched once across
+        the tasks of a playbook.
+        """
+
+        if self.api.identity is None:
+            key = ("identity", self.params["github_url"], self.credential)
+            store = self.store()
+            data = store.get(key) if store else None
+            if data is None:
+                data = models.User(**self.api.users.get_authenticated()).dict()
+                if store:
+                    store.put(key, data, self.params["github_identity_ttl"])
+            self.api.identity = models.User(**data)
+
+        return self.api.identity
+
+    def store(self):
+        """Return the on-disk TTLStore, or None if caching is disabled."""
+
+        if not self.params["github_cache"]:
+            return None
+        return github_cache.TTLStore(os.path.join(self.cache_dir, "store"))
+
+    @property
+    def credential(self):
+        """What the client authenticates as, for keying cached state.
+
+        This is the token, or for a GitHub App the app and its
+        installation, since installation tokens change every hour.
+        """
+
+        if self.params["github_app_id"] is None:
+            return self.params["github_token"]
+        return (
+            "app",
+            self.params["github_app_id"],
+            self.params["github_app_installation_id"] or self.app_org.lower(),
+        )
+
+    @property
+    def app_org(self):
+        """The organization whose app installation to authenticate as.
+
+        Unless github_app_installation_org is given, this is the
+        organization the module manages, or the owner of the repository it
+        manages.
+        """
+
+        org = self.params["github_app_installation_org"] or self.params.get(
+            "organization"
+        )
+        if org is None:
+            repos = [self.params.get("repo"), self.params.get("name")]
+            for repo in repos + (self.params.get("repos") or []):
+                if isinstance(repo, str) and "/" in repo:
+                    return repo.split("/")[0]
+        return org
+
     def parse_repo_name(self, fqrn):
+        # An app installation has no user of its own, so repositories must
+        # be named with their owner, which is taken to be an organization.
+        app = self.params["github_app_id"] is not None
         try:
             owner, reponame = fqrn.split("/")
         except ValueError:
+            if app:
+                self.fail_json(
+                    msg=f"repository {fqrn} must be given as owner/name"
+                    " when authenticating as a GitHub App"
+                )
             owner = self.user.login
             reponame = fqrn
 
-        if owner != self.user.login:
+        if app or owner.lower() != self.user.login.lower():
             org = owner
         else:
             org = None
@@ -39,15 +966,103 @@ class GithubModule(AnsibleModule):
             "github_token": {
                 "type": "str",
                 "no_log": True,
-                "required": True,
                 "fallback": (env_fallback, ["GITHUB_TOKEN"]),
             },
+            "github_app_id": {
+                "type": "str",
+                "fallback": (env_fallback, ["GITHUB_APP_ID"]),
+            },
+            "github_app_private_key": {
+                "type": "str",
+                "no_log": True,
+                "fallback": (env_fallback, ["GITHUB_APP_PRIVATE_KEY"]),
+            },
+            "github_app_installation_id": {
+                "type": "int",
+                "fallback": (env_fallback, ["GITHUB_APP_INSTALLATION_ID"]),
+            },
+            "github_app_installation_org": {
+                "type": "str",
+            },
             "github_url": {
                 "type": "str",
             },
             "github_per_page": {
                 "type": "int",
-                "default": 30,
+                "default": 100,
+            },
+            "github_cache": {
+                "type": "bool",
+                "default": True,
+            },
+            "github_cache_dir": {
+                "type": "path",
+                "fallback": (env_fallback, ["ODDBIT_GITHUB_CACHE_DIR"]),
+            },
+            "github_cache_size": {
+                "type": "int",
+                "default": 64,
+            },
+            "github_identity_ttl": {
+                "type": "int",
+                "default": 3600,
+            },
+            "github_workers": {
+                "type": "int",
+                "default": 8,
+            },
+            "github_team_index_ttl": {
+                "type": "int",
+                "default": 300,
+            },
+            # The spacing of writes across every thread and fork (see
+            # RateLimitScheduler).
+            "github_write_interval": {
+                "type": "float",
+                "default": 1.0,
+            },
+            "github_rate_limit_max_wait": {
+                "type": "int",
+                "default": 900,
+            },
+            "github_timeout": {
+                "type": "float",
+                "default": 60,
+            },
+            "github_connect_timeout": {
+                "type": "float",
+                "default": 10,
+            },
+            "github_trace": {
+                "type": "path",
+                "fallback": (env_fallback, ["ODDBIT_GITHUB_TRACE"]),
+            },
+            "github_incremental": {
+                "type": "bool",
+                "default": False,
+            },
+            "github_incremental_ttl": {
+                "type": "int",
+                "default": 7 * 86400,
+            },
+            "github_optimistic": {
+                "type": "bool",
+                "default": False,
+            },
+            "github_snapshot": {
+                "type": "path",
+                "fallback": (env_fallback, ["ODDBIT_GITHUB_SNAPSHOT"]),
+            },
+            "github_snapshot_ttl": {
+                "type": "int",
+                "default": 3600,
+            },
+            "github_plan": {
+                "type": "path",
+            },
+            "github_retries": {
+                "type": "int",
+                "default": 3,
             },
         }
 
@@ -57,43 +1072,702 @@ class GithubModule(AnsibleModule):
     def run(self):
         self.exit_json(changed=False, msg="This module does nothing")
 
+    def exit_json(self, **kwargs):
+        self.close()
+        super().exit_json(**(self.summary() | kwargs))
+
+    def fail_json(self, msg, **kwargs):
+        self.close()
+        super().fail_json(msg, **(self.summary() | kwargs))
+
+    def summary(self):
+        api = getattr(self, "api", None)
+        if api is None:
+            return {}
+
+        summary = {"connections": api.pool.summary()}
+        if api.metrics is not None:
+            summary["metrics"] = api.metrics.summary()
+        if api.snapshot is not None:
+            summary["snapshot"] = api.snapshot.summary()
+        if api.plan is not None:
+            summary["plan"] = api.plan.summary()
+        if api.journal is not None:
+            summary["journal"] = api.journal.summary()
+        if self._incremental:
+            summary["incremental"] = {
+                key: sum(state.summary()[key] for state in self._incremental.values())
+                for key in ("skipped", "checked")
+            }
+        if api.scheduler is not None:
+            summary["rate_limit"] = api.scheduler.summary()
+        return summary
+
+    def close(self):
+        api = getattr(self, "api", None)
+        if api is not None and api.cache is not None:
+            api.cache.prune()
+
+    @property
+    def cache_dir(self):
+        return self.params["github_cache_dir"] or github_cache.default_cache_dir()
+
     def login(self, **kwargs):
-        token = self.params["github_token"]
-        self.api = ghapi.all.GhApi(
-            token=token, gh_host=self.params["github_url"], **kwargs
+        key = (
+            tuple(self.params[name] for name in sorted(self.common_args())),
+            tuple(sorted(kwargs.items())),
+        )
+        if self.share_clients and key in SHARED_CLIENTS:
+            self.api = SHARED_CLIENTS[key]
+            self.renew_app_token()
+            self.api.scheduler.begin()
+            self.api.pool.begin()
+            self.api.metrics.begin(self._name)
+            if self.api.plan is not None:
+                self.api.plan.begin(self._name)
+            # Only github_plan_apply keeps a journal, for its own run.
+            self.api.journal = None
+            return
+
+        pool = ConnectionPool(
+            timeout=self.params["github_timeout"],
+            connect_timeout=self.params["github_connect_timeout"],
+            maxsize=self.params["github_workers"],
         )
-        self.user = self.api.users.get_authenticated()
+        metrics = RequestMetrics(self.params["github_trace"])
+        metrics.begin(self._name)
 
-    def list_teams(self):
-        return flatten(self.api.teams.list, org=self.params["organization"])
+        token, expires = self.params["github_token"], None
+        if self.params["github_app_id"] is not None:
+            app_token = self.app_token(pool, metrics)
+            token, expires = app_token["token"], app_token["expires"]
+
+        cache = None
+        if self.params["github_cache"]:
+            cache = github_cache.ResponseCache(
+                self.cache_dir,
+                identity=(self.params["github_url"], self.credential),
+                max_size=self.params["github_cache_size"] * 1024 * 1024,
+            )
+
+        scheduler = RateLimitScheduler(
+            os.path.join(
+                self.cache_dir,
+                "ratelimit",
+                github_cache.digest(self.params["github_url"], self.credential)[:16],
+            ),
+            write_interval=self.params["github_write_interval"],
+            max_wait=self.params["github_rate_limit_max_wait"],
+            max_retries=self.params["github_retries"],
+        )
+
+        self.api = GithubApi(
+            token=token,
+            gh_host=self.params["github_url"],
+            cache=cache,
+            scheduler=scheduler,
+            pool=pool,
+            metrics=metrics,
+            per_page=self.params["github_per_page"],
+            workers=self.params["github_workers"],
+            **kwargs,
+        )
+        self.api.token_expires = expires
+        if self.planning:
+            import ansible_collections.oddbit.github.plugins.module_utils.github_plan as github_plan
+
+            self.api.plan = github_plan.PlanWriter(self.params["github_plan"])
+            self.api.plan.begin(self._name)
+        if self.params["github_snapshot"]:
+            import ansible_collections.oddbit.github.plugins.module_utils.github_snapshot as github_snapshot
+
+            self.api.snapshot = github_snapshot.Snapshot(
+                self.params["github_snapshot"],
+                os.path.join(self.cache_dir, "snapshots"),
+                ttl=self.params["github_snapshot_ttl"],
+                url=self.api.gh_host,
+                store=self.store(),
+            )
+        if self.share_clients:
+            SHARED_CLIENTS[key] = self.api
+
+    def app_token(self, pool, metrics):
+        """Return an installation access token for the configured app.
+
+        The token is minted with a client of its own (the app's JWT is not
+        a credential the response cache or rate limit state should be kept
+        under) and is kept in the on-disk store until shortly before it
+        expires. Returns the token and the time at which it expires.
+        """
+
+        import ansible_collections.oddbit.github.plugins.module_utils.github_app as github_app
+
+        if not github_app.HAS_CRYPTOGRAPHY:
+            self.fail_json(msg=missing_required_lib("cryptography"))
+
+        installation_id = self.params["github_app_installation_id"]
+        if installation_id is None and not self.app_org:
+            self.fail_json(
+                msg="one of github_app_installation_id or"
+                " github_app_installation_org is required with github_app_id"
+            )
+
+        api = GithubApi(gh_host=self.params["github_url"], pool=pool, metrics=metrics)
+        try:
+            return github_app.installation_token(
+                api,
+                self.params["github_app_id"],
+                self.params["github_app_private_key"],
+                installation_id=installation_id,
+                org=self.app_org,
+                store=self.store(),
+            )
+        except HTTPError as err:
+            self.fail_json(msg=f"failed to get a GitHub App installation token: {err}")
+        except ValueError as err:
+            self.fail_json(msg=f"invalid github_app_private_key: {err}")
+
+    def renew_app_token(self):
+        """Replace the installation token of a shared client if it is due.
+
+        A client shared by the items of a long loop can outlive the token
+        it was created with (installation tokens last an hour), so the
+        token is replaced once it is within TOKEN_MARGIN seconds of
+        expiring.
+        """
+
+        expires = self.api.token_expires
+        if expires is None:
+            return
+
+        import ansible_collections.oddbit.github.plugins.module_utils.github_app as github_app
+
+        if expires - github_app.TOKEN_MARGIN > time.time():
+            return
+        app_token = self.app_token(self.api.pool, self.api.metrics)
+        self.api.headers["Authorization"] = "token " + app_token["token"]
+        self.api.token_expires = app_token["expires"]
+
+    def list_teams(self, org=None):
+        return flatten(self.api.teams.list, org=org or self.params["organization"])
+
+    def incremental_state(self, org, refresh=False):
+        """Return the IncrementalState of an organization.
+
+        Returns None unless github_incremental is set (and caching is
+        enabled, since the state lives in the on-disk store), or when
+        planning, since nothing a plan changes has happened yet. The
+        organization's event stream is read as the authenticated user,
+        which a GitHub App installation does not have, so incremental runs
+        are not supported with app authentication. With ``refresh``
+        (needed before objects are skipped), the state is first brought
+        up to date with GitHub.
+        """
+
+        if (
+            not self.params["github_incremental"]
+            or not self.params["github_cache"]
+            or self.planning
+        ):
+            return None
+        if self.params["github_app_id"] is not None:
+            self.warn("github_incremental is ignored with GitHub App authentication")
+            return None
+
+        states = self._incremental
+        if org not in states:
+            states[org] = IncrementalState(
+                self.store(),
+                (
+                    "incremental",
+                    self.params["github_url"],
+                    self.credential,
+                    org,
+                ),
+                self.params["github_incremental_ttl"],
+            )
+        if refresh and not states[org].refreshed:
+            states[org].refresh(self.api, self.user.login, org)
+        return states[org]
+
+    def team_index(self, org):
+        # Teams a plan creates, renames or deletes only change the index of
+        # the planning run.
+        return TeamIndex(
+            None if self.planning else self.store(),
+            ("teams", self.params["github_url"], self.credential, org),
+            self.params["github_team_index_ttl"],
+        )
 
     def find_team_by_name(self, org, name):
         """Github creates teams by name but searches by slug.
 
-        Rather than try to reproduce the slugify algorithm, we first
-        treat the team name as a slug, and if we find it, we're all done.
-        If we don't find it, then we get a list of all organization teams
-        and look for one with a matching name.
+        We look the slug up in the organization's team index, or failing
+        that take the slug GitHub would have generated for that name, and
+        fetch the team by slug, so that what is returned is always
+        current (the fetch is conditional on the cached ETag, and costs
+        nothing against the rate limit if the team has not changed). Only
+        if that fails (for example because the team was renamed, which
+        does not change its slug) do we list all of the organization's
+        teams to rebuild the index.
         """
 
-        try:
-            return self.api.teams.get_by_name(
-                org=self.params["organization"], team_slug=name
+        def matches(team):
+            return name.lower() in (team["name"].lower(), team["slug"])
+
+        index = self.team_index(org)
+        known = index.get(name)
+        slugs = [known["slug"]] if known is not None else []
+        if slugify(name) and slugify(name) not in slugs:
+            slugs.append(slugify(name))
+
+        for slug in slugs:
+            try:
+                team = self.api.teams.get_by_name(org=org, team_slug=slug)
+            except HTTP404NotFoundError:
+                continue
+            if matches(team):
+                if index.get(team["name"]) != index.summary(team):
+                    index.add(team)
+                return team
+
+        if known is None and index.complete:
+            raise HTTP404NotFoundError(
+                f"{self.api.gh_host}/orgs/{org}/teams", {}, None, msg="Not Found"
             )
-        except HTTP404NotFoundError:
-            for team in self.list_teams():
-                if team["name"] == name:
-                    found = team
-                    break
-            else:
-                raise
 
-            return self.api.teams.get_by_name(
-                org=self.params["organization"], team_slug=found["slug"]
+        teams = list(self.list_teams(org))
+        index.fill(teams)
+        for team in teams:
+            if matches(team):
+                return dict2obj(team)
+
+        raise HTTP404NotFoundError(
+            f"{self.api.gh_host}/orgs/{org}/teams", {}, None, msg="Not Found"
+        )
+
+
+class TeamIndex:
+    """A per-organization index of team slugs by name.
+
+    The index is kept in a TTLStore so that it is shared by the tasks of a
+    playbook. It is ``complete`` once it has been filled from a full team
+    listing; until then it only holds the teams that have been looked up
+    individually. Updates are made under a lock so that parallel forks do
+    not lose each other's changes.
+
+    The index only says where to find a team; modules that write teams
+    keep it up to date, but the team itself is always read from GitHub.
+    """
+
+    # Team attributes kept in the index.
+    FIELDS = ("id", "name", "slug")
+
+    def __init__(self, store, key, ttl):
+        self.store = store
+        self.key = key
+        self.ttl = ttl
+        self.load()
+
+    def load(self):
+        data = self.store.get(self.key) if self.store else None
+        self.teams = data["teams"] if data else {}
+        self.complete = data["complete"] if data else False
+
+    def get(self, name):
+        return self.teams.get(name)
+
+    def update(self, func, complete=None):
+        if self.store is None:
+            func(self.teams)
+            self.complete = self.complete if complete is None else complete
+            return
+
+        with github_cache.locked(os.path.join(self.store.root, ".teams.lock")):
+            self.load()
+            func(self.teams)
+            self.complete = self.complete if complete is None else complete
+            self.store.put(
+                self.key, {"complete": self.complete, "teams": self.teams}, self.ttl
             )
 
+    def summary(self, team):
+        return {k: team[k] for k in self.FIELDS if k in team}
+
+    def fill(self, teams):
+        teams = {team["name"]: self.summary(team) for team in teams}
+
+        def replace(index):
+            index.clear()
+            index.update(teams)
+
+        self.update(replace, complete=True)
+
+    def add(self, team):
+        self.update(lambda index: index.update({team["name"]: self.summary(team)}))
+
+    def remove(self, name):
+        self.update(lambda index: index.pop(name, None))
+
+    def clear(self):
+        """Forget every team, when it is not known which ones changed."""
+
+        self.update(lambda index: index.clear(), complete=False)
+
+
+class IncrementalState:
+    """What was last converged in an organization, for incremental runs.
+
+    For each object a module converged, the state records a digest of the
+    desired spec and a fingerprint of the object as GitHub returned it. A
+    later run may skip an object whose spec is unchanged, as long as
+    ``refresh`` has found nothing that touched it on GitHub since.
+
+    Changes on GitHub's side are found through the organization's event
+    stream: the state keeps a cursor (the id of the newest event seen),
+    and ``refresh`` forgets every repository named in an event newer than
+    that. If the cursor has fallen out of the stream (GitHub keeps the
+    last 300 events) or the stream cannot be read, every repository is
+    forgotten.
+
+    Changes to repository settings produce no event, so the fingerprint
+    of a repository is its ``updated_at``. ``refresh`` lists the
+    repositories updated since the newest ``updated_at`` it last saw, and
+    forgets those whose ``updated_at`` differs from the recorded one. The
+    fingerprint of a team is a digest of the settings the organization's
+    team listing shows (see ``team_fingerprint``); ``refresh`` reads the
+    listing (a conditional request per page) and forgets the teams whose
+    fingerprint differs. Some changes (labels, for one) touch none of
+    these, so records also expire after ``ttl`` seconds, which bounds how
+    long such a change can go unnoticed.
+
+    The state is kept in a TTLStore, and updates are made under a lock
+    so that parallel forks do not lose each other's records.
+    """
+
+    # Events that record activity on a repository's content, which does
+    # not affect anything this collection manages.
+    CONTENT_EVENTS = {
+        "CommitCommentEvent",
+        "ForkEvent",
+        "GollumEvent",
+        "IssueCommentEvent",
+        "IssuesEvent",
+        "PullRequestEvent",
+        "PullRequestReviewCommentEvent",
+        "PullRequestReviewEvent",
+        "PullRequestReviewThreadEvent",
+        "PushEvent",
+        "ReleaseEvent",
+        "WatchEvent",
+    }
+
+    # The event stream is served 100 events to a page, 300 at most.
+    EVENT_PAGES = 3
+
+    # How many pages of recently updated repositories are read before
+    # giving up and forgetting every repository.
+    REPO_PAGES = 3
+
+    def __init__(self, store, key, ttl):
+        self.store = store
+        self.key = key
+        self.ttl = ttl
+        self.skipped = 0
+        self.checked = 0
+        self.refreshed = False
+        self.load()
+
+    def load(self):
+        data = self.store.get(self.key)
+        self.cursor = data["cursor"] if data else None
+        self.since = data.get("since") if data else None
+        self.objects = data["objects"] if data else {}
+        self.next_poll = data["next_poll"] if data else 0
+
+    def update(self, func):
+        with github_cache.locked(os.path.join(self.store.root, ".incremental.lock")):
+            self.load()
+            func()
+            now = time.time()
+            self.objects = {
+                name: record
+                for name, record in self.objects.items()
+                if record["time"] + self.ttl > now
+            }
+            self.store.put(
+                self.key,
+                {
+                    "cursor": self.cursor,
+                    "since": self.since,
+                    "objects": self.objects,
+                    "next_poll": self.next_poll,
+                },
+                self.ttl,
+            )
+
+    def refresh(self, api, user, org):
+        """Forget the objects changed on GitHub since the last run.
+
+        GitHub asks clients to read the event stream no more often than
+        its X-Poll-Interval header says, so the tasks of a playbook share
+        one refresh per interval.
+        """
+
+        self.refreshed = True
+        if self.next_poll > time.time():
+            return
+
+        touched, newest, complete, interval = self.read_events(api, user, org)
+        updated, since = self.read_updated(api, org)
+        teams = self.read_teams(api, org)
+
+        def changed(kind, name, record):
+            if kind == "repo":
+                return (
+                    not complete
+                    or updated is None
+                    or name in touched
+                    or (name in updated and updated[name] != record["fingerprint"])
+                )
+            if kind == "team":
+                return teams is None or teams.get(name) != record["fingerprint"]
+            return False
+
+        def forget():
+            for key, record in list(self.objects.items()):
+                kind, _, name = key.partition(":")
+                if changed(kind, name, record):
+                    del self.objects[key]
+            if newest is not None:
+                self.cursor = max(self.cursor or 0, newest)
+            if since is not None:
+                self.since = max(self.since or "", since)
+            if complete:
+                self.next_poll = time.time() + interval
+
+        self.update(forget)
+
+    def read_events(self, api, user, org):
+        """Return the repositories named in events newer than the cursor.
+
+        Returns the names, the id of the newest event, whether the stream
+        was read back to the cursor, and the poll interval.
+        """
+
+        touched = set()
+        interval = 60
+        newest = self.cursor
+        complete = False
+        try:
+            for page in range(1, self.EVENT_PAGES + 1):
+                events = api.activity.list_org_events_for_authenticated_user(
+                    username=user, org=org, per_page=100, page=page
+                )
+                interval = int(api.recv_hdrs.get("X-Poll-Interval", interval))
+                for event in events:
+                    if self.cursor is not None and int(event["id"]) <= self.cursor:
+                        complete = True
+                        break
+                    newest = max(newest or 0, int(event["id"]))
+                    if event["type"] not in self.CONTENT_EVENTS:
+                        touched.add(event["repo"]["name"].lower())
+                if complete or len(events) < 100:
+                    complete = True
+                    break
+        except HTTPError:
+            complete = False
+            newest = self.cursor
+
+        return touched, newest, complete, interval
+
+    def read_updated(self, api, org):
+        """Return the ``updated_at`` of repositories updated since the last run.
+
+        Returns the timestamps by repository name and the newest of them.
+        The timestamps are None if the listing could not be read back to
+        the newest ``updated_at`` seen last time, or on the first run, when
+        only the newest is read.
+        """
+
+        updated = {}
+        since = None
+        try:
+            for page in range(1, self.REPO_PAGES + 1):
+                repos = api.repos.list_for_org(
+                    org=org,
+                    type="all",
+                    sort="updated",
+                    direction="desc",
+                    per_page=100,
+                    page=page,
+                    headers={"Cache-Control": "no-cache"},
+                )
+                for repo in repos:
+                    since = max(since or "", repo["updated_at"])
+                    if self.since is None:
+                        continue
+                    # Repositories updated in the same second as the newest
+                    # one seen last time are compared again.
+                    if repo["updated_at"] < self.since:
+                        return updated, since
+                    updated[repo["full_name"].lower()] = repo["updated_at"]
+                if self.since is None:
+                    return None, since
+                if len(repos) < 100:
+                    return updated, since
+        except HTTPError:
+            return None, None
+
+        return None, since
+
+    def read_teams(self, api, org):
+        """Return the fingerprints of the organization's teams, by name.
+
+        Teams are only listed if any is recorded. Returns None if the
+        listing cannot be read.
+        """
+
+        if not any(key.startswith("team:") for key in self.objects):
+            return {}
+        try:
+            return {
+                team["name"].lower(): self.team_fingerprint(team)
+                for team in flatten(api.teams.list, org=org)
+            }
+        except HTTPError:
+            return None
+
+    @staticmethod
+    def digest(value):
+        return github_cache.digest(json.dumps(value, sort_keys=True))
+
+    @classmethod
+    def team_fingerprint(cls, team):
+        """Return the fingerprint of a team, or None if there is none."""
+
+        if not team:
+            return None
+        return cls.digest(
+            {k: team.get(k) for k in ("name", "slug", "description", "privacy")}
+        )
+
+    def record_key(self, kind, name):
+        return f"{kind}:{name.lower()}"
+
+    def unchanged(self, kind, name, spec):
+        """Return True if the object can be skipped, and count it."""
+
+        record = self.objects.get(self.record_key(kind, name))
+        unchanged = (
+            record is not None
+            and record["spec"] == self.digest(spec)
+            and record["time"] + self.ttl > time.time()
+        )
+        if unchanged:
+            self.skipped += 1
+        else:
+            self.checked += 1
+        return unchanged
+
+    def record(self, kind, name, spec, fingerprint=None):
+        """Record that the object now matches ``spec``.
+
+        ``fingerprint`` is that of the object as GitHub returned it after
+        it was converged (see ``refresh``).
+        """
+
+        record = {
+            "spec": self.digest(spec),
+            "fingerprint": fingerprint,
+            "time": time.time(),
+        }
+        self.update(lambda: self.objects.update({self.record_key(kind, name): record}))
+
+    def forget(self, kind, name):
+        self.update(lambda: self.objects.pop(self.record_key(kind, name), None))
+
+    def summary(self):
+        return {"skipped": self.skipped, "checked": self.checked}
+
+
+def slugify(name):
+    """Return the slug GitHub generates for a team name.
+
+    GitHub transliterates the name to ASCII, lowercases it, replaces every
+    run of characters other than letters, digits, "_" and "-" with a single
+    "-", collapses repeated "-" and strips them from both ends.
+    """
+
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-z0-9_-]+", "-", name.lower())
+    return re.sub(r"-{2,}", "-", slug).strip("-")
+
+
+def link_relations(header):
+    """Return the URLs of a Link header, keyed by relation."""
+
+    return {rel: url for url, rel in LINK_RE.findall(header or "")}
+
+
+def flatten(oper, *args, per_page=None, workers=None, **kwargs):
+    """Yield the items of every page of a paged listing, in order.
+
+    The first page is fetched on its own. The ``last`` relation of its
+    Link header gives the number of pages, and the remaining pages are
+    fetched on up to ``workers`` threads, at most twice that many pages
+    ahead of the consumer. Listings that are paged by cursor rather than
+    page number are followed one ``next`` link at a time.
+
+    ``per_page`` and ``workers`` default to the client's settings.
+    """
+
+    api = oper.client
+    per_page = per_page or api.per_page
+    workers = workers or api.workers
+
+    def fetch(page):
+        return oper(*args, per_page=per_page, page=page, **kwargs)
+
+    items = fetch(1)
+    links = link_relations(api.recv_hdrs.get("Link"))
+    yield from items
+
+    if "last" not in links:
+        while "next" in links:
+            items = api(links["next"], "GET")
+            links = link_relations(api.recv_hdrs.get("Link"))
+            yield from items
+        return
+
+    last = int(parse_qs(urlsplit(links["last"]).query)["page"][0])
+    pages = iter(range(2, last + 1))
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        window = collections.deque(
+            pool.submit(fetch, page) for page in itertools.islice(pages, 2 * workers)
+        )
+        while window:
+            items = window.popleft().result()
+            for page in itertools.islice(pages, 1):
+                window.append(pool.submit(fetch, page))
+            yield from items
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def run_concurrently(func, items, workers=8):
+    """Call ``func(item)`` for each of ``items`` on at most ``workers`` threads.
+
+    Yields ``(item, result, error)`` tuples in the order of ``items``,
+    where ``error`` is the HTTPError (or other OSError) raised by ``func``,
+    if any.
+    """
 
-def flatten(oper, *args, **kwargs):
-    for page in ghapi.all.paged(oper, *args, **kwargs):
-        for item in page:
-            yield item
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(item, pool.submit(func, item)) for item in items]
+        for item, future in futures:
+            try:
+                yield item, future.result(), None
+            except OSError as err:
+                yield item, None, err
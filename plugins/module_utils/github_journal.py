@@ -0,0 +1,130 @@
+"""Journals: the writes a github_plan_apply run has made, so that a
+retried run can resume where it stopped.
+
+A journal is a file with one line per completed write. Each line is the
+key of the entry, a tab, and the entry as JSON::
+
+    <key>\t{"kind": "write", "verb": "PATCH", "url": "...",
+             "precondition": "plan:3:1", "response": {...}}
+
+A write is keyed by its request (method, URL, query and data) and by how
+many identical requests the run made before it, so that the Nth
+identical write only matches the Nth one recorded. Its ``precondition``
+is the place of the write in the plan (its task and sequence number),
+and a write is only skipped if it is made again from the same place.
+
+Only writes made with a precondition are journaled. Other modules read
+an object before writing it, and the object they read after a write
+differs from the one they read before it, so a journal could not tell
+them that a write was already made; they converge again instead.
+
+Runs append to the journal, so parallel forks can share one file. A line
+cut short by a crash is ignored; when a key was recorded more than once,
+the last line wins. A journal should be removed once the plan it was
+kept for has been applied.
+"""
+
+import json
+import os
+import threading
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+
+
+def write_key(verb, url, query, data):
+    return github_cache.digest(
+        "write",
+        verb,
+        url,
+        json.dumps(query or {}, sort_keys=True),
+        json.dumps(data or {}, sort_keys=True),
+    )
+
+
+class Journal:
+    """Record completed writes in the journal at ``path``.
+
+    The journal is read once, when it is opened. Entries are kept as the
+    JSON they were read as, and only decoded when they are looked up.
+    Identical writes are counted from ``begin`` on.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lockfile = os.path.join(
+            os.path.dirname(os.path.abspath(path)), ".journal.lock"
+        )
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.load()
+        self.begin()
+
+    def load(self):
+        try:
+            fd = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        with fd:
+            for line in fd:
+                key, sep, data = line.partition(b"\t")
+                if sep and line.endswith(b"\n"):
+                    self.entries[key.decode()] = data
+
+    def begin(self):
+        """Start counting and tracking for a new module run."""
+
+        with self.lock:
+            self.skipped = 0
+            self.recorded = 0
+            self.occurrences = {}
+
+    @staticmethod
+    def occurrence(key, n):
+        return github_cache.digest(key, str(n))
+
+    def next_key(self, key):
+        """Return the key of the next occurrence of ``key`` in this run."""
+
+        with self.lock:
+            n = self.occurrences[key] = self.occurrences.get(key, 0) + 1
+        return self.occurrence(key, n)
+
+    def get(self, key, check):
+        """Return the entry recorded under ``key``, or None.
+
+        The entry is only returned (and counted as skipped) if
+        ``check(entry)`` is true.
+        """
+
+        with self.lock:
+            data = self.entries.get(key)
+        if data is None:
+            return None
+
+        entry = json.loads(data)
+        if not check(entry):
+            return None
+        with self.lock:
+            self.skipped += 1
+        return entry
+
+    def done(self, key):
+        """Return True if a write with ``key`` has been recorded."""
+
+        with self.lock:
+            return self.occurrence(key, 1) in self.entries
+
+    def record(self, key, entry):
+        data = json.dumps(entry, separators=(",", ":")).encode()
+        with self.lock:
+            self.entries[key] = data
+            self.recorded += 1
+
+        with github_cache.locked(self.lockfile):
+            with open(self.path, "ab") as fd:
+                fd.write(key.encode() + b"\t" + data + b"\n")
+
+    def summary(self):
+        with self.lock:
+            return {"skipped": self.skipped, "recorded": self.recorded}
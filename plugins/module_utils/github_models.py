@@ -20,7 +20,7 @@ class TeamPrivacyEnum(str, Enum):
 
 class CollaboratorPermissionsEnum(str, Enum):
     pull = "pull"
-    traige = "traige"
+    triage = "triage"
     push = "push"
     maintain = "maintain"
     admin = "admin"
@@ -42,6 +42,100 @@ class BaseModel(pydantic.BaseModel):
         return super().json(**kwargs)  # type: ignore
 
 
+def delta(have, want, exclude=()):
+    """Return the items of the dict ``want`` whose values differ in ``have``.
+
+    ``have`` is the current state of an object, either a dict (such as an
+    API response) or a Record. Fields named in ``exclude`` are left out.
+    The result holds exactly the fields an update needs to send.
+    """
+
+    if isinstance(have, dict):
+        get = have.get
+    else:
+
+        def get(field):
+            return getattr(have, field, None)
+
+    return {k: v for k, v in want.items() if k not in exclude and get(k) != v}
+
+
+class Record:
+    """A compact, validation-free view of data returned by the API.
+
+    Models validate what users pass to a module. Responses from GitHub
+    are already well formed, and there can be many thousands of them, so
+    they are kept in records instead: plain slotted objects built without
+    validation, with the tuple of their field values computed once for
+    cheap comparisons.
+
+    Subclasses list their fields in ``__slots__``. Like ``BaseModel.dict``,
+    ``dict`` leaves out fields that are None.
+    """
+
+    __slots__ = ("_values",)
+    fields: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields = cls.__slots__
+
+    def __init__(self, data):
+        values = tuple(data.get(field) for field in self.fields)
+        for field, value in zip(self.fields, values):
+            setattr(self, field, value)
+        self._values = values
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values == other._values
+
+    def __hash__(self):
+        return hash(self._values)
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in zip(self.fields, self._values))
+        return f"{type(self).__name__}({fields})"
+
+    def dict(self):
+        return {k: v for k, v in zip(self.fields, self._values) if v is not None}
+
+    def diff(self, want):
+        """Return the items of the dict ``want`` that differ from this record."""
+
+        return delta(self, want)
+
+    def replace(self, **changes):
+        return type(self)(dict(zip(self.fields, self._values)) | changes)
+
+
+class LabelData(Record):
+    __slots__ = ("name", "description", "color")
+
+
+class TeamData(Record):
+    __slots__ = ("name", "slug", "description", "privacy")
+
+
+class UserData(Record):
+    __slots__ = ("login", "name", "email")
+
+
+class CollaboratorData(Record):
+    """A collaborator with the name of their highest permission."""
+
+    __slots__ = ("login", "permission", "role_name")
+
+
+def permission_name(perms):
+    """Return the name of the highest permission in a permissions map."""
+
+    for perm in ("admin", "maintain", "push", "triage", "pull"):
+        if perms.get(perm):
+            return perm
+
+
 class Label(BaseModel):
     name: str
     description: str | None
@@ -49,23 +143,38 @@ class Label(BaseModel):
 
     @pydantic.validator("color")
     def validate_color(cls, v):
-        if v.startswith("#"):
+        if v is not None and v.startswith("#"):
             v = v[1:]
 
-        return v
+        return v.lower() if v is not None else v
 
 
 class LabelList(BaseModel):
+    """A list of labels, indexed by name.
+
+    Like GitHub, lookups by name are case-insensitive.
+    """
+
     __root__: list[Label]
+    _index: dict = pydantic.PrivateAttr(default_factory=dict)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        self._index = {label.name.casefold(): label for label in self.__root__}
+
+    @classmethod
+    def from_api(cls, items):
+        """Build a LabelList of LabelData records from API responses."""
+
+        labels = cls.construct(__root__=[LabelData(item) for item in items])
+        labels._index = {label.name.casefold(): label for label in labels.__root__}
+        return labels
 
     def has(self, name):
-        return any(label.name == name for label in self.__root__)
+        return name.casefold() in self._index
 
     def get(self, name):
-        try:
-            return next(label for label in self.__root__ if label.name == name)
-        except StopIteration:
-            return None
+        return self._index.get(name.casefold())
 
     def list(self):
         return [label.dict() for label in self.__root__]
@@ -81,7 +190,7 @@ class Team(BaseModel):
     name: str | None
     team_slug: str | None = pydantic.Field(alias="slug")
     description: str | None
-    privacy: TeamPrivacyEnum
+    privacy: TeamPrivacyEnum | None
 
 
 class CollaboratorPermissionsMap(BaseModel):
@@ -105,18 +214,30 @@ class CollaboratorListResponse(BaseModel):
 class CollaboratorList(BaseModel):
     __root__: list[CollaboratorListResponse]
 
+    @classmethod
+    def from_api(cls, items):
+        """Build a CollaboratorList of CollaboratorData records.
 
-permNameToMap = {
-    "pull": CollaboratorPermissionsMap.fromPerms("pull"),
-    "triage": CollaboratorPermissionsMap.fromPerms("pull", "triage"),
-    "push": CollaboratorPermissionsMap.fromPerms("pull", "triage", "push"),
-    "maintain": CollaboratorPermissionsMap.fromPerms(
-        "pull", "triage", "push", "maintain"
-    ),
-    "admin": CollaboratorPermissionsMap.fromPerms(
-        "pull", "triage", "push", "maintain", "admin"
-    ),
-}
+        Each item either names its ``permission``, or has the
+        ``permissions`` map of the REST API.
+        """
+
+        return cls.construct(
+            __root__=[
+                CollaboratorData(
+                    item
+                    if "permission" in item
+                    else item | {"permission": permission_name(item["permissions"])}
+                )
+                for item in items
+            ]
+        )
+
+
+# Permission names GitHub accepts as aliases, and the names used by
+# repository invitations.
+permAliases = {"read": "pull", "write": "push"}
+permInvitationNames = {"pull": "read", "push": "write"}
 
 
 class RepositoryName(BaseModel):
@@ -129,6 +250,11 @@ class RepositoryName(BaseModel):
         return f"{self.owner}/{self.name}"
 
 
+# Repository fields that only apply when a repository is created; GitHub
+# does not return them, so they never take part in an update.
+CREATE_ONLY_FIELDS = frozenset({"auto_init", "gitignore_template", "license_template"})
+
+
 class RepositoryCreateRequest(BaseModel):
     private: bool | None
     description: str | None
@@ -147,5 +273,5 @@ class RepositoryCreateRequest(BaseModel):
 
 
 class ModuleCommonParameters(BaseModel):
-    github_token: str
+    github_token: str | None
     github_url: str | None
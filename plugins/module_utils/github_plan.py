@@ -0,0 +1,173 @@
+"""Change plans: the writes a run would make, recorded instead of sent.
+
+A plan is a file of JSON lines, one per write. Each entry records the
+module run (``task``) that planned it and its place in that run
+(``seq``), the ``op`` (create, update or delete), and the request exactly
+as the module made it: ``verb``, the ``endpoint`` path template with its
+``route`` parameters (and the resulting ``path``), ``query`` and ``data``.
+The ``precondition`` is the ETag of the object the write changes, as the
+run read it before planning the write, and the URL it was read from.
+Writes to objects the run did not read over REST, such as labels and
+collaborators read through GraphQL, and creates (which add to a listing
+rather than change an object) have a null precondition, and are applied
+without a check::
+
+    {"task": "...", "seq": 0, "module": "github_repo", "op": "update",
+     "verb": "PATCH", "endpoint": "/repos/{owner}/{repo}",
+     "route": {"owner": "example", "repo": "repo1"},
+     "path": "/repos/example/repo1", "query": {},
+     "data": {"description": "..."},
+     "precondition": {"url": "https://...", "etag": "W/\\"...\\""}}
+
+Runs append to the plan, so the tasks of a playbook (and parallel forks)
+can share one file. Remove it before planning a new run.
+"""
+
+import json
+import os
+import threading
+import uuid
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+import ansible_collections.oddbit.github.plugins.module_utils.github_snapshot as github_snapshot
+
+OPS = {"POST": "create", "PUT": "update", "PATCH": "update", "DELETE": "delete"}
+
+
+class PlanWriter:
+    """Record the writes of a module run in the plan at ``path``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.begin(None)
+
+    def begin(self, module):
+        """Start recording the writes of a new module run."""
+
+        self.module = module
+        self.task = uuid.uuid4().hex
+        self.seq = 0
+        self.entries = []
+        self.etags = {}
+        self.objects = {}
+
+    def observe(self, path, url, etag, body):
+        """Remember the ETag of a GET response as a precondition.
+
+        Objects are also kept to answer the updates planned to them.
+        """
+
+        key = "/".join(github_snapshot.key_parts(path))
+        with self.lock:
+            self.etags[key] = {"url": url, "etag": etag}
+            if isinstance(body, dict):
+                self.objects[key] = body
+
+    def precondition(self, verb, path):
+        """Return the precondition of a write to ``path``, or None.
+
+        Only the object itself counts: the ETag of its repository, team or
+        listing changes with every unrelated change to them, and would
+        make the plan conflict for no reason.
+        """
+
+        if verb == "POST":
+            return None
+        return self.etags.get("/".join(github_snapshot.key_parts(path)))
+
+    def add(self, verb, endpoint, path, route, query, data):
+        """Record a write, and return the response to pretend it made.
+
+        That is the object as it was read with the data applied, or for
+        objects that were not read (such as those being created) the
+        route parameters and data.
+        """
+
+        with self.lock:
+            entry = {
+                "task": self.task,
+                "seq": self.seq,
+                "module": self.module,
+                "op": OPS.get(verb, verb.lower()),
+                "verb": verb,
+                "endpoint": endpoint,
+                "route": route or {},
+                "path": path,
+                "query": query or {},
+                "data": data or {},
+                "precondition": self.precondition(verb, path),
+            }
+            self.seq += 1
+            self.entries.append(entry)
+
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        with github_cache.locked(os.path.join(dirname, ".plan.lock")):
+            with open(self.path, "a") as fd:
+                fd.write(line)
+
+        if verb == "DELETE":
+            return ""
+        have = None
+        if verb != "POST":
+            have = self.objects.get("/".join(github_snapshot.key_parts(path)))
+        return {**(have or route or {}), **(data or {})}
+
+    def summary(self):
+        return [
+            {k: entry[k] for k in ("op", "verb", "endpoint", "route", "data")}
+            for entry in self.entries
+        ]
+
+
+def read_plan(path):
+    """Return the entries of the plan at ``path``, grouped by task.
+
+    Tasks are in the order they were first planned; the entries of each
+    task are in the order they were planned.
+    """
+
+    tasks = {}
+    with open(path) as fd:
+        for line in fd:
+            if line.strip():
+                entry = json.loads(line)
+                tasks.setdefault(entry["task"], []).append(entry)
+
+    return [sorted(entries, key=lambda e: e["seq"]) for entries in tasks.values()]
+
+
+def chains(tasks):
+    """Group tasks that write to the same objects.
+
+    Returns lists of tasks, in plan order, such that no two lists write to
+    the same repository or team (or add to the same listing). The lists
+    can be applied concurrently; the tasks within one cannot, since a
+    later task may change the same object as an earlier one, and must be
+    applied after it.
+    """
+
+    groups = []
+    owner = {}
+    for n, entries in enumerate(tasks):
+        roots = {
+            github_snapshot.object_root(github_snapshot.key_parts(entry["path"]))
+            for entry in entries
+        }
+        found = sorted({owner[root] for root in roots if root in owner})
+        if found:
+            target = found[0]
+            for other in found[1:]:
+                groups[target].extend(groups[other])
+                groups[other] = []
+                owner.update(
+                    [(root, target) for root, g in owner.items() if g == other]
+                )
+        else:
+            target = len(groups)
+            groups.append([])
+        groups[target].append(n)
+        owner.update((root, target) for root in roots)
+
+    return [[tasks[n] for n in sorted(group)] for group in groups if group]
@@ -0,0 +1,430 @@
+"""Snapshots of an organization in gzip-compressed JSON lines.
+
+A snapshot starts with a header line::
+
+    {"kind": "snapshot", "org": "example", "url": "...", "time": 1700000000.0,
+     "include": ["repo", ...], "collaborator_affiliation": "direct"}
+
+followed by one line per object. Every line has the ``kind`` of the
+object, the names that identify it within the organization (``name``,
+``repo``, ``team``, ``role``), and the object itself as ``data``::
+
+    {"kind": "repo", "name": "repo1", "data": {...}}
+    {"kind": "label", "repo": "repo1", "data": {"name": "bug", ...}}
+    {"kind": "collaborator", "repo": "repo1", "data": {"login": "alice", ...}}
+    {"kind": "team", "name": "team-1", "data": {...}}
+    {"kind": "team_member", "team": "team-1", "role": "member", "data": {...}}
+    {"kind": "member", "role": "admin", "data": {"login": "alice", ...}}
+
+Objects appear in the order they were read, so lines of different kinds
+are interleaved.
+
+A Snapshot answers the API reads of the modules from snapshot files, so
+that they only read live what has changed since the snapshot was taken.
+"""
+
+import collections
+import contextlib
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+
+from urllib.parse import urlsplit
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+
+KINDS = ("repo", "label", "collaborator", "team", "team_member", "member")
+
+# An index record: the hash of a lookup key, and the offset and length of
+# a line in the data file. Records are big-endian so that sorting their
+# bytes sorts them by key, then by offset.
+INDEX_RECORD = struct.Struct(">8sQI")
+
+# The API paths a snapshot answers, as (pattern, kind, parent). A parent
+# of None means the path returns a single object; otherwise it returns a
+# listing, which is only known to be complete if the parent object (if
+# any) is in the snapshot.
+ROUTES = [
+    (re.compile(r"repos/([^/]+)/([^/]+)"), "repo", None),
+    (re.compile(r"repos/([^/]+)/([^/]+)/labels"), "label", "repos/{0}/{1}"),
+    (
+        re.compile(r"repos/([^/]+)/([^/]+)/collaborators"),
+        "collaborator",
+        "repos/{0}/{1}",
+    ),
+    (re.compile(r"orgs/([^/]+)/repos"), "repo", ""),
+    (re.compile(r"orgs/([^/]+)/teams"), "team", ""),
+    (re.compile(r"orgs/([^/]+)/teams/([^/]+)"), "team", None),
+    (
+        re.compile(r"orgs/([^/]+)/teams/([^/]+)/members"),
+        "team_member",
+        "orgs/{0}/teams/{1}",
+    ),
+    (re.compile(r"orgs/([^/]+)/members"), "member", ""),
+]
+
+# Query parameters that select part of a listing, and the value that
+# selects all of it.
+FILTERS = {"role": "all", "type": "all", "filter": "all"}
+
+
+def compact(value):
+    """Return ``value`` without the API URLs GitHub includes in every object.
+
+    Everything but ``html_url`` can be derived from the names of the
+    objects, and the URLs make up most of the size of a repository.
+    """
+
+    if isinstance(value, dict):
+        return {
+            k: compact(v)
+            for k, v in value.items()
+            if k == "html_url" or not (k == "url" or k.endswith("_url"))
+        }
+    if isinstance(value, list):
+        return [compact(v) for v in value]
+    return value
+
+
+class SnapshotWriter:
+    """Write a snapshot to ``path``, one object at a time.
+
+    Objects are compressed as they are written, so memory use does not
+    depend on the size of the organization. ``write`` may be called from
+    many threads. The snapshot is written to a temporary file that
+    replaces ``path`` only when the writer is closed without an error, so
+    readers never see a partial snapshot.
+    """
+
+    def __init__(self, path, org, url, **meta):
+        self.path = path
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=dirname, prefix=".tmp")
+        self.raw = os.fdopen(fd, "wb")
+        self.fd = gzip.GzipFile(fileobj=self.raw, mode="wb", mtime=0)
+        self.write_line(
+            {"kind": "snapshot", "org": org, "url": url, "time": time.time(), **meta}
+        )
+
+    def write_line(self, line):
+        data = json.dumps(line, separators=(",", ":")).encode() + b"\n"
+        with self.lock:
+            self.fd.write(data)
+
+    def write(self, kind, data, **names):
+        self.write_line({"kind": kind, **names, "data": compact(data)})
+        with self.lock:
+            self.counts[kind] += 1
+
+    def close(self):
+        self.fd.close()
+        self.raw.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.fd.close()
+        self.raw.close()
+        with contextlib.suppress(OSError):
+            os.unlink(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def key_parts(path):
+    return [part.lower() for part in urlsplit(path).path.strip("/").split("/")]
+
+
+def key_hash(key):
+    return hashlib.sha256(key.encode()).digest()[:8]
+
+
+def object_keys(org, line):
+    """Return the lookup keys of a snapshot line.
+
+    These are the API paths (without the leading slash, in lower case)
+    that return the object: the object itself and the listing it is in.
+    """
+
+    org = org.lower()
+    kind = line["kind"]
+    if kind == "repo":
+        return [f"repos/{org}/{line['name'].lower()}", f"orgs/{org}/repos"]
+    if kind in ("label", "collaborator"):
+        return [f"repos/{org}/{line['repo'].lower()}/{kind}s"]
+    if kind == "team":
+        return [f"orgs/{org}/teams/{line['name'].lower()}", f"orgs/{org}/teams"]
+    if kind == "team_member":
+        return [f"orgs/{org}/teams/{line['team'].lower()}/members"]
+    if kind == "member":
+        return [f"orgs/{org}/members"]
+    return []
+
+
+def object_root(parts):
+    """Return the key of the object a path belongs to.
+
+    Changing anything under a repository or team (its labels, say) makes
+    the whole object stale.
+    """
+
+    return "/".join(parts[:3] if parts[0] == "repos" else parts[:4])
+
+
+def map_file(path):
+    with open(path, "rb") as fd:
+        if os.fstat(fd.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SnapshotIndex:
+    """A snapshot file, decompressed and indexed by lookup key.
+
+    The first time a snapshot is used, its lines are written uncompressed
+    to a data file in ``root``, along with a sorted index of fixed-size
+    records. Both files are memory-mapped, so opening a snapshot costs the
+    same whatever its size and a lookup reads only the pages it needs.
+    """
+
+    def __init__(self, path, root):
+        st = os.stat(path)
+        prefix = github_cache.digest(os.path.abspath(path))[:16]
+        name = f"{prefix}-{github_cache.digest(st.st_mtime_ns, st.st_size)[:16]}"
+        self.data_path = os.path.join(root, f"{name}.dat")
+        self.index_path = os.path.join(root, f"{name}.idx")
+
+        if not os.path.exists(self.index_path):
+            with github_cache.locked(os.path.join(root, ".lock")):
+                if not os.path.exists(self.index_path):
+                    for old in glob.glob(os.path.join(root, f"{prefix}-*")):
+                        os.unlink(old)
+                    self.build(path)
+
+        self.data = map_file(self.data_path)
+        self.index = map_file(self.index_path)
+        self.count = len(self.index) // INDEX_RECORD.size
+        self.header = json.loads(self.data[: self.data.find(b"\n")])
+        self.org = self.header["org"].lower()
+
+    def build(self, path):
+        root = os.path.dirname(self.index_path)
+        records = []
+        header = None
+        fd, data_tmp = tempfile.mkstemp(dir=root, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as dst, gzip.open(path, "rb") as src:
+                offset = 0
+                for line in src:
+                    obj = json.loads(line)
+                    if header is None:
+                        if obj.get("kind") != "snapshot":
+                            raise ValueError(f"{path} is not a snapshot")
+                        header = obj
+                    else:
+                        records.extend(
+                            INDEX_RECORD.pack(key_hash(key), offset, len(line))
+                            for key in object_keys(header["org"], obj)
+                        )
+                    dst.write(line)
+                    offset += len(line)
+            if header is None:
+                raise ValueError(f"{path} is empty")
+
+            records.sort()
+            fd, index_tmp = tempfile.mkstemp(dir=root, prefix=".tmp")
+            with os.fdopen(fd, "wb") as dst:
+                dst.write(b"".join(records))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(data_tmp)
+            raise
+
+        # The index is renamed last: if it exists, so does the data.
+        os.replace(data_tmp, self.data_path)
+        os.replace(index_tmp, self.index_path)
+
+    def lines(self, key):
+        """Yield the lines whose lookup keys include ``key``, in order."""
+
+        size = INDEX_RECORD.size
+        h = key_hash(key)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.index[mid * size : mid * size + 8] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        for n in range(lo, self.count):
+            found, offset, length = INDEX_RECORD.unpack_from(self.index, n * size)
+            if found != h:
+                break
+            line = json.loads(self.data[offset : offset + length])
+            if key in object_keys(self.org, line):
+                yield line
+
+
+class Snapshot:
+    """Answer API reads from snapshots.
+
+    ``path`` is a snapshot file, or a directory of them; for each
+    organization, the newest snapshot taken from ``url`` is used. A
+    snapshot is ignored once it is older than ``ttl`` seconds.
+
+    Writes made through the client mark the objects they change as stale
+    in ``store`` (a TTLStore), so that later reads of those objects, in
+    this task or any other, are made live until a newer snapshot is taken.
+    """
+
+    STALE_KEY = "snapshot-stale"
+
+    def __init__(self, path, root, ttl, url, store=None):
+        self.root = root
+        self.ttl = ttl
+        self.url = url
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+        paths = (
+            sorted(glob.glob(os.path.join(path, "*.jsonl.gz")))
+            if os.path.isdir(path)
+            else [path]
+        )
+        self.indexes = {}
+        for name in paths:
+            try:
+                index = SnapshotIndex(name, root)
+            except (OSError, ValueError, KeyError):
+                continue
+            if index.header.get("url") != url:
+                continue
+            have = self.indexes.get(index.org)
+            if have is None or have.header["time"] < index.header["time"]:
+                self.indexes[index.org] = index
+
+        self.stale = (store.get((self.STALE_KEY, url)) if store else None) or {}
+
+    def is_stale(self, parts, since):
+        return any(
+            self.stale.get(key, 0) > since
+            for key in ("/".join(parts), object_root(parts))
+        )
+
+    def resolve(self, path, query=None):
+        """Return how the snapshot answers a GET of ``path``, or None.
+
+        The result is the index, the lookup key, whether the path returns
+        a single object, and the role a listing is filtered by.
+        """
+
+        parts = key_parts(path)
+        key = "/".join(parts)
+        for pattern, kind, parent in ROUTES:
+            match = pattern.fullmatch(key)
+            if match:
+                break
+        else:
+            return None
+
+        index = self.indexes.get(parts[1])
+        if index is None:
+            return None
+        since = index.header["time"]
+        if since + self.ttl < time.time() or self.is_stale(parts, since):
+            return None
+        if kind not in index.header.get("include", KINDS):
+            return None
+
+        query = {k: str(v) for k, v in (query or {}).items()}
+        query.pop("per_page", None)
+        if query.pop("page", "1") != "1":
+            return None
+        if kind == "collaborator" and query.pop("affiliation", "all") != (
+            index.header.get("collaborator_affiliation")
+        ):
+            return None
+        filters = {k: query.pop(k) for k in FILTERS if k in query}
+        if query:
+            return None
+        role = filters.pop("role", "all")
+        if any(value != FILTERS[k] for k, value in filters.items()):
+            return None
+        if role != "all" and kind not in ("team_member", "member"):
+            return None
+
+        if parent and not any(index.lines(parent.format(*match.groups()))):
+            return None
+
+        return index, key, parent is None, None if role == "all" else role
+
+    def has(self, path, query=None):
+        return self.resolve(path, query) is not None
+
+    def get(self, path, query=None):
+        """Return the response to a GET of ``path``, or None if unknown."""
+
+        found = self.resolve(path, query)
+        if found is None:
+            self.misses += 1
+            return None
+
+        index, key, single, role = found
+        lines = index.lines(key)
+        if single:
+            line = next(lines, None)
+            if line is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return line["data"]
+
+        self.hits += 1
+        return [line["data"] for line in lines if role is None or line["role"] == role]
+
+    def invalidate(self, path):
+        """Mark what a write to ``path`` changes as stale."""
+
+        parts = key_parts(path)
+        if parts[0] == "repos" and len(parts) >= 3:
+            keys = [object_root(parts), f"orgs/{parts[1]}/repos"]
+        elif parts[0] == "orgs" and len(parts) >= 3:
+            keys = ["/".join(parts[:3])]
+            if len(parts) >= 4:
+                keys.append(object_root(parts))
+        else:
+            return
+
+        now = time.time()
+        self.stale.update(dict.fromkeys(keys, now))
+        if self.store is None:
+            return
+
+        with github_cache.locked(os.path.join(self.store.root, ".snapshot.lock")):
+            stale = self.store.get((self.STALE_KEY, self.url)) or {}
+            stale.update(dict.fromkeys(keys, now))
+            stale = {k: t for k, t in stale.items() if t + self.ttl > now}
+            self.store.put((self.STALE_KEY, self.url), stale, self.ttl)
+            self.stale = stale
+
+    def summary(self):
+        return {"hits": self.hits, "misses": self.misses}
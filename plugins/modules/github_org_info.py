@@ -0,0 +1,154 @@
+import itertools
+import os
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+import ansible_collections.oddbit.github.plugins.module_utils.github_snapshot as github_snapshot
+
+
+def chunks(items, size):
+    items = iter(items)
+    while chunk := list(itertools.islice(items, size)):
+        yield chunk
+
+
+class Module(github_helper.GithubModule):
+    def module_args(self):
+        return dict(
+            organization=dict(type="str", required=True),
+            dest=dict(type="path", required=True),
+            include=dict(
+                type="list",
+                elements="str",
+                choices=list(github_snapshot.KINDS),
+                default=list(github_snapshot.KINDS),
+            ),
+            collaborator_affiliation=dict(
+                type="str", choices=["outside", "direct", "all"], default="direct"
+            ),
+        )
+
+    @property
+    def org(self):
+        return self.params["organization"]
+
+    def included(self, *kinds):
+        return any(kind in self.params["include"] for kind in kinds)
+
+    def collect_repos(self, out, reader):
+        """Write the repositories, and their labels and collaborators.
+
+        Repositories are read in chunks as they are listed, so only the
+        names of one chunk are held at a time. The labels and
+        collaborators of a chunk are read concurrently, in batched
+        GraphQL queries.
+        """
+
+        repos = github_helper.flatten(
+            self.api.repos.list_for_org, org=self.org, type="all"
+        )
+        details = [kind for kind in ("label", "collaborator") if self.included(kind)]
+
+        def read(kind, names):
+            if kind == "label":
+                return reader.labels(names)
+            return reader.collaborators(
+                names, affiliation=self.params["collaborator_affiliation"]
+            )
+
+        for chunk in chunks(repos, reader.batch_size * reader.workers):
+            for repo in chunk:
+                if self.included("repo"):
+                    out.write("repo", repo, name=repo["name"])
+
+            names = [(self.org, repo["name"]) for repo in chunk]
+            for kind, res, err in github_helper.run_concurrently(
+                lambda kind: read(kind, names), details, len(details) or 1
+            ):
+                if err is not None:
+                    raise err
+                for (_, name), objects in res.items():
+                    for obj in objects.__root__:
+                        out.write(kind, obj.dict(), repo=name)
+
+    def collect_teams(self, out, reader):
+        """Write the teams and their members."""
+
+        teams = github_helper.flatten(self.api.teams.list, org=self.org)
+        for chunk in chunks(teams, reader.batch_size * reader.workers):
+            for team in chunk:
+                if self.included("team"):
+                    out.write("team", team, name=team["slug"])
+
+            if self.included("team_member"):
+                members = reader.team_members(self.org, [t["slug"] for t in chunk])
+                for slug, roles in members.items():
+                    for role, users in roles.items():
+                        for user in users:
+                            out.write("team_member", user.dict(), team=slug, role=role)
+
+    def collect_members(self, out, reader):
+        """Write the members of the organization, by role."""
+
+        for role in ("admin", "member"):
+            for user in github_helper.flatten(
+                self.api.orgs.list_members, org=self.org, role=role
+            ):
+                out.write("member", user, role=role)
+
+    def run(self):
+        reader = github_graphql.GraphQLReader(
+            self.api, workers=self.params["github_workers"]
+        )
+        collectors = []
+        if self.included("repo", "label", "collaborator"):
+            collectors.append(("repos", self.collect_repos))
+        if self.included("team", "team_member"):
+            collectors.append(("teams", self.collect_teams))
+        if self.included("member"):
+            collectors.append(("members", self.collect_members))
+
+        # A snapshot is read live, never from an earlier snapshot.
+        self.api.snapshot = None
+
+        dest = self.params["dest"]
+        try:
+            out = github_snapshot.SnapshotWriter(
+                dest,
+                self.org,
+                self.api.gh_host,
+                include=self.params["include"],
+                collaborator_affiliation=self.params["collaborator_affiliation"],
+            )
+        except OSError as err:
+            self.fail_json(msg=f"failed to create {dest}: {err}")
+
+        # Each kind of object is collected on its own thread; all of them
+        # write to the same snapshot.
+        with out:
+            errors = [
+                f"failed to read {kind} of organization {self.org}: {err}"
+                for (kind, _), _, err in github_helper.run_concurrently(
+                    lambda collector: collector[1](out, reader),
+                    collectors,
+                    len(collectors) or 1,
+                )
+                if err is not None
+            ]
+            if errors:
+                self.fail_json(msg="; ".join(errors))
+
+        self.exit_json(
+            changed=False,
+            dest=dest,
+            size=os.path.getsize(dest),
+            counts={kind: out.counts[kind] for kind in github_snapshot.KINDS},
+        )
+
+
+def main():
+    Module().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
+
+label_options = dict(
+    name=dict(type="str", required=True),
+    description=dict(type="str"),
+    color=dict(type="str"),
+)
+
+
+class Module(github_helper.GithubModule):
+    def module_args(self):
+        return dict(
+            organization=dict(type="str", required=True),
+            labels=dict(type="list", elements="dict", options=label_options),
+            labels_exclusive=dict(type="bool", default=False),
+            repos=dict(
+                type="list",
+                elements="dict",
+                default=[],
+                options=dict(
+                    name=dict(type="str", required=True),
+                    state=dict(
+                        type="str",
+                        choices=github_models.StateEnum.values(),
+                        default="present",
+                    ),
+                    repository=dict(type="dict", default={}),
+                    labels=dict(type="list", elements="dict", options=label_options),
+                    labels_exclusive=dict(type="bool"),
+                ),
+            ),
+            teams=dict(
+                type="list",
+                elements="dict",
+                default=[],
+                options=dict(
+                    name=dict(type="str", required=True),
+                    state=dict(
+                        type="str",
+                        choices=github_models.StateEnum.values(),
+                        default="present",
+                    ),
+                    description=dict(type="str"),
+                    privacy=dict(
+                        type="str", choices=github_models.TeamPrivacyEnum.values()
+                    ),
+                    members=dict(type="list", elements="str"),
+                    maintainers=dict(type="list", elements="str"),
+                    exclusive=dict(type="bool", default=False),
+                ),
+            ),
+        )
+
+    @property
+    def org(self):
+        return self.params["organization"]
+
+    def validate(self):
+        """Parse the desired state into github_models objects."""
+
+        self.repos = [dict(repo) for repo in self.params["repos"]]
+        self.teams = [dict(team) for team in self.params["teams"]]
+
+        try:
+            default_labels = github_models.LabelList.parse_obj(
+                self.params["labels"] or []
+            )
+            for repo in self.repos:
+                repo["model"] = github_models.RepositoryCreateRequest(
+                    **repo["repository"]
+                )
+                labels = {
+                    label.name.casefold(): label
+                    for label in default_labels.__root__
+                    + github_models.LabelList.parse_obj(repo["labels"] or []).__root__
+                }
+                repo["wantlabels"] = (
+                    github_models.LabelList(__root__=list(labels.values()))
+                    if repo["labels"] is not None or self.params["labels"] is not None
+                    else None
+                )
+                if repo["labels_exclusive"] is None:
+                    repo["labels_exclusive"] = self.params["labels_exclusive"]
+            for team in self.teams:
+                team["model"] = github_models.Team(
+                    name=team["name"],
+                    description=team["description"],
+                    privacy=team["privacy"],
+                )
+        except github_models.pydantic.ValidationError as err:
+            self.fail_json(msg=f"invalid organization state: {err}")
+
+    def read_state(self):
+        """Read the current organization state.
+
+        Repositories and teams are each listed once. Details that the
+        listings do not include are only fetched for objects named in the
+        desired state: labels and team members in batched GraphQL queries,
+        and full repository settings concurrently.
+        """
+
+        try:
+            repos = {
+                repo["name"].lower(): repo
+                for repo in github_helper.flatten(
+                    self.api.repos.list_for_org, org=self.org, type="all"
+                )
+            }
+            # Names are matched case-insensitively, as GitHub does.
+            teams = {
+                team["name"].lower(): team
+                for team in github_helper.flatten(self.api.teams.list, org=self.org)
+            }
+        except github_helper.HTTPError as err:
+            self.fail_json(msg=f"failed to read organization {self.org}: {err}")
+
+        present_repos = [
+            repos[spec["name"].lower()]["name"]
+            for spec in self.repos
+            if spec["state"] == "present"
+            and spec["wantlabels"] is not None
+            and spec["name"].lower() in repos
+        ]
+        present_teams = [
+            teams[spec["name"].lower()]["slug"]
+            for spec in self.teams
+            if spec["state"] == "present" and spec["name"].lower() in teams
+        ]
+
+        reader = github_graphql.GraphQLReader(
+            self.api, workers=self.params["github_workers"]
+        )
+        try:
+            labels = reader.labels([(self.org, name) for name in present_repos])
+            members = reader.team_members(self.org, present_teams)
+        except github_helper.HTTPError as err:
+            self.fail_json(msg=f"failed to read organization {self.org}: {err}")
+
+        def read_repo(spec):
+            have = repos[spec["name"].lower()]
+            fields = set(spec["model"].dict()) - github_models.CREATE_ONLY_FIELDS
+            if not fields <= set(have):
+                have = self.api.repos.get(owner=self.org, repo=have["name"])
+            return have, labels.get((self.org, have["name"]))
+
+        def read_team(spec):
+            team = teams[spec["name"].lower()]
+            roles = {
+                role: {user.login for user in users}
+                for role, users in members[team["slug"]].items()
+            }
+            pending = {
+                invitation["login"]
+                for invitation in github_helper.flatten(
+                    self.api.teams.list_pending_invitations_in_org,
+                    org=self.org,
+                    team_slug=team["slug"],
+                )
+                if invitation["login"]
+            }
+            return team, roles, pending
+
+        state = {"repos": {}, "teams": {}}
+        for kind, specs, existing, reader in (
+            ("repos", self.repos, repos, read_repo),
+            ("teams", self.teams, teams, read_team),
+        ):
+            wanted = [
+                spec
+                for spec in specs
+                if spec["state"] == "present" and spec["name"].lower() in existing
+            ]
+            for spec, result, err in github_helper.run_concurrently(
+                reader, wanted, self.params["github_workers"]
+            ):
+                if err is not None:
+                    self.fail_json(
+                        msg=f"failed to read {kind} {spec['name']} in {self.org}: {err}"
+                    )
+                state[kind][spec["name"]] = result
+
+            for spec in specs:
+                if spec["state"] == "absent":
+                    key = spec["name"].lower()
+                    if key in existing:
+                        state[kind][spec["name"]] = (existing[key], None)
+
+        return state
+
+    def plan_repo(self, spec, have):
+        """Return the list of operations that converge one repository."""
+
+        ops = []
+        if have is None and spec["state"] == "present":
+            ops.append(("create", spec["model"].dict()))
+        elif have is not None and spec["state"] == "absent":
+            ops.append(("delete", None))
+            return ops
+        elif have is not None:
+            repo, _ = have
+            delta = github_models.delta(
+                repo, spec["model"].dict(), exclude=github_models.CREATE_ONLY_FIELDS
+            )
+            if delta:
+                ops.append(("update", delta))
+
+        # The labels of a new repository are planned once it has been
+        # created, since GitHub gives it a set of default labels.
+        if spec["state"] == "present" and have is not None:
+            ops.extend(self.plan_labels(spec, have[1]))
+
+        return ops
+
+    def plan_labels(self, spec, havelabels):
+        """Return the list of operations that converge a repository's labels."""
+
+        ops = []
+        if spec["wantlabels"] is None:
+            return ops
+
+        if havelabels is None:
+            havelabels = github_models.LabelList.from_api([])
+        for label in spec["wantlabels"].__root__:
+            current = havelabels.get(label.name)
+            if current is None:
+                ops.append(("add_label", label.dict()))
+                continue
+            patch = current.diff(label.dict())
+            if patch:
+                if "name" in patch:
+                    patch["new_name"] = patch.pop("name")
+                ops.append(("update_label", {"name": current.name, **patch}))
+        if spec["labels_exclusive"]:
+            for label in havelabels.__root__:
+                if not spec["wantlabels"].has(label.name):
+                    ops.append(("delete_label", {"name": label.name}))
+
+        return ops
+
+    def plan_team(self, spec, have):
+        """Return the list of operations that converge one team.
+
+        Users with a pending invitation count as members, so they are not
+        invited again. Logins are compared case-insensitively, as GitHub
+        does.
+        """
+
+        ops = []
+        if have is None and spec["state"] == "present":
+            ops.append(("create", spec["model"].dict()))
+            have_roles, pending = {}, set()
+        elif have is not None and spec["state"] == "absent":
+            ops.append(("delete", None))
+            return ops
+        elif have is not None:
+            team, have_roles, pending = have
+            current = github_models.TeamData(team)
+            delta = current.diff(spec["model"].dict())
+            if delta:
+                ops.append(("update", {"team_slug": current.slug, **delta}))
+        else:
+            return ops
+
+        roster = {
+            user.casefold(): (user, role)
+            for role, users in have_roles.items()
+            for user in users
+        }
+        pending = {user.casefold() for user in pending}
+        want = {user.casefold(): (user, "member") for user in spec["members"] or []}
+        want.update(
+            (user.casefold(), (user, "maintainer"))
+            for user in spec["maintainers"] or []
+        )
+
+        for key, (user, role) in sorted(want.items()):
+            if key not in pending and roster.get(key, (None, None))[1] != role:
+                ops.append(("add_member", {"username": user, "role": role}))
+        if spec["exclusive"]:
+            for key, (user, _) in sorted(roster.items()):
+                if key not in want:
+                    ops.append(("remove_member", {"username": user}))
+
+        return ops
+
+    def apply_repo(self, item):
+        spec, have, ops = item
+        name = spec["name"] if have is None else have[0]["name"]
+        ops = list(ops)
+        result = {"changed": False, "failed": False, "ops": [op for op, _ in ops]}
+
+        try:
+            for op, args in ops:
+                if op == "create":
+                    self.api.repos.create_in_org(org=self.org, name=name, **args)
+                    # The loop goes on to the label operations added here.
+                    labels = self.plan_labels(spec, self.created_labels(name))
+                    ops.extend(labels)
+                    result["ops"].extend(op for op, _ in labels)
+                elif op == "update":
+                    self.api.repos.update(owner=self.org, repo=name, **args)
+                elif op == "delete":
+                    self.api.repos.delete(owner=self.org, repo=name)
+                elif op == "add_label":
+                    self.api.issues.create_label(owner=self.org, repo=name, **args)
+                elif op == "update_label":
+                    self.api.issues.update_label(owner=self.org, repo=name, **args)
+                elif op == "delete_label":
+                    self.api.issues.delete_label(owner=self.org, repo=name, **args)
+                result["changed"] = True
+        except github_helper.HTTPError as err:
+            result["failed"] = True
+            result["msg"] = f"failed to {op} repository {name}: {err}"
+
+        return result
+
+    def created_labels(self, name):
+        """Return the labels GitHub gave a repository it created.
+
+        A planned repository does not exist yet, and is assumed to have
+        none.
+        """
+
+        if self.planning:
+            return None
+        return github_models.LabelList.from_api(
+            github_helper.flatten(
+                self.api.issues.list_labels_for_repo, owner=self.org, repo=name
+            )
+        )
+
+    def written_team(self, team, have):
+        """Return a team as GitHub returns it from a write.
+
+        A planned write is answered with the data of the request, which
+        lacks the fields it does not change, and for a new team the slug,
+        which is the one GitHub will generate.
+        """
+
+        if not self.planning:
+            return team
+        team = {**(have[0] if have is not None else {}), **team}
+        team.setdefault("slug", github_helper.slugify(team["name"]))
+        return team
+
+    def apply_team(self, item):
+        spec, have, ops = item
+        slug = None if have is None else have[0]["slug"]
+        result = {"changed": False, "failed": False, "ops": [op for op, _ in ops]}
+
+        # The organization's team index is kept up to date for the
+        # github_team and github_team_members tasks that follow.
+        index = self.team_index(self.org)
+        try:
+            for op, args in ops:
+                if op == "create":
+                    team = self.written_team(
+                        self.api.teams.create(org=self.org, **args), have
+                    )
+                    index.add(team)
+                    slug = team["slug"]
+                elif op == "update":
+                    team = self.written_team(
+                        self.api.teams.update_in_org(org=self.org, **args), have
+                    )
+                    index.remove(have[0]["name"])
+                    index.add(team)
+                    slug = team["slug"]
+                elif op == "delete":
+                    self.api.teams.delete_in_org(org=self.org, team_slug=slug)
+                    index.remove(have[0]["name"])
+                elif op == "add_member":
+                    self.api.teams.add_or_update_membership_for_user_in_org(
+                        org=self.org, team_slug=slug, **args
+                    )
+                elif op == "remove_member":
+                    self.api.teams.remove_membership_for_user_in_org(
+                        org=self.org, team_slug=slug, **args
+                    )
+                result["changed"] = True
+        except github_helper.HTTPError as err:
+            result["failed"] = True
+            result["msg"] = f"failed to {op} team {spec['name']}: {err}"
+
+        return result
+
+    def run(self):
+        self.validate()
+        state = self.read_state()
+
+        plans = {"repos": [], "teams": []}
+        for spec in self.repos:
+            have = state["repos"].get(spec["name"])
+            plans["repos"].append((spec, have, self.plan_repo(spec, have)))
+        for spec in self.teams:
+            have = state["teams"].get(spec["name"])
+            plans["teams"].append((spec, have, self.plan_team(spec, have)))
+
+        results = {
+            "organization": self.org,
+            "changed": False,
+            "repos": {},
+            "teams": {},
+        }
+
+        for kind, apply in (("repos", self.apply_repo), ("teams", self.apply_team)):
+            for item, result, err in github_helper.run_concurrently(
+                apply, plans[kind], self.params["github_workers"]
+            ):
+                if err is not None:
+                    result = {"changed": False, "failed": True, "msg": str(err)}
+                results[kind][item[0]["name"]] = result
+
+        objects = list(results["repos"].values()) + list(results["teams"].values())
+        results["changed"] = any(result["changed"] for result in objects)
+        failed = [result for result in objects if result["failed"]]
+        if failed:
+            self.fail_json(
+                msg=f"failed to reconcile {len(failed)} objects in {self.org}",
+                **results,
+            )
+
+        self.exit_json(**results)
+
+
+def main():
+    Module().run()
+
+
+if __name__ == "__main__":
+    main()
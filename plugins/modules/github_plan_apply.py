@@ -0,0 +1,205 @@
+from ansible.module_utils.basic import env_fallback
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+import ansible_collections.oddbit.github.plugins.module_utils.github_journal as github_journal
+import ansible_collections.oddbit.github.plugins.module_utils.github_plan as github_plan
+
+# The endpoints that create, update and delete teams.
+TEAM_ENDPOINTS = ("/orgs/{org}/teams", "/orgs/{org}/teams/{team_slug}")
+
+
+def preconditions(entries):
+    return {
+        (entry["precondition"]["url"], entry["precondition"]["etag"])
+        for entry in entries
+        if entry["precondition"] is not None
+    }
+
+
+class Module(github_helper.GithubModule):
+    def module_args(self):
+        return dict(
+            plan=dict(type="path", required=True),
+            github_journal=dict(
+                type="path", fallback=(env_fallback, ["ODDBIT_GITHUB_JOURNAL"])
+            ),
+        )
+
+    def check(self, precondition):
+        """Return why a precondition no longer holds, or None if it does.
+
+        The object is requested with its ETag in If-None-Match; GitHub
+        answers 304 (which costs no rate limit) if it has not changed.
+        """
+
+        url, etag = precondition
+        try:
+            _, hdrs = self.api.send(
+                "GET", url, headers={**self.api.headers, "If-None-Match": etag}
+            )
+        except github_helper.HTTPError as err:
+            if err.code == 304:
+                return None
+            return f"{url} can no longer be read: {err}"
+
+        if hdrs.get("etag") != etag:
+            return f"{url} has changed since the plan was made"
+        return None
+
+    def started(self, chain):
+        """Return True if the journal shows a chain was partly applied."""
+
+        journal = self.api.journal
+        return journal is not None and any(
+            journal.done(
+                github_journal.write_key(
+                    entry["verb"],
+                    self.api.gh_host + entry["path"],
+                    entry["query"],
+                    entry["data"],
+                )
+            )
+            for entries in chain
+            for entry in entries
+        )
+
+    def apply_task(self, entries, result):
+        """Make the writes of one planned task, in order.
+
+        Writes are counted in ``result`` as applied, or as resumed if the
+        journal shows an earlier run made them. A write is made without
+        reading the object first, so it is journaled with the place of its
+        entry in the plan as its precondition. Returns why the task stopped
+        early, or None.
+        """
+
+        for entry in entries:
+            try:
+                self.api(
+                    entry["endpoint"],
+                    entry["verb"],
+                    route=entry["route"],
+                    query=entry["query"],
+                    data=entry["data"],
+                    precondition=f"plan:{entry['task']}:{entry['seq']}",
+                )
+            except OSError as err:
+                return f"failed to {entry['op']} {entry['path']}: {err}"
+            if "X-Journal" in self.api.recv_hdrs:
+                result["resumed"] += 1
+            else:
+                result["applied"] += 1
+            # Which teams a write created, renamed or deleted is not kept
+            # in the plan, so the organization's team index is rebuilt.
+            if entry["endpoint"] in TEAM_ENDPOINTS:
+                self.team_index(entry["route"]["org"]).clear()
+
+        return None
+
+    def apply_chain(self, chain, conflicts):
+        """Apply a chain of tasks (see github_plan.chains) in order.
+
+        A task is not applied if any of its preconditions is in
+        ``conflicts``, nor is any task after one that did not complete.
+        """
+
+        results = []
+        failed = None
+        for entries in chain:
+            result = {
+                "task": entries[0]["task"],
+                "module": entries[0]["module"],
+                "planned": len(entries),
+                "applied": 0,
+                "resumed": 0,
+            }
+            reasons = sorted(
+                conflicts[precondition]
+                for precondition in preconditions(entries)
+                if precondition in conflicts
+            )
+            if reasons:
+                msg = f"conflict: {'; '.join(reasons)}"
+            elif failed is not None:
+                msg = f"not applied, since task {failed} before it did not complete"
+            else:
+                msg = self.apply_task(entries, result)
+
+            if msg is not None:
+                result.update(failed=True, msg=msg)
+                failed = result["task"]
+            results.append(result)
+
+        return results
+
+    def run(self):
+        if self.planning:
+            self.fail_json(msg="github_plan cannot be used when applying a plan")
+
+        # With github_journal, the writes applied are recorded so that a
+        # run retried after a failure resumes where the last one stopped.
+        # The journal is loaded afresh for each run, since the client may
+        # be shared with other modules.
+        self.api.journal = None
+        if self.params["github_journal"]:
+            self.api.journal = github_journal.Journal(self.params["github_journal"])
+
+        try:
+            tasks = github_plan.read_plan(self.params["plan"])
+        except (OSError, ValueError, KeyError) as err:
+            self.fail_json(msg=f"failed to read plan {self.params['plan']}: {err}")
+
+        # Every precondition is checked before anything is written, since
+        # the planned writes themselves change the objects they name. For
+        # the same reason, the preconditions of a chain that an earlier run
+        # started applying (and checked) no longer hold, and are skipped.
+        chains = github_plan.chains(tasks)
+        checked = [
+            entries for chain in chains if not self.started(chain) for entries in chain
+        ]
+        conflicts = {}
+        for precondition, reason, err in github_helper.run_concurrently(
+            self.check,
+            sorted(set().union(*map(preconditions, checked))),
+            self.params["github_workers"],
+        ):
+            if err is not None:
+                reason = f"failed to check {precondition[0]}: {err}"
+            if reason is not None:
+                conflicts[precondition] = reason
+
+        # Chains write to different objects, so they are applied
+        # concurrently (though their writes are still started no closer
+        # together than github_write_interval).
+        results = {}
+        for _, chain_results, err in github_helper.run_concurrently(
+            lambda chain: self.apply_chain(chain, conflicts),
+            chains,
+            self.params["github_workers"],
+        ):
+            if err is not None:
+                self.fail_json(msg=f"failed to apply plan: {err}")
+            results.update((result["task"], result) for result in chain_results)
+
+        results = [results[entries[0]["task"]] for entries in tasks]
+        summary = {
+            "changed": any(result["applied"] for result in results),
+            "tasks": results,
+        }
+        errors = [
+            f"{result['module']} task {result['task']}: {result['msg']}"
+            for result in results
+            if result.get("failed")
+        ]
+        if errors:
+            self.fail_json(msg="; ".join(errors), **summary)
+
+        self.exit_json(**summary)
+
+
+def main():
+    Module().run()
+
+
+if __name__ == "__main__":
+    main()
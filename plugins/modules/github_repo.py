@@ -8,19 +8,91 @@ class Module(github_helper.GithubModule):
         name: str
         repository: github_models.RepositoryCreateRequest
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        try:
+            self.data = self.Model(
+                **{k: v for k, v in self.params.items() if v is not None}
+            )
+        except github_models.pydantic.ValidationError as err:
+            self.fail_json(msg=f"invalid parameters: {err}")
+
     def module_args(self):
         return dict(
-            state=dict(type="str"),
-            name=dict(type="str"),
-            repository=dict(type="dict"),
+            state=dict(
+                type="str", choices=github_models.StateEnum.values(), default="present"
+            ),
+            name=dict(type="str", required=True),
+            repository=dict(type="dict", default={}),
+        )
+
+    def create(self, reponame):
+        if reponame.org:
+            createfunc = self.api.repos.create_in_org
+        else:
+            createfunc = self.api.repos.create_for_authenticated_user
+        return createfunc(
+            owner=reponame.owner,
+            name=reponame.name,
+            org=reponame.org,
+            **self.data.repository.dict(),
+        )
+
+    def create_optimistically(self, reponame, incremental, spec):
+        """Create the repository without first checking that it exists.
+
+        With github_optimistic, this saves a request for every new
+        repository. If the repository turns out to exist, this returns so
+        that the caller can read and update it as usual.
+        """
+
+        try:
+            repo = self.create(reponame)
+        except github_helper.HTTPError as err:
+            if github_helper.already_exists(err):
+                return
+            self.fail_json(msg=f"failed to create repository {reponame.fqrn}: {err}")
+
+        if incremental:
+            incremental.record("repo", reponame.fqrn, spec, repo.get("updated_at"))
+
+        self.exit_json(
+            changed=True,
+            exists=False,
+            name=reponame.dict(),
+            op="create",
+            github={"repo": repo},
         )
 
     def run(self):
         reponame = self.parse_repo_name(self.data.name)
 
+        # With github_incremental, a repository in an organization is
+        # skipped if its spec has not changed since it was converged, and
+        # neither an event nor its updated_at shows it has changed since.
+        incremental = (
+            self.incremental_state(reponame.org, refresh=True) if reponame.org else None
+        )
+        spec = {"state": self.params["state"], "repository": self.params["repository"]}
+        if incremental and incremental.unchanged("repo", reponame.fqrn, spec):
+            self.exit_json(changed=False, skipped=True, name=reponame.dict())
+
+        if self.params["github_optimistic"] and self.data.state == "present":
+            self.create_optimistically(reponame, incremental, spec)
+
         # check if repository exists
         try:
             repo = self.api.repos.get(owner=reponame.owner, repo=reponame.name)
+            # A snapshot holds repositories as they are listed, without
+            # some of their settings; those are read live if needed.
+            fields = set(self.data.repository.dict()) - github_models.CREATE_ONLY_FIELDS
+            if "X-Snapshot" in self.api.recv_hdrs and not fields <= set(repo):
+                repo = self.api.repos.get(
+                    owner=reponame.owner,
+                    repo=reponame.name,
+                    headers={"Cache-Control": "no-cache"},
+                )
         except github_helper.HTTP404NotFoundError:
             repo = {}
             exists = False
@@ -33,15 +105,17 @@ class Module(github_helper.GithubModule):
 
         if exists and self.data.state == "present":
             results["op"] = "update"
-            have = github_models.RepositoryCreateRequest(**repo)
-            patch = github_models.RepositoryCreateRequest(
-                **{**have.dict(), **self.data.repository.dict()}
+            delta = github_models.delta(
+                repo,
+                self.data.repository.dict(),
+                exclude=github_models.CREATE_ONLY_FIELDS,
             )
-            if patch != have:
+            results["delta"] = delta
+            if delta:
                 results["changed"] = True
                 try:
                     repo = self.api.repos.update(
-                        owner=reponame.owner, repo=reponame.name, **patch.dict()
+                        owner=reponame.owner, repo=reponame.name, **delta
                     )
                 except github_helper.HTTPError as err:
                     self.fail_json(
@@ -51,17 +125,8 @@ class Module(github_helper.GithubModule):
             results["op"] = "create"
             results["changed"] = True
 
-            if reponame.org:
-                createfunc = self.api.repos.create_in_org
-            else:
-                createfunc = self.api.repos.create_for_authenticated_user
             try:
-                repo = createfunc(
-                    owner=reponame.owner,
-                    name=reponame.name,
-                    org=reponame.org,
-                    **self.data.repository.dict(),
-                )
+                repo = self.create(reponame)
             except github_helper.HTTPError as err:
                 self.fail_json(
                     msg=f"failed to create repository {reponame.fqrn}: {err}"
@@ -76,6 +141,9 @@ class Module(github_helper.GithubModule):
                     msg=f"failed to delete repository {reponame.fqrn}: {err}"
                 )
 
+        if incremental:
+            incremental.record("repo", reponame.fqrn, spec, repo.get("updated_at"))
+
         results["github"] = {"repo": repo}
         self.exit_json(**results)
 
@@ -1,93 +1,203 @@
-from ansible.module_utils.basic import AnsibleModule
-
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
 import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
 
 
-def main():
-    module_args_attrs = dict(
-        name=dict(type="str", required=True),
-        description=dict(type="str"),
-        private=dict(type="bool", default=False),
-        visibility=dict(type="str", choices=["public", "private", "internal"]),
-        has_issues=dict(type="bool", default=True),
-        has_projects=dict(type="bool", default=True),
-        has_wiki=dict(type="bool", default=True),
-        allow_squash_merge=dict(type="bool", default=True),
-        allow_merge_commit=dict(type="bool", default=True),
-        allow_rebase_merge=dict(type="bool", default=True),
-        allow_auto_merge=dict(type="bool", default=False),
-        delete_branch_on_merge=dict(type="bool", default=False),
-    )
-    module_args = github_helper.common_args()
-    module_args.update(
-        dict(
-            organization=dict(type="str"),
-            state=dict(type="str", default="present", choices=["present", "absent"]),
+class Module(github_helper.GithubModule):
+    def module_args(self):
+        return dict(
+            repo=dict(type="str", required=True),
+            state=dict(
+                type="str", choices=github_models.StateEnum.values(), default="present"
+            ),
+            exclusive=dict(type="bool", default=False),
+            collaborators=dict(
+                type="list",
+                elements="dict",
+                default=[],
+                options=dict(
+                    username=dict(type="str", required=True),
+                    permission=dict(
+                        type="str",
+                        choices=github_models.CollaboratorPermissionsEnum.values(),
+                        default="push",
+                    ),
+                ),
+            ),
         )
-    )
-    module_args.update(module_args_attrs)
-
-    module = AnsibleModule(argument_spec=module_args)
-
-    try:
-        if module.params.get("organization"):
-            org = module.params["organization"]
-            api = github_helper.login(module, org=org, owner=org)
-        else:
-            api = github_helper.login(module)
-            authuser = api.users.get_authenticated()
-
-            # create a new api object with the username inserted in
-            # useful places.
-            api = github_helper.login(
-                module, owner=authuser["login"], username=authuser["login"]
+
+    def list_collaborators(self, reponame):
+        """Return the direct collaborators and pending invitations of a repository.
+
+        Both are returned as CollaboratorLists. A third value maps
+        each invited login to its invitation id.
+        """
+
+        reader = github_graphql.GraphQLReader(
+            self.api, workers=self.params["github_workers"]
+        )
+        repo = (reponame.owner, reponame.name)
+        collaborators = reader.collaborators([repo], affiliation="direct")[repo]
+
+        invitations = {}
+        pending = []
+        for invitation in github_helper.flatten(
+            self.api.repos.list_invitations, owner=reponame.owner, repo=reponame.name
+        ):
+            if not invitation["invitee"]:
+                continue
+            login = invitation["invitee"]["login"]
+            invitations[login] = invitation["id"]
+            pending.append(
+                {
+                    "login": login,
+                    "permission": github_models.permAliases.get(
+                        invitation["permissions"], invitation["permissions"]
+                    ),
+                    "role_name": invitation["permissions"],
+                }
             )
-    except github_helper.HTTPError as err:
-        module.fail_json(msg=f"failed to connect to api: {err}")
-
-    result = dict(
-        changed=False,
-        organization=module.params["organization"],
-        name=module.params["name"],
-    )
-
-    try:
-        result["repo"] = api.repos.get(module.params["name"])
-    except github_helper.HTTP404NotFoundError:
-        repo_exists = False
-    except github_helper.HTTPError as err:
-        module.fail_json(msg=f"failed to lookup repository: {err}")
-    else:
-        repo_exists = True
-
-    result["repo_exists"] = repo_exists
-
-    try:
-        if not repo_exists and module.params["state"] == "present":
-            if module.params.get("organization"):
-                createfunc = api.repos.create_in_org
-            else:
-                createfunc = api.repos.create_for_authenticated_user
-
-            result["repo"] = createfunc(
-                **{
-                    k: v
-                    for k, v in module.params.items()
-                    if k not in ["organization", "state"]
-                },
+
+        return (
+            collaborators,
+            github_models.CollaboratorList.from_api(pending),
+            invitations,
+        )
+
+    def plan(self, collaborators, pending):
+        """Return the (action, username, permission) operations for the repository."""
+
+        have = {c.login.lower(): c for c in collaborators.__root__}
+        invited = {c.login.lower(): c for c in pending.__root__}
+        want = {
+            c["username"].lower(): (
+                c["username"],
+                github_models.permAliases.get(c["permission"], c["permission"]),
+            )
+            for c in self.params["collaborators"]
+        }
+        ops = []
+
+        if self.params["state"] == "present":
+            for key, (user, perm) in want.items():
+                if key in have:
+                    if have[key].permission != perm:
+                        ops.append(("update", have[key].login, perm))
+                elif key in invited:
+                    if invited[key].permission != perm:
+                        ops.append(("update_invitation", invited[key].login, perm))
+                else:
+                    ops.append(("add", user, perm))
+            if self.params["exclusive"]:
+                for key, collaborator in have.items():
+                    if key not in want:
+                        ops.append(("remove", collaborator.login, None))
+                for key, collaborator in invited.items():
+                    if key not in want:
+                        ops.append(("delete_invitation", collaborator.login, None))
+        elif self.params["state"] == "absent":
+            for key in want:
+                if key in have:
+                    ops.append(("remove", have[key].login, None))
+                elif key in invited:
+                    ops.append(("delete_invitation", invited[key].login, None))
+
+        return ops
+
+    def apply(self, reponame, invitations, op):
+        action, user, perm = op
+        if action in ("add", "update"):
+            return self.api.repos.add_collaborator(
+                owner=reponame.owner,
+                repo=reponame.name,
+                username=user,
+                permission=perm,
+            )
+        elif action == "update_invitation":
+            self.api.repos.update_invitation(
+                owner=reponame.owner,
+                repo=reponame.name,
+                invitation_id=invitations[user],
+                permissions=github_models.permInvitationNames.get(perm, perm),
+            )
+        elif action == "remove":
+            self.api.repos.remove_collaborator(
+                owner=reponame.owner, repo=reponame.name, username=user
             )
-        elif repo_exists and module.params["state"] == "present":
-            patch = github_helper.patch(result["repo"], module.params)
-            if patch:
-                result["changed"] = True
-                api.repos.update(repo=module.params["name"], **patch)
-        elif repo_exists and module.params["state"] == "absent":
-            result["changed"] = True
-            api.repos.delete(repo=module.params["name"])
-    except github_helper.HTTPError as err:
-        module.fail_json(msg=f"failed to update repository: {err}")
-
-    module.exit_json(**result)
+        elif action == "delete_invitation":
+            self.api.repos.delete_invitation(
+                owner=reponame.owner,
+                repo=reponame.name,
+                invitation_id=invitations[user],
+            )
+
+    def run(self):
+        reponame = self.parse_repo_name(self.params["repo"])
+
+        try:
+            collaborators, pending, invitations = self.list_collaborators(reponame)
+        except github_helper.HTTPError as err:
+            self.fail_json(
+                msg=f"failed to get collaborators of repository {reponame.fqrn}: {err}"
+            )
+
+        added: list[dict] = []
+        updated: list[dict] = []
+        removed: list[str] = []
+        errors = []
+
+        results = {
+            "repo": reponame.dict(),
+            "changed": False,
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+        }
+
+        # The final permissions of every collaborator and invitee,
+        # computed from the operations that succeeded.
+        final = {
+            c.login: c.permission for c in collaborators.__root__ + pending.__root__
+        }
+
+        invited = {c.login for c in pending.__root__}
+
+        for (action, user, perm), res, err in github_helper.run_concurrently(
+            lambda op: self.apply(reponame, invitations, op),
+            self.plan(collaborators, pending),
+            self.params["github_workers"],
+        ):
+            if err is not None:
+                errors.append(f"failed to {action} collaborator {user}: {err}")
+                continue
+
+            if action == "add":
+                added.append({"username": user, "permission": perm})
+                final[user] = perm
+                # Adding someone who is not an organization member creates
+                # an invitation, which is returned in the response.
+                if res:
+                    invited.add(user)
+            elif action in ("update", "update_invitation"):
+                updated.append({"username": user, "permission": perm})
+                final[user] = perm
+            else:
+                removed.append(user)
+                del final[user]
+                invited.discard(user)
+
+        results["changed"] = bool(added or updated or removed)
+        results["collaborators"] = final
+        results["pending"] = sorted(invited)
+
+        if errors:
+            self.fail_json(msg="; ".join(errors), **results)
+
+        self.exit_json(**results)
+
+
+def main():
+    Module().run()
 
 
 if __name__ == "__main__":
@@ -1,3 +1,6 @@
+import fnmatch
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
 import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
 import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
 
@@ -5,7 +8,12 @@ import ansible_collections.oddbit.github.plugins.module_utils.github_models as g
 class Module(github_helper.GithubModule):
     def module_args(self):
         return dict(
-            repo=dict(type="str", required=True),
+            repo=dict(type="str"),
+            repos=dict(type="list", elements="str"),
+            organization=dict(type="str"),
+            repo_pattern=dict(type="str"),
+            repo_topic=dict(type="str"),
+            source_repo=dict(type="str"),
             state=dict(type="str"),
             exclusive=dict(type="bool"),
             labels=dict(
@@ -27,97 +35,271 @@ class Module(github_helper.GithubModule):
             )
         )
 
-    def run(self):
-        reponame = self.parse_repo_name(self.params["repo"])
+    def plan(self, havelabels, wantlabels):
+        """Return the (op, have, want) operations that converge the labels."""
 
-        try:
-            havelabels = github_models.LabelList.parse_obj(self.list_labels(reponame))
-        except github_helper.HTTPError as err:
-            self.fail_json(
-                msg=f"failed to get labels from repository {reponame.fqrn}: {err}"
+        ops = []
+        if self.params["state"] == "present":
+            for label in wantlabels.__root__:
+                have = havelabels.get(label.name)
+                if have is None:
+                    ops.append(("add", None, label))
+                else:
+                    delta = have.diff(label.dict())
+                    if delta:
+                        ops.append(("update", have, have.replace(**delta)))
+            if self.params["exclusive"]:
+                for label in havelabels.__root__:
+                    if not wantlabels.has(label.name):
+                        ops.append(("delete", label, None))
+        elif self.params["state"] == "absent":
+            for label in wantlabels.__root__:
+                have = havelabels.get(label.name)
+                if have is not None:
+                    ops.append(("delete", have, None))
+
+        return ops
+
+    def apply(self, reponame, op):
+        action, have, want = op
+        if action == "add":
+            return self.api.issues.create_label(
+                owner=reponame.owner, repo=reponame.name, **want.dict()
+            )
+        elif action == "update":
+            patch = have.diff(want.dict())
+            if "name" in patch:
+                patch["new_name"] = patch.pop("name")
+            return self.api.issues.update_label(
+                owner=reponame.owner, repo=reponame.name, name=have.name, **patch
             )
+        elif action == "delete":
+            self.api.issues.delete_label(
+                owner=reponame.owner, repo=reponame.name, name=have.name
+            )
+
+    def resolve_repos(self):
+        """Return the names (owner, name) of the repositories to reconcile.
+
+        These are the entries of ``repos`` (relative to ``organization``
+        when they have no owner), followed by the repositories of
+        ``organization`` that match ``repo_pattern`` and carry
+        ``repo_topic``. Archived repositories, whose labels cannot be
+        changed, are not matched.
+        """
+
+        org = self.params["organization"]
+        names = []
+        for name in self.params["repos"] or []:
+            if org and "/" not in name:
+                name = f"{org}/{name}"
+            reponame = self.parse_repo_name(name)
+            names.append((reponame.owner, reponame.name))
+
+        pattern = self.params["repo_pattern"]
+        topic = self.params["repo_topic"]
+        if pattern is not None or topic is not None:
+            if not org:
+                self.fail_json(
+                    msg="organization is required with repo_pattern or repo_topic"
+                )
+            try:
+                for repo in github_helper.flatten(
+                    self.api.repos.list_for_org, org=org, type="all"
+                ):
+                    if repo.get("archived"):
+                        continue
+                    if pattern is not None and not fnmatch.fnmatchcase(
+                        repo["name"], pattern
+                    ):
+                        continue
+                    if topic is not None and topic not in (repo.get("topics") or []):
+                        continue
+                    names.append((org, repo["name"]))
+            except github_helper.HTTPError as err:
+                self.fail_json(msg=f"failed to list repositories in {org}: {err}")
+
+        return list(dict.fromkeys(names))
+
+    def want_labels(self, source=None):
+        """Return the desired labels.
+
+        These are the ``labels`` parameter, on top of the labels of the
+        ``source`` LabelList if one is given.
+        """
+
+        try:
+            labels = github_models.LabelList.parse_obj(self.params["labels"] or [])
+            if source is not None:
+                merged = {
+                    label.name.casefold(): label.dict() for label in source.__root__
+                }
+                merged.update(
+                    (label.name.casefold(), label.dict()) for label in labels.__root__
+                )
+                labels = github_models.LabelList.parse_obj(list(merged.values()))
+        except github_models.pydantic.ValidationError as err:
+            self.fail_json(msg=f"invalid labels: {err}")
+
+        return labels
+
+    def reconcile(self, reponame, havelabels, wantlabels, workers):
+        """Converge the labels of one repository.
+
+        Returns the result for the repository and a list of errors.
+        """
 
-        wantlabels = github_models.LabelList.parse_obj(self.params["labels"])
         added: list[dict] = []
         updated: list[dict] = []
         deleted: list[dict] = []
 
-        results = {
-            "repo": reponame.dict(),
-            "changed": False,
-            "labels": havelabels.list(),
+        # The final set of labels, built from the write responses rather
+        # than by listing the labels again.
+        final = {label.name.casefold(): label for label in havelabels.__root__}
+        errors = []
+
+        for (action, have, want), res, err in github_helper.run_concurrently(
+            lambda op: self.apply(reponame, op),
+            self.plan(havelabels, wantlabels),
+            workers,
+        ):
+            label = want or have
+            if err is not None:
+                errors.append(
+                    f"failed to {action} label {label.name} in {reponame.fqrn}: {err}"
+                )
+                continue
+
+            if action == "add":
+                added.append(label.dict())
+                final[label.name.casefold()] = github_models.LabelData(res)
+            elif action == "update":
+                updated.append(label.dict())
+                final[have.name.casefold()] = github_models.LabelData(res)
+            elif action == "delete":
+                deleted.append(label.dict())
+                del final[have.name.casefold()]
+
+        return {
+            "changed": bool(added or updated or deleted),
+            "labels": [label.dict() for label in final.values()],
             "added": added,
             "updated": updated,
             "deleted": deleted,
-        }
+        }, errors
 
-        if self.params["state"] == "present":
-            for label in wantlabels.__root__:
-                have = next(
-                    (x for x in havelabels.__root__ if x.name == label.name), None
-                )
-                if have is None:
-                    added.append(label.dict())
-                    try:
-                        self.api.issues.create_label(
-                            owner=reponame.owner, repo=reponame.name, **label.dict()
-                        )
-                    except github_helper.HTTPError as err:
-                        self.fail_json(msg=f"failed to add label {label.name}: {err}")
-                else:
-                    want = github_models.Label(**(have.dict() | label.dict()))
-                    if have != want:
-                        updated.append(label.dict())
-                        try:
-                            self.api.issues.update_label(
-                                owner=reponame.owner, repo=reponame.name, **want.dict()
-                            )
-                        except github_helper.HTTPError as err:
-                            self.fail_json(
-                                msg=f"failed to update label {label.name}: {err}"
-                            )
-            if self.params["exclusive"]:
-                for label in havelabels.__root__:
-                    have = next(
-                        (x for x in wantlabels.__root__ if x.name == label.name), None
-                    )
-                    if have is None:
-                        try:
-                            deleted.append(label.dict())
-                            self.api.issues.delete_label(
-                                owner=reponame.owner,
-                                repo=reponame.name,
-                                name=label.name,
-                            )
-                        except github_helper.HTTPError as err:
-                            self.fail_json(
-                                msg=f"failed to delete label {label.name}: {err}"
-                            )
-        if self.params["state"] == "absent":
-            for label in wantlabels.__root__:
-                have = next(
-                    (x for x in havelabels.__root__ if x.name == label.name), None
+    def run(self):
+        targets = [
+            name
+            for name in ("repo", "repos", "repo_pattern", "repo_topic")
+            if self.params[name] is not None
+        ]
+        if not targets:
+            self.fail_json(
+                msg="one of repo, repos, repo_pattern or repo_topic is required"
+            )
+        if "repo" in targets and len(targets) > 1:
+            self.fail_json(
+                msg=f"parameters are mutually exclusive: {', '.join(targets)}"
+            )
+
+        if self.params["repo"] is not None:
+            self.run_one()
+        else:
+            self.run_many()
+
+    def run_one(self):
+        reponame = self.parse_repo_name(self.params["repo"])
+
+        try:
+            havelabels = github_models.LabelList.from_api(self.list_labels(reponame))
+        except github_helper.HTTPError as err:
+            self.fail_json(
+                msg=f"failed to get labels from repository {reponame.fqrn}: {err}"
+            )
+
+        source = None
+        if self.params["source_repo"] is not None:
+            sourcename = self.parse_repo_name(self.params["source_repo"])
+            try:
+                source = github_models.LabelList.from_api(self.list_labels(sourcename))
+            except github_helper.HTTPError as err:
+                self.fail_json(
+                    msg=f"failed to get labels from repository {sourcename.fqrn}: {err}"
                 )
-                if have is not None:
-                    try:
-                        deleted.append(label.dict())
-                        self.api.issues.delete_label(
-                            owner=reponame.owner,
-                            repo=reponame.name,
-                            name=label.name,
-                        )
-                    except github_helper.HTTPError as err:
-                        self.fail_json(
-                            msg=f"failed to delete label {label.name}: {err}"
-                        )
-
-        results["changed"] = bool(added or updated or deleted)
-        if results["changed"]:
-            havelabels = github_models.LabelList.parse_obj(self.list_labels(reponame))
-            results["labels"] = havelabels.list()
+
+        result, errors = self.reconcile(
+            reponame,
+            havelabels,
+            self.want_labels(source),
+            self.params["github_workers"],
+        )
+        results = {"repo": reponame.dict(), **result}
+
+        if errors:
+            self.fail_json(msg="; ".join(errors), **results)
 
         self.exit_json(**results)
 
+    def run_many(self):
+        """Reconcile many repositories in one run.
+
+        The labels of every repository (and of ``source_repo``) are read in
+        batched GraphQL queries. Repositories are then reconciled on up to
+        github_workers threads, each applying its own changes in turn, so
+        the number of requests in flight stays bounded. Writes are still
+        paced by the rate limit scheduler, one per github_write_interval
+        across all threads.
+        """
+
+        repos = self.resolve_repos()
+        source = None
+        if self.params["source_repo"] is not None:
+            reponame = self.parse_repo_name(self.params["source_repo"])
+            source = (reponame.owner, reponame.name)
+
+        reader = github_graphql.GraphQLReader(
+            self.api, workers=self.params["github_workers"]
+        )
+        try:
+            labels = reader.labels(repos + ([source] if source else []))
+        except github_helper.HTTPError as err:
+            self.fail_json(msg=f"failed to get labels: {err}")
+
+        wantlabels = self.want_labels(labels[source] if source else None)
+
+        def reconcile(repo):
+            owner, name = repo
+            reponame = self.parse_repo_name(f"{owner}/{name}")
+            return self.reconcile(reponame, labels[repo], wantlabels, 1)
+
+        results = {}
+        errors = []
+        for (owner, name), res, err in github_helper.run_concurrently(
+            reconcile, repos, self.params["github_workers"]
+        ):
+            if err is not None:
+                errors.append(f"failed to reconcile labels in {owner}/{name}: {err}")
+                results[f"{owner}/{name}"] = {"failed": True, "msg": str(err)}
+                continue
+
+            result, repo_errors = res
+            del result["labels"]
+            if repo_errors:
+                errors.extend(repo_errors)
+                result.update(failed=True, msg="; ".join(repo_errors))
+            results[f"{owner}/{name}"] = result
+
+        summary = {
+            "changed": any(result.get("changed") for result in results.values()),
+            "repos": results,
+        }
+
+        if errors:
+            self.fail_json(msg="; ".join(errors), **summary)
+
+        self.exit_json(**summary)
+
 
 def main():
     Module().run()
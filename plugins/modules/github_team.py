@@ -23,7 +23,54 @@ class Module(github_helper.GithubModule):
             ),
         )
 
+    def create(self):
+        want = github_models.Team(**self.params["team"])
+        team = self.api.teams.create(org=self.params["organization"], **want.dict())
+        self.team_index(self.params["organization"]).add(team)
+        return team
+
+    def create_optimistically(self, incremental, spec):
+        """Create the team without first looking it up.
+
+        With github_optimistic, this saves the lookup for every new team.
+        If the team turns out to exist, this returns so that the caller
+        can look it up and update it as usual.
+        """
+
+        try:
+            team = self.create()
+        except github_helper.HTTPError as err:
+            if github_helper.already_exists(err):
+                return
+            self.fail_json(
+                msg=f"failed to create team {self.params['team']['name']}: {err}"
+            )
+
+        if incremental:
+            incremental.record(
+                "team",
+                self.params["team"]["name"],
+                spec,
+                github_helper.IncrementalState.team_fingerprint(team),
+            )
+
+        self.exit_json(changed=True, op="create", team=team)
+
     def run(self):
+        incremental = self.incremental_state(self.params["organization"], refresh=True)
+        spec = {"state": self.params["state"], "team": self.params["team"]}
+
+        # With github_incremental, a team is skipped if its spec has not
+        # changed since it was converged, and the organization's team
+        # listing shows that the team has not changed since either.
+        if incremental and incremental.unchanged(
+            "team", self.params["team"]["name"], spec
+        ):
+            self.exit_json(changed=False, skipped=True)
+
+        if self.params["github_optimistic"] and self.params["state"] == "present":
+            self.create_optimistically(incremental, spec)
+
         try:
             team = self.find_team_by_name(
                 org=self.params["organization"], name=self.params["team"]["name"]
@@ -46,19 +93,20 @@ class Module(github_helper.GithubModule):
         if exists and self.params["state"] == "present":
             results["op"] = "update"
 
-            have = github_models.Team(**team)
+            have = github_models.TeamData(team)
             want = github_models.Team(**self.params["team"])
-            patch = github_models.Team(**(have.dict() | want.dict()))
-            if have != patch:
+            delta = github_models.delta(have, want.dict())
+            results["delta"] = delta
+            if delta:
                 results["changed"] = True
                 try:
-                    self.api.teams.update_in_org(
-                        org=self.params["organization"], **patch.dict()
-                    )
-                    results["team"] = self.api.teams.get_by_name(
-                        org=self.params["organization"],
-                        team_slug=have.team_slug,
+                    updated = self.api.teams.update_in_org(
+                        org=self.params["organization"], team_slug=have.slug, **delta
                     )
+                    index = self.team_index(self.params["organization"])
+                    index.remove(have.name)
+                    index.add(updated)
+                    results["team"] = updated
                 except github_helper.HTTPError as err:
                     self.fail_json(
                         msg=f"failed to update team {self.params['team']['name']}: {err}"
@@ -67,11 +115,8 @@ class Module(github_helper.GithubModule):
             results["op"] = "create"
             results["changed"] = True
 
-            want = github_models.Team(**self.params["team"])
             try:
-                results["team"] = self.api.teams.create(
-                    org=self.params["organization"], **want.dict()
-                )
+                results["team"] = self.create()
             except github_helper.HTTPError as err:
                 self.fail_json(
                     msg=f"failed to create team {self.params['team']['name']}: {err}"
@@ -83,10 +128,20 @@ class Module(github_helper.GithubModule):
                 self.api.teams.delete_in_org(
                     org=self.params["organization"], team_slug=team.slug
                 )
+                self.team_index(self.params["organization"]).remove(team.name)
             except github_helper.HTTPError as err:
                 self.fail_json(
                     msg=f"failed to delete team {self.params['team']['name']}: {err}"
                 )
+            results["team"] = {}
+
+        if incremental:
+            incremental.record(
+                "team",
+                self.params["team"]["name"],
+                spec,
+                github_helper.IncrementalState.team_fingerprint(results["team"]),
+            )
 
         self.exit_json(**results)
 
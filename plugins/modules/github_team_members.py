@@ -1,3 +1,4 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
 import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
 import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
 
@@ -20,69 +21,87 @@ class Module(github_helper.GithubModule):
             ),
         )
 
-    def list_members(self, org, name, role=None):
-        return [
-            member["login"]
-            for member in github_helper.flatten(
-                self.api.teams.list_members_in_org, org=org, team_slug=name, role=role
-            )
-        ]
+    def get_roster(self, org, name):
+        """Return the team's members as a dict mapping login to role.
 
-    def add_members_to_role(self, org, name, role, members):
-        if not members:
-            return []
+        Both roles are read at once (a single GraphQL query, or one REST
+        listing per role if GraphQL is unavailable).
+        """
 
-        added = []
-        have = self.list_members(org=org, name=name, role=role)
+        reader = github_graphql.GraphQLReader(
+            self.api, workers=self.params["github_workers"]
+        )
+        members = reader.team_members(org, [name])[name]
+        return {user.login: role for role, users in members.items() for user in users}
+
+    def list_pending(self, org, name):
+        return {
+            invitation["login"]
+            for invitation in github_helper.flatten(
+                self.api.teams.list_pending_invitations_in_org,
+                org=org,
+                team_slug=name,
+            )
+            if invitation["login"]
+        }
 
-        for member in members:
-            if member not in have:
-                added.append(member)
-                try:
-                    self.api.teams.add_or_update_membership_for_user_in_org(
-                        org=org, team_slug=name, username=member, role=role
-                    )
-                except github_helper.HTTPError as err:
-                    self.fail_json(
-                        msg=f"failed to add {member} as {role} to team {name}: {err}"
-                    )
+    def plan(self, roster, pending):
+        """Return the (action, username, role) operations for the team.
 
-        return added
+        Users with a pending invitation count as members, so they are not
+        invited again.
+        """
 
-    def remove_members(self, org, name, members):
-        if not members:
-            return []
+        maintainers = set(self.params["team"]["maintainers"])
+        members = set(self.params["team"]["members"]) - maintainers
+        ops = []
 
-        removed = []
-        have = self.list_members(org=org, name=name)
+        if self.params["state"] == "present":
+            for role, users in (("maintainer", maintainers), ("member", members)):
+                for user in sorted(users):
+                    if user not in pending and roster.get(user) != role:
+                        ops.append(("add", user, role))
+            if self.params["team"]["exclusive"]:
+                for user in sorted(roster):
+                    if user not in maintainers | members:
+                        ops.append(("remove", user, None))
+        elif self.params["state"] == "absent":
+            for user in sorted(maintainers | members):
+                if user in roster:
+                    ops.append(("remove", user, None))
 
-        for member in members:
-            if member in have:
-                removed.append(member)
-                try:
-                    self.api.teams.remove_membership_for_user_in_org(
-                        org=org, team_slug=name, username=member
-                    )
-                except github_helper.HTTPError as err:
-                    self.fail_json(
-                        msg=f"failed to remove {member} from team {name}: {err}"
-                    )
+        return ops
 
-        return removed
+    def apply(self, org, name, op):
+        action, user, role = op
+        if action == "add":
+            return self.api.teams.add_or_update_membership_for_user_in_org(
+                org=org, team_slug=name, username=user, role=role
+            )
+        elif action == "remove":
+            self.api.teams.remove_membership_for_user_in_org(
+                org=org, team_slug=name, username=user
+            )
 
     def run(self):
+        org = self.params["organization"]
         try:
-            team = self.find_team_by_name(
-                org=self.params["organization"], name=self.params["team"]["name"]
-            )
+            team = self.find_team_by_name(org=org, name=self.params["team"]["name"])
         except github_helper.HTTP404NotFoundError:
             self.fail_json(msg=f"failed to lookup team {self.params['team']['name']}")
 
+        try:
+            roster = self.get_roster(org, team.slug)
+            pending = self.list_pending(org, team.slug)
+        except github_helper.HTTPError as err:
+            self.fail_json(msg=f"failed to list members of team {team.slug}: {err}")
+
         added: list[str] = []
         removed: list[str] = []
+        errors = []
 
         results = {
-            "organization": self.params["organization"],
+            "organization": org,
             "changed": False,
             "github": {
                 "team": team,
@@ -91,51 +110,44 @@ class Module(github_helper.GithubModule):
             "removed": removed,
         }
 
-        all_members = (
-            self.params["team"]["members"] + self.params["team"]["maintainers"]
-        )
-
-        if self.params["state"] == "present":
-            added.extend(
-                self.add_members_to_role(
-                    self.params["organization"],
-                    team.slug,
-                    "maintainer",
-                    self.params["team"]["maintainers"],
-                )
-            )
-            added.extend(
-                self.add_members_to_role(
-                    self.params["organization"],
-                    team.slug,
-                    "member",
-                    self.params["team"]["members"],
-                )
-            )
-            if self.params["team"]["exclusive"]:
-                for member in self.list_members(
-                    org=self.params["organization"], name=team.slug
-                ):
-                    if member not in all_members:
-                        removed.append(member)
-                        self.api.teams.remove_membership_for_user_in_org(
-                            org=self.params["organization"],
-                            team_slug=team.slug,
-                            username=member,
-                        )
-
-        elif self.params["state"] == "absent":
-            removed.extend(
-                self.remove_members(self.params["organization"], team.slug, all_members)
-            )
+        for (action, user, role), res, err in github_helper.run_concurrently(
+            lambda op: self.apply(org, team.slug, op),
+            self.plan(roster, pending),
+            self.params["github_workers"],
+        ):
+            if err is not None:
+                if action == "add":
+                    errors.append(
+                        f"failed to add {user} as {role} to team {team.slug}: {err}"
+                    )
+                else:
+                    errors.append(
+                        f"failed to remove {user} from team {team.slug}: {err}"
+                    )
+                continue
+
+            if action == "add":
+                added.append(user)
+                if res.get("state") == "pending":
+                    pending.add(user)
+                else:
+                    roster[user] = role
+            elif action == "remove":
+                removed.append(user)
+                del roster[user]
 
         results["changed"] = bool(added or removed)
-        results["maintainers"] = self.list_members(
-            org=self.params["organization"], name=team.slug, role="maintainer"
+        results["maintainers"] = sorted(
+            user for user, role in roster.items() if role == "maintainer"
         )
-        results["members"] = self.list_members(
-            org=self.params["organization"], name=team.slug, role="member"
+        results["members"] = sorted(
+            user for user, role in roster.items() if role == "member"
         )
+        results["pending"] = sorted(pending)
+
+        if errors:
+            self.fail_json(msg="; ".join(errors), **results)
+
         self.exit_json(**results)
 
 
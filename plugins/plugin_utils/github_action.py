@@ -0,0 +1,134 @@
+import contextlib
+import importlib
+import io
+import json
+import os
+
+import ansible.module_utils.basic as basic
+import ansible.module_utils.common.warnings as warnings
+
+from ansible.errors import AnsibleError
+from ansible.plugins.action import ActionBase
+from ansible.utils.display import Display
+from ansible.vars.clean import remove_internal_keys
+
+display = Display()
+
+
+@contextlib.contextmanager
+def environment(env):
+    """Temporarily apply a task's environment to this process."""
+
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update({name: str(value) for name, value in env.items()})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class GithubAction(ActionBase):
+    """Run one of the collection's modules in the controller process.
+
+    Rather than shipping the module to the target and starting a new
+    interpreter for every task and loop item, the module's Module class
+    is run in place. Modules run this way share their client between
+    runs (see GithubModule.share_clients), so the authenticated identity,
+    rate limit state and open connections carry over from one loop item
+    to the next.
+
+    The module prints its result exactly as it would on a remote host;
+    that output is captured and parsed the same way ActionBase parses the
+    output of a remote module, so the result is the same.
+    """
+
+    TRANSFERS_FILES = False
+    _requires_connection = False
+
+    # The serialization profile the module result is encoded with.
+    profile = "legacy"
+
+    def module_class(self):
+        name = (self._task.resolved_action or self._task.action).split(".")[-1]
+        module = importlib.import_module(
+            f"ansible_collections.oddbit.github.plugins.modules.{name}"
+        )
+
+        class Module(module.Module):
+            share_clients = True
+
+        return name, Module
+
+    def module_args(self, name):
+        args = dict(self._task.args)
+        args.update(
+            _ansible_check_mode=bool(self._task.check_mode),
+            _ansible_no_log=bool(self._task.no_log),
+            _ansible_diff=bool(self._task.diff),
+            _ansible_verbosity=display.verbosity,
+            _ansible_module_name=name,
+        )
+        return args
+
+    def environment(self):
+        """Return the task's environment, templated.
+
+        This merges the environments of the task and its parents as
+        ActionBase._compute_environment_string does for a remote module.
+        """
+
+        env = {}
+        environments = self._task.environment
+        if not isinstance(environments, list):
+            environments = [environments]
+        for environment in environments:
+            if not environment:
+                continue
+            environment = self._templar.template(environment)
+            if not isinstance(environment, dict):
+                raise AnsibleError(
+                    f"environment must be a dictionary, received {environment}"
+                    f" ({type(environment)})"
+                )
+            env.update(environment)
+
+        return self._templar.template(env) if env else env
+
+    def execute(self, module_class, args):
+        """Run module_class with args and return what it printed."""
+
+        output = io.StringIO()
+        basic._ANSIBLE_ARGS = json.dumps({"ANSIBLE_MODULE_ARGS": args}).encode()
+        basic._ANSIBLE_PROFILE = self.profile
+
+        # Warnings and deprecations are collected in globals that a
+        # remote module starts out with empty.
+        warnings._global_warnings.clear()
+        warnings._global_deprecations.clear()
+
+        try:
+            with contextlib.redirect_stdout(output):
+                module_class().run()
+        except SystemExit:
+            pass
+        finally:
+            basic._ANSIBLE_ARGS = None
+
+        return output.getvalue()
+
+    def run(self, tmp=None, task_vars=None):
+        result = super().run(tmp, task_vars)
+        del tmp
+
+        name, module_class = self.module_class()
+        with environment(self.environment()):
+            stdout = self.execute(module_class, self.module_args(name))
+
+        data = self._parse_returned_data({"stdout": stdout}, self.profile)
+        remove_internal_keys(data)
+        result.update(data)
+        return result
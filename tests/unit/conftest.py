@@ -0,0 +1,24 @@
+"""Make the checkout importable as ansible_collections.oddbit.github.
+
+ansible-test runs the unit tests from within an ansible_collections tree.
+When they are run with plain pytest from a checkout, the checkout is
+linked into a temporary tree instead, as the benchmarks do. The tree is
+removed when the test run exits.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import ansible_collections.oddbit.github  # noqa: F401
+except ImportError:
+    path = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    os.makedirs(os.path.join(path, "ansible_collections", "oddbit"))
+    os.symlink(ROOT, os.path.join(path, "ansible_collections", "oddbit", "github"))
+    sys.path.insert(0, path)
@@ -0,0 +1,22 @@
+"""Serve the mock GitHub of the benchmarks to the tests that need one."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), *[".."] * 3))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from mock_github import MockGitHub, Organization  # noqa: E402
+
+
+@pytest.fixture
+def org():
+    return Organization("example", repos=3, labels=2, teams=2, members=2)
+
+
+@pytest.fixture
+def github(org):
+    with MockGitHub(org) as server:
+        yield server
@@ -0,0 +1,60 @@
+import base64
+import json
+
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_app as github_app
+
+pytest.importorskip("cryptography")
+
+from cryptography.exceptions import InvalidSignature  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import padding, rsa  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def pem(key):
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def decode(part):
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def test_app_jwt_claims(pem):
+    header, payload, _ = github_app.app_jwt(42, pem, now=1000).split(".")
+    assert json.loads(decode(header)) == {"alg": "RS256", "typ": "JWT"}
+    assert json.loads(decode(payload)) == {
+        "iat": 1000 - github_app.JWT_BACKDATE,
+        "exp": 1000 + github_app.JWT_LIFETIME,
+        "iss": "42",
+    }
+
+
+def test_app_jwt_signature(key, pem):
+    token = github_app.app_jwt(42, pem)
+    signing_input, _, signature = token.rpartition(".")
+    key.public_key().verify(
+        decode(signature), signing_input.encode(), padding.PKCS1v15(), hashes.SHA256()
+    )
+
+    with pytest.raises(InvalidSignature):
+        key.public_key().verify(
+            decode(signature),
+            signing_input.encode() + b"x",
+            padding.PKCS1v15(),
+            hashes.SHA256(),
+        )
+
+
+def test_parse_time():
+    assert github_app.parse_time("1970-01-01T00:01:40Z") == 100
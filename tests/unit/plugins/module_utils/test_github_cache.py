@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+
+
+@pytest.mark.parametrize(
+    "path,scopes",
+    [
+        (
+            "/repos/Example/Repo1",
+            [
+                "repos/example/repo1",
+                "orgs/example/repos",
+                "users/example/repos",
+                "user/repos",
+            ],
+        ),
+        ("/repos/example/repo1/labels", ["repos/example/repo1/labels"]),
+        ("/repos/example/repo1/labels/bug", ["repos/example/repo1/labels"]),
+        (
+            "/repos/example/repo1/collaborators/user1",
+            ["repos/example/repo1/collaborators", "repos/example/repo1/invitations"],
+        ),
+        ("/orgs/example/teams", ["orgs/example/teams"]),
+        (
+            "/orgs/example/teams/team-1",
+            ["orgs/example/teams/team-1", "orgs/example/teams"],
+        ),
+        (
+            "/orgs/example/teams/team-1/memberships/user1",
+            [
+                "orgs/example/teams/team-1/memberships",
+                "orgs/example/teams/team-1/members",
+                "orgs/example/teams/team-1/invitations",
+            ],
+        ),
+        (
+            "/orgs/example/teams/team-1/repos/example/repo1",
+            ["orgs/example/teams/team-1/repos", "repos/example/repo1/teams"],
+        ),
+        ("/orgs/example/repos", ["orgs/example/repos"]),
+        ("/orgs/example", ["orgs/example"]),
+        ("/user/repos", ["user/repos"]),
+        ("/graphql", ["graphql"]),
+    ],
+)
+def test_cache_scopes(path, scopes):
+    assert github_cache.cache_scopes(path) == scopes
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return github_cache.ResponseCache(str(tmp_path), identity="token")
+
+
+def test_response_cache_invalidates_scopes(cache):
+    cache.put("repos/example/repo1", "GET repo1", "{}", {"etag": '"a"'})
+    cache.put("repos/example/repo2", "GET repo2", "{}", {"etag": '"b"'})
+    assert cache.get("repos/example/repo1", "GET repo1")["headers"] == {"etag": '"a"'}
+    assert cache.get("repos/example/repo1", "GET repo2") is None
+
+    cache.invalidate(["repos/example/repo1", "orgs/example/repos"])
+    assert cache.get("repos/example/repo1", "GET repo1") is None
+    assert cache.get("repos/example/repo2", "GET repo2") is not None
+
+
+def test_response_cache_is_kept_per_identity(cache, tmp_path):
+    cache.put("user", "GET user", "{}", {})
+    other = github_cache.ResponseCache(str(tmp_path), identity="other token")
+    assert other.get("user", "GET user") is None
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = github_cache.ResponseCache(str(tmp_path), identity="token", max_size=1)
+    for n in range(3):
+        cache.put("scope", f"GET {n}", "x" * 100, {})
+    cache.max_size = 2 * os.path.getsize(cache._entry_path("scope", "GET 0"))
+    for n, mtime in enumerate((300, 100, 200)):
+        os.utime(cache._entry_path("scope", f"GET {n}"), (mtime, mtime))
+
+    cache.prune()
+    assert [cache.get("scope", f"GET {n}") is not None for n in range(3)] == [
+        True,
+        False,
+        False,
+    ]
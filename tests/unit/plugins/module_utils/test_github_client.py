@@ -0,0 +1,71 @@
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_client as github_client
+
+
+class RecordingClient(github_client.Client):
+    """Record the requests the endpoints make instead of sending them."""
+
+    def __call__(
+        self, path, verb=None, headers=None, route=None, query=None, data=None
+    ):
+        self.request = (path, verb, headers, route, query, data)
+
+
+@pytest.fixture
+def client():
+    return RecordingClient(token="test")
+
+
+def test_keyword_arguments_are_routed(client):
+    client.issues.update_label(
+        owner="example", repo="repo1", name="bug", new_name="Bug", color="ff0000"
+    )
+    assert client.request == (
+        "/repos/{owner}/{repo}/labels/{name}",
+        "PATCH",
+        None,
+        {"owner": "example", "repo": "repo1", "name": "bug"},
+        {},
+        {"new_name": "Bug", "color": "ff0000"},
+    )
+
+
+def test_positional_arguments_fill_route_query_then_fields(client):
+    client.teams.list_members_in_org("example", "team-1", "maintainer", 50)
+    assert client.request[3:] == (
+        {"org": "example", "team_slug": "team-1"},
+        {"role": "maintainer", "per_page": 50},
+        {},
+    )
+
+
+def test_keyword_arguments_are_skipped_by_positional_ones(client):
+    client.issues.create_label("Bug", owner="example", repo="repo1")
+    assert client.request[3:] == (
+        {"owner": "example", "repo": "repo1"},
+        {},
+        {"name": "Bug"},
+    )
+
+
+def test_unknown_arguments_are_dropped(client):
+    client.repos.get(owner="example", repo="repo1", org=None, headers={"X": "1"})
+    path, verb, headers, route, query, data = client.request
+    assert (verb, headers, route) == (
+        "GET",
+        {"X": "1"},
+        {"owner": "example", "repo": "repo1"},
+    )
+
+
+def test_unknown_endpoints(client):
+    with pytest.raises(AttributeError):
+        client.nothing
+    with pytest.raises(AttributeError):
+        client.repos.nothing
+
+
+def test_client_is_abstract():
+    with pytest.raises(TypeError):
+        github_client.Client(token="test")
@@ -0,0 +1,63 @@
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_graphql as github_graphql
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+
+REPOS = [("example", "repo0"), ("example", "repo1"), ("example", "repo2")]
+
+
+@pytest.fixture
+def api(github):
+    return github_helper.GithubApi(
+        token="test", gh_host=github.url, metrics=github_helper.RequestMetrics()
+    )
+
+
+def endpoints(api):
+    return {
+        name: counts["requests"]
+        for name, counts in api.metrics.summary()["endpoints"].items()
+    }
+
+
+def label_names(labels):
+    return {
+        repo: sorted(label.name for label in found.__root__)
+        for repo, found in labels.items()
+    }
+
+
+def test_labels_are_read_in_one_query(api, org):
+    reader = github_graphql.GraphQLReader(api)
+    labels = reader.labels(REPOS)
+
+    assert label_names(labels) == dict.fromkeys(REPOS, ["label0", "label1"])
+    assert endpoints(api) == {"POST /graphql": 1}
+
+
+def test_partial_errors_fall_back_to_rest(api, org):
+    org.forbidden.add("repo1")
+    org.collaborators["repo1"] = {"user1": "admin"}
+    reader = github_graphql.GraphQLReader(api)
+    collaborators = reader.collaborators(REPOS)
+
+    assert [c.login for c in collaborators[("example", "repo1")].__root__] == ["user1"]
+    assert [c.login for c in collaborators[("example", "repo0")].__root__] == ["user0"]
+    assert endpoints(api) == {
+        "POST /graphql": 1,
+        "GET /repos/{owner}/{repo}/collaborators": 1,
+    }
+    assert reader.available
+
+
+def test_failed_endpoint_falls_back_to_rest(api, github):
+    github.faults[("POST", "/graphql")] = [502]
+    reader = github_graphql.GraphQLReader(api)
+    labels = reader.labels(REPOS)
+
+    assert label_names(labels) == dict.fromkeys(REPOS, ["label0", "label1"])
+    assert not reader.available
+    assert endpoints(api) == {
+        "POST /graphql": 1,
+        "GET /repos/{owner}/{repo}/labels": 3,
+    }
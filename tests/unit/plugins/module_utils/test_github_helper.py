@@ -0,0 +1,192 @@
+import email.message
+import time
+import urllib.error
+
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_cache as github_cache
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+
+
+@pytest.mark.parametrize(
+    "name,slug",
+    [
+        ("Team 1", "team-1"),
+        ("  Leading and trailing  ", "leading-and-trailing"),
+        ("a--b", "a-b"),
+        ("Dev & Ops!", "dev-ops"),
+        ("snake_case-Name", "snake_case-name"),
+        ("Équipe Café", "equipe-cafe"),
+        ("日本", ""),
+    ],
+)
+def test_slugify(name, slug):
+    assert github_helper.slugify(name) == slug
+
+
+def team(name, slug, **kwargs):
+    return {"id": hash(slug), "name": name, "slug": slug, **kwargs}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return github_cache.TTLStore(str(tmp_path / "store"))
+
+
+def test_team_index_keeps_only_slugs(store):
+    index = github_helper.TeamIndex(store, ("teams", "org"), 300)
+    index.add(team("Team 1", "team-1", description="not kept"))
+
+    assert index.get("Team 1") == team("Team 1", "team-1")
+    assert not index.complete
+
+
+def test_team_index_is_shared_through_the_store(store):
+    github_helper.TeamIndex(store, ("teams", "org"), 300).fill(
+        [team("Team 1", "team-1"), team("Team 2", "team-2")]
+    )
+
+    index = github_helper.TeamIndex(store, ("teams", "org"), 300)
+    assert index.complete
+    assert index.get("Team 2")["slug"] == "team-2"
+    assert github_helper.TeamIndex(store, ("teams", "other"), 300).get("Team 2") is None
+
+
+def test_team_index_fill_replaces(store):
+    index = github_helper.TeamIndex(store, ("teams", "org"), 300)
+    index.add(team("Gone", "gone"))
+    index.fill([team("Team 1", "team-1")])
+
+    assert index.get("Gone") is None
+    assert index.get("Team 1") is not None
+
+
+def test_team_index_remove_and_clear(store):
+    index = github_helper.TeamIndex(store, ("teams", "org"), 300)
+    index.fill([team("Team 1", "team-1"), team("Team 2", "team-2")])
+    index.remove("Team 1")
+    assert index.get("Team 1") is None
+    assert index.complete
+
+    index.clear()
+    index = github_helper.TeamIndex(store, ("teams", "org"), 300)
+    assert index.get("Team 2") is None
+    assert not index.complete
+
+
+def test_team_index_without_store():
+    index = github_helper.TeamIndex(None, ("teams", "org"), 300)
+    index.fill([team("Team 1", "team-1")])
+
+    assert index.complete
+    assert index.get("Team 1")["slug"] == "team-1"
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return github_helper.RateLimitScheduler(
+        str(tmp_path / "ratelimit"), write_interval=0, max_wait=10
+    )
+
+
+def rate_limited(url):
+    return urllib.error.HTTPError(
+        url, 403, "API rate limit exceeded", email.message.Message(), None
+    )
+
+
+def test_scheduler_holds_only_the_exhausted_resource(scheduler, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda delay: None)
+    headers = github_helper.Headers(
+        {
+            "X-RateLimit-Resource": "graphql",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Reset": str(int(time.time()) + 5),
+        }
+    )
+    assert scheduler.update(headers) is None
+
+    scheduler.acquire("https://api.github.com/repos/example/repo1", mutating=False)
+    assert scheduler.waited == 0
+    scheduler.acquire("https://api.github.com/graphql", mutating=False)
+    assert 4 < scheduler.waited <= 6
+    assert scheduler.summary()["budgets"]["graphql"]["remaining"] == 0
+
+
+def test_scheduler_retry_after_holds_every_request(scheduler, tmp_path):
+    url = "https://api.github.com/repos/example/repo1"
+    headers = github_helper.Headers({"Retry-After": "60"})
+    assert scheduler.update(headers, rate_limited(url)) == pytest.approx(60, abs=1)
+
+    # Forks sharing the state file are held too, up to max_wait.
+    other = github_helper.RateLimitScheduler(str(tmp_path / "ratelimit"), max_wait=10)
+    with pytest.raises(github_helper.RateLimitError):
+        other.acquire("https://api.github.com/graphql", mutating=False)
+
+
+def test_scheduler_spaces_writes(scheduler, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda delay: None)
+    scheduler.write_interval = 1
+    url = "https://api.github.com/repos/example/repo1"
+    scheduler.acquire(url, mutating=True)
+    scheduler.acquire(url, mutating=False)
+    assert scheduler.waited == 0
+    scheduler.acquire(url, mutating=True)
+    assert 0.5 < scheduler.waited <= 1
+
+
+def test_scheduler_backoff_is_jittered_and_capped(scheduler):
+    delays = [scheduler.backoff_delay(attempt) for attempt in range(10)]
+    assert 0.5 <= delays[0] <= 1
+    assert all(delay <= scheduler.max_backoff for delay in delays)
+    assert max(delays) >= scheduler.max_backoff / 2
+
+
+def requests(api, key="requests"):
+    """Return how many requests the client has made, or received 304s for."""
+
+    return api.metrics.summary()[key]
+
+
+def test_conditional_gets_are_answered_from_the_cache(github, tmp_path):
+    api = github_helper.GithubApi(
+        token="test",
+        gh_host=github.url,
+        cache=github_cache.ResponseCache(str(tmp_path), identity="test"),
+        metrics=github_helper.RequestMetrics(),
+    )
+    repo = api.repos.get(owner="example", repo="repo1")
+    assert requests(api, "not_modified") == 0
+
+    assert api.repos.get(owner="example", repo="repo1") == repo
+    assert requests(api, "not_modified") == 1
+    assert "etag" in api.recv_hdrs
+
+    api.repos.update(owner="example", repo="repo1", description="changed")
+    repo = api.repos.get(owner="example", repo="repo1")
+    assert repo["description"] == "changed"
+    assert requests(api, "not_modified") == 1
+
+
+def test_flatten_prefetches_a_bounded_window(github, org):
+    org.labels["repo1"] = [
+        {"name": f"label{n}", "color": "ededed", "description": None} for n in range(25)
+    ]
+    api = github_helper.GithubApi(
+        token="test", gh_host=github.url, metrics=github_helper.RequestMetrics()
+    )
+
+    labels = github_helper.flatten(
+        api.issues.list_labels_for_repo,
+        owner="example",
+        repo="repo1",
+        per_page=2,
+        workers=2,
+    )
+    assert next(labels)["name"] == "label0"
+    # The first page, and at most twice as many pages as workers ahead.
+    assert requests(api) <= 5
+
+    assert [label["name"] for label in labels] == [f"label{n}" for n in range(1, 25)]
+    assert requests(api) == 13
@@ -0,0 +1,61 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_journal as github_journal
+
+URL = "https://api.github.com/repos/example/repo1"
+
+
+def write(journal, description, precondition):
+    """Look up a write as GithubApi does, recording it if it is not found."""
+
+    key = journal.next_key(
+        github_journal.write_key("PATCH", URL, {}, {"description": description})
+    )
+    entry = journal.get(key, lambda entry: entry["precondition"] == precondition)
+    if entry is None:
+        journal.record(key, {"kind": "write", "precondition": precondition})
+    return entry is not None
+
+
+def test_identical_writes_match_in_order(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = github_journal.Journal(path)
+    assert not write(journal, "A", "plan:1:1")
+    assert not write(journal, "B", "plan:1:2")
+    assert not write(journal, "A", "plan:2:1")
+
+    journal = github_journal.Journal(path)
+    assert write(journal, "A", "plan:1:1")
+    assert write(journal, "B", "plan:1:2")
+    # The third write was planned in a different place than the first, and
+    # only matches the second identical write recorded.
+    assert not write(journal, "A", "plan:1:1")
+    assert journal.summary() == {"skipped": 2, "recorded": 1}
+
+
+def test_occurrences_restart_with_each_run(tmp_path):
+    journal = github_journal.Journal(str(tmp_path / "journal"))
+    key = journal.next_key("key")
+    assert journal.next_key("key") != key
+
+    journal.begin()
+    assert journal.next_key("key") == key
+
+
+def test_done_looks_for_the_first_occurrence(tmp_path):
+    journal = github_journal.Journal(str(tmp_path / "journal"))
+    key = github_journal.write_key("DELETE", URL, {}, {})
+    assert not journal.done(key)
+
+    journal.record(journal.next_key(key), {"kind": "write"})
+    assert journal.done(key)
+
+
+def test_partial_lines_are_ignored(tmp_path):
+    path = tmp_path / "journal"
+    journal = github_journal.Journal(str(path))
+    journal.record("complete", {"kind": "write"})
+    with open(path, "ab") as fd:
+        fd.write(b'partial\t{"kind": "ta')
+
+    journal = github_journal.Journal(str(path))
+    assert journal.get("complete", lambda entry: True) == {"kind": "write"}
+    assert journal.get("partial", lambda entry: True) is None
@@ -0,0 +1,52 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_models as github_models
+
+
+def test_delta_of_dict():
+    have = {"name": "repo1", "description": "old", "private": False}
+    want = {"description": "new", "private": False, "homepage": None}
+
+    assert github_models.delta(have, want) == {"description": "new"}
+
+
+def test_delta_missing_fields_differ_unless_none():
+    assert github_models.delta({}, {"description": "new", "homepage": None}) == {
+        "description": "new"
+    }
+
+
+def test_delta_exclude():
+    have = {"description": "old"}
+    want = {"description": "new", "auto_init": True}
+
+    assert github_models.delta(have, want, exclude={"auto_init"}) == {
+        "description": "new"
+    }
+
+
+def test_delta_of_record():
+    have = github_models.LabelData({"name": "bug", "color": "ff0000"})
+
+    assert github_models.delta(have, {"name": "bug", "color": "00ff00"}) == {
+        "color": "00ff00"
+    }
+    assert have.diff({"name": "bug", "description": "Bugs"}) == {"description": "Bugs"}
+
+
+def test_record_fields():
+    label = github_models.LabelData({"name": "bug", "color": "ff0000", "id": 1})
+
+    assert label.name == "bug"
+    assert label.description is None
+    assert label.dict() == {"name": "bug", "color": "ff0000"}
+
+
+def test_record_equality():
+    label = github_models.LabelData({"name": "bug", "color": "ff0000"})
+    same = github_models.LabelData({"name": "bug", "color": "ff0000", "id": 2})
+    team = github_models.TeamData({"name": "bug"})
+
+    assert label == same
+    assert hash(label) == hash(same)
+    assert label != team
+    assert label.replace(color="00ff00") != label
+    assert label.replace(color="00ff00").color == "00ff00"
@@ -0,0 +1,110 @@
+import ansible_collections.oddbit.github.plugins.module_utils.github_plan as github_plan
+
+URL = "https://api.github.com"
+
+
+def task(name, *paths):
+    return [{"task": name, "seq": n, "path": path} for n, path in enumerate(paths)]
+
+
+def names(chains):
+    return [[entries[0]["task"] for entries in chain] for chain in chains]
+
+
+def test_chains_separate_objects():
+    tasks = [
+        task("a", "/repos/example/repo1"),
+        task("b", "/repos/example/repo2"),
+        task("c", "/orgs/example/teams/team-1"),
+    ]
+
+    assert names(github_plan.chains(tasks)) == [["a"], ["b"], ["c"]]
+
+
+def test_chains_group_writes_under_one_object():
+    tasks = [
+        task("a", "/repos/example/repo1"),
+        task("b", "/repos/example/repo2/labels/bug"),
+        task("c", "/repos/Example/Repo1/collaborators/alice"),
+    ]
+
+    assert names(github_plan.chains(tasks)) == [["a", "c"], ["b"]]
+
+
+def test_chains_merge_when_a_task_joins_two():
+    tasks = [
+        task("a", "/repos/example/repo1"),
+        task("b", "/repos/example/repo2"),
+        task("c", "/repos/example/repo3"),
+        task("d", "/repos/example/repo2/labels/bug", "/repos/example/repo1/labels/bug"),
+    ]
+
+    assert names(github_plan.chains(tasks)) == [["a", "b", "d"], ["c"]]
+
+
+def test_plan_writer(tmp_path):
+    path = str(tmp_path / "plan.jsonl")
+    writer = github_plan.PlanWriter(path)
+    writer.begin("github_repo")
+    repo = {"name": "repo1", "description": "old"}
+    writer.observe("/repos/example/repo1", URL + "/repos/example/repo1", '"a"', repo)
+    writer.observe("/orgs/example/repos", URL + "/orgs/example/repos", '"b"', [repo])
+
+    res = writer.add(
+        "PATCH",
+        "/repos/{owner}/{repo}",
+        "/repos/example/repo1",
+        {"owner": "example", "repo": "repo1"},
+        {},
+        {"description": "new"},
+    )
+    assert res == {"name": "repo1", "description": "new"}
+
+    res = writer.add(
+        "POST",
+        "/orgs/{org}/repos",
+        "/orgs/example/repos",
+        {"org": "example"},
+        {},
+        {"name": "repo2"},
+    )
+    assert res == {"org": "example", "name": "repo2"}
+
+    writer.add(
+        "DELETE",
+        "/repos/{owner}/{repo}/labels/{name}",
+        "/repos/example/repo1/labels/bug",
+        {"owner": "example", "repo": "repo1", "name": "bug"},
+        {},
+        {},
+    )
+
+    (entries,) = github_plan.read_plan(path)
+    assert [entry["op"] for entry in entries] == ["update", "create", "delete"]
+    assert entries[0]["precondition"] == {
+        "url": URL + "/repos/example/repo1",
+        "etag": '"a"',
+    }
+    # Creates, and writes to objects that were not read themselves, have
+    # no precondition.
+    assert entries[1]["precondition"] is None
+    assert entries[2]["precondition"] is None
+
+
+def test_read_plan_groups_tasks(tmp_path):
+    path = str(tmp_path / "plan.jsonl")
+    writer = github_plan.PlanWriter(path)
+    for module in ("github_repo", "github_team"):
+        writer.begin(module)
+        for n in range(2):
+            writer.add("DELETE", "/x", f"/x/{module}/{n}", {}, {}, {})
+
+    tasks = github_plan.read_plan(path)
+    assert [entries[0]["module"] for entries in tasks] == [
+        "github_repo",
+        "github_team",
+    ]
+    assert [[entry["seq"] for entry in entries] for entries in tasks] == [
+        [0, 1],
+        [0, 1],
+    ]
@@ -0,0 +1,118 @@
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_snapshot as github_snapshot
+
+URL = "https://api.github.com"
+
+
+def test_key_parts():
+    assert github_snapshot.key_parts("/repos/Example/Repo1?page=2") == [
+        "repos",
+        "example",
+        "repo1",
+    ]
+
+
+@pytest.mark.parametrize(
+    "line,keys",
+    [
+        (
+            {"kind": "repo", "name": "Repo1"},
+            ["repos/example/repo1", "orgs/example/repos"],
+        ),
+        ({"kind": "label", "repo": "Repo1"}, ["repos/example/repo1/labels"]),
+        (
+            {"kind": "collaborator", "repo": "repo1"},
+            ["repos/example/repo1/collaborators"],
+        ),
+        (
+            {"kind": "team", "name": "team-1"},
+            ["orgs/example/teams/team-1", "orgs/example/teams"],
+        ),
+        (
+            {"kind": "team_member", "team": "team-1", "role": "member"},
+            ["orgs/example/teams/team-1/members"],
+        ),
+        ({"kind": "member", "role": "admin"}, ["orgs/example/members"]),
+        ({"kind": "unknown"}, []),
+    ],
+)
+def test_object_keys(line, keys):
+    assert github_snapshot.object_keys("Example", line) == keys
+
+
+@pytest.mark.parametrize(
+    "path,root",
+    [
+        ("/repos/example/repo1", "repos/example/repo1"),
+        ("/repos/example/repo1/labels/bug", "repos/example/repo1"),
+        ("/orgs/example/teams/team-1", "orgs/example/teams/team-1"),
+        ("/orgs/example/teams/team-1/memberships/alice", "orgs/example/teams/team-1"),
+    ],
+)
+def test_object_root(path, root):
+    assert github_snapshot.object_root(github_snapshot.key_parts(path)) == root
+
+
+def test_compact():
+    assert github_snapshot.compact(
+        {"url": "x", "html_url": "y", "owner": {"repos_url": "z", "login": "a"}}
+    ) == {"html_url": "y", "owner": {"login": "a"}}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "example.jsonl.gz")
+    with github_snapshot.SnapshotWriter(
+        path, "example", URL, collaborator_affiliation="direct"
+    ) as writer:
+        writer.write("repo", {"name": "repo1", "url": "x"}, name="repo1")
+        writer.write("label", {"name": "bug"}, repo="repo1")
+        writer.write("label", {"name": "docs"}, repo="repo1")
+        writer.write("team", {"name": "Team 1", "slug": "team-1"}, name="team-1")
+        writer.write(
+            "team_member", {"login": "alice"}, team="team-1", role="maintainer"
+        )
+        writer.write("team_member", {"login": "bob"}, team="team-1", role="member")
+
+    return github_snapshot.Snapshot(path, str(tmp_path / "index"), 3600, URL)
+
+
+def test_snapshot_objects(snapshot):
+    assert snapshot.get("/repos/example/repo1") == {"name": "repo1"}
+    assert snapshot.get("/repos/Example/REPO1") == {"name": "repo1"}
+    assert snapshot.get("/orgs/example/teams/team-1")["slug"] == "team-1"
+    assert snapshot.get("/repos/example/repo2") is None
+    assert snapshot.get("/repos/other/repo1") is None
+
+
+def test_snapshot_listings(snapshot):
+    labels = snapshot.get("/repos/example/repo1/labels", {"per_page": 100})
+    assert labels == [{"name": "bug"}, {"name": "docs"}]
+    assert snapshot.get("/orgs/example/repos", {"type": "all"}) == [{"name": "repo1"}]
+    assert snapshot.get("/orgs/example/teams/team-1/members", {"role": "member"}) == [
+        {"login": "bob"}
+    ]
+
+
+def test_snapshot_cannot_answer(snapshot):
+    # Later pages, filtered listings and listings whose parent is missing
+    # are read live.
+    assert snapshot.get("/repos/example/repo1/labels", {"page": 2}) is None
+    assert snapshot.get("/orgs/example/repos", {"type": "public"}) is None
+    assert snapshot.get("/repos/example/repo2/labels") is None
+    assert snapshot.get("/repos/example/repo1/collaborators") is None
+    assert (
+        snapshot.get("/repos/example/repo1/collaborators", {"affiliation": "direct"})
+        == []
+    )
+    assert snapshot.summary() == {"hits": 1, "misses": 4}
+
+
+def test_snapshot_invalidate(snapshot):
+    snapshot.invalidate("/repos/example/repo1/labels/bug")
+
+    assert snapshot.get("/repos/example/repo1") is None
+    assert snapshot.get("/repos/example/repo1/labels") is None
+    assert snapshot.get("/orgs/example/repos") is None
+    assert snapshot.get("/orgs/example/teams/team-1") is not None
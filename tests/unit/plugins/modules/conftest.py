@@ -0,0 +1,34 @@
+"""Run modules in-process against the mock GitHub server."""
+
+import contextlib
+import importlib
+import io
+import json
+
+import pytest
+
+from ansible.module_utils.testing import patch_module_args
+
+
+@pytest.fixture
+def run_module(github, tmp_path):
+    """Return a function that runs a module and returns its result."""
+
+    def run(name, /, **args):
+        module = importlib.import_module(
+            f"ansible_collections.oddbit.github.plugins.modules.{name}"
+        )
+        args = {
+            "github_token": "test",
+            "github_url": github.url,
+            "github_cache_dir": str(tmp_path / "cache"),
+            "github_write_interval": 0,
+            **args,
+        }
+        output = io.StringIO()
+        with patch_module_args(args), contextlib.redirect_stdout(output):
+            with pytest.raises(SystemExit):
+                module.Module().run()
+        return json.loads(output.getvalue())
+
+    return run
@@ -0,0 +1,90 @@
+import json
+
+
+def read_plan(path):
+    with open(path) as fd:
+        return [json.loads(line) for line in fd]
+
+
+def test_plan_new_team(run_module, github, tmp_path):
+    plan = str(tmp_path / "plan.jsonl")
+    result = run_module(
+        "github_org_state",
+        organization="example",
+        teams=[{"name": "New Team", "members": ["user0"]}],
+        github_plan=plan,
+    )
+
+    assert not result.get("failed"), result
+    assert result["changed"]
+    assert "new-team" not in github.org.teams
+    assert [(entry["verb"], entry["path"]) for entry in read_plan(plan)] == [
+        ("POST", "/orgs/example/teams"),
+        ("PUT", "/orgs/example/teams/new-team/memberships/user0"),
+    ]
+
+
+def test_plan_team_rename(run_module, github, tmp_path):
+    plan = str(tmp_path / "plan.jsonl")
+    result = run_module(
+        "github_org_state",
+        organization="example",
+        teams=[{"name": "team 0", "description": "changed", "members": ["user9"]}],
+        github_plan=plan,
+    )
+
+    assert not result.get("failed"), result
+    assert [(entry["verb"], entry["path"]) for entry in read_plan(plan)] == [
+        ("PATCH", "/orgs/example/teams/team-0"),
+        ("PUT", "/orgs/example/teams/team-0/memberships/user9"),
+    ]
+    assert github.org.teams["team-0"]["name"] == "Team 0"
+
+
+def test_team_members_case_and_invitations(run_module, org):
+    org.invitations["team-0"] = {"user9"}
+    result = run_module(
+        "github_org_state",
+        organization="example",
+        teams=[
+            {
+                "name": "Team 0",
+                "maintainers": ["USER0"],
+                "members": ["User1", "user9"],
+                "exclusive": True,
+            }
+        ],
+    )
+
+    assert not result.get("failed"), result
+    assert not result["changed"]
+    assert result["teams"]["Team 0"]["ops"] == []
+    assert org.members["team-0"] == {"user0": "maintainer", "user1": "member"}
+
+
+def test_team_members_role_change(run_module, org):
+    result = run_module(
+        "github_org_state",
+        organization="example",
+        teams=[{"name": "Team 0", "maintainers": ["User1"], "exclusive": True}],
+    )
+
+    assert not result.get("failed"), result
+    assert result["teams"]["Team 0"]["ops"] == ["add_member", "remove_member"]
+    assert org.members["team-0"] == {"user1": "maintainer"}
+
+
+def test_new_repo_labels(run_module, org):
+    result = run_module(
+        "github_org_state",
+        organization="example",
+        repos=[{"name": "new", "labels": [{"name": "Bug", "color": "ff0000"}]}],
+        labels_exclusive=True,
+    )
+
+    assert not result.get("failed"), result
+    assert result["repos"]["new"]["ops"][0] == "create"
+    assert "add_label" not in result["repos"]["new"]["ops"]
+    assert org.labels["new"] == [
+        {"name": "Bug", "color": "ff0000", "description": None}
+    ]
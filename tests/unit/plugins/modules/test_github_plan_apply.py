@@ -0,0 +1,23 @@
+def test_journal_resumes_applied_writes(run_module, github, org, tmp_path):
+    plan = str(tmp_path / "plan")
+    for n in range(2):
+        run_module(
+            "github_repo",
+            name=f"example/repo{n}",
+            repository={"description": "planned"},
+            github_plan=plan,
+        )
+
+    args = {"plan": plan, "github_journal": str(tmp_path / "journal")}
+    github.faults[("PATCH", "/repos/example/repo1")] = [502]
+    result = run_module("github_plan_apply", github_retries=0, **args)
+    assert result["failed"]
+    assert [task["applied"] for task in result["tasks"]] == [1, 0]
+
+    result = run_module("github_plan_apply", **args)
+    assert not result.get("failed")
+    assert [(task["resumed"], task["applied"]) for task in result["tasks"]] == [
+        (1, 0),
+        (0, 1),
+    ]
+    assert {org.repos[f"repo{n}"]["description"] for n in range(2)} == {"planned"}
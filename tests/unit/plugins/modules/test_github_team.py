@@ -0,0 +1,65 @@
+import pytest
+
+import ansible_collections.oddbit.github.plugins.module_utils.github_app as github_app
+import ansible_collections.oddbit.github.plugins.module_utils.github_helper as github_helper
+
+
+def test_incremental_skips_before_lookup(run_module, github, org):
+    team = {"name": "team-0", "description": "Team 0", "privacy": "closed"}
+    args = {"organization": "example", "team": team, "github_incremental": True}
+    assert run_module("github_team", **args)["changed"]
+
+    before = github.stats.requests
+    result = run_module("github_team", **args)
+    assert result["skipped"]
+    assert github.stats.requests == before
+
+
+def test_incremental_notices_changed_teams(run_module, github, org):
+    team = {"name": "team-0", "description": "Team 0", "privacy": "closed"}
+    args = {"organization": "example", "team": team, "github_incremental": True}
+    github.poll_interval = 0
+    run_module("github_team", **args)
+
+    org.teams["team-0"]["description"] = "changed"
+    result = run_module("github_team", **args)
+    assert result["changed"]
+    assert org.teams["team-0"]["description"] == "Team 0"
+
+    result = run_module("github_team", **args)
+    assert result["skipped"]
+
+
+def test_shared_client_renews_app_token(run_module, github, monkeypatch):
+    rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+    serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+    monkeypatch.setattr(github_helper.GithubModule, "share_clients", True)
+    monkeypatch.setattr(github_helper, "SHARED_CLIENTS", {})
+    args = {
+        "organization": "example",
+        "team": {"name": "team-0"},
+        "github_token": None,
+        "github_app_id": 1,
+        "github_app_private_key": pem,
+        "github_app_installation_id": 1,
+    }
+    # A token that is already within TOKEN_MARGIN of expiring is replaced
+    # by the next run that shares the client.
+    github.app_token_lifetime = github_app.TOKEN_MARGIN
+    run_module("github_team", **args)
+    (api,) = github_helper.SHARED_CLIENTS.values()
+    assert api.headers["Authorization"] == "token ghs_1"
+
+    github.app_token_lifetime = 3600
+    run_module("github_team", **args)
+    assert api.headers["Authorization"] == "token ghs_2"
+    run_module("github_team", **args)
+    assert api.headers["Authorization"] == "token ghs_2"
+    assert github.app_tokens == 2